@@ -1,41 +1,82 @@
-import requests
+import asyncio
 import logging
-from typing import List
-from groq import Groq
+import threading
+import weakref
+from typing import AsyncIterator, Dict, List, Tuple, Union
+from groq import Groq, AsyncGroq
 from ollama import OllamaClient
+from model_registry import ModelRegistry
+from context_packer import ContextPacker
 
 logger = logging.getLogger(__name__)
 
+GROQ_MODEL = "llama3-8b-8192"
+SYSTEM_PROMPT = "you are a helpful assistant that answers questions based on provided document content. be concise and accurate."
+PROMPT_TEMPLATE = """        
+you are analyzing a document. based on the content below, answer user's question clearly and concisely.
+
+document content:
+{context_txt}
+
+user question: {question}
+
+instructions:
+- answer based only on the provided content
+- if the content doesn't contain the answer, say "i don't see information about that in this document"
+- keep your answer concise but complete
+- do NOT use markdown formatting in your response
+
+answer:"""
+
+def _groq_usage(usage) -> Dict: # token counts as groq reports them, {} when it didn't
+    if usage is None: return {}
+    res = {"prompt_tokens": usage.prompt_tokens, "completion_tokens": usage.completion_tokens}
+    if getattr(usage, "prompt_time", None): res["prefill_ms"] = usage.prompt_time * 1000
+    return res
+
+def _ollama_usage(res: Dict) -> Dict: # prompt_eval_count is left out when ollama reused a cached prompt prefix
+    usage = {}
+    if res.get("prompt_eval_count"): usage["prompt_tokens"] = res["prompt_eval_count"]
+    if res.get("eval_count"): usage["completion_tokens"] = res["eval_count"]
+    if res.get("prompt_eval_duration"): usage["prefill_ms"] = res["prompt_eval_duration"] / 1e6
+    return usage
+
 class AIProcessor:
-    def __init__(self, groq_api_key: str = None, ollama_url: str = "http://localhost:11434"):
-        self.groq_client = Groq(api_key=groq_api_key) if groq_api_key else None
-        self.ollama_client = OllamaClient(ollama_url)
+    def __init__(self, groq_api_key: str = None, ollama_url: str = "http://localhost:11434", ollama_timeout: float = 60, groq_timeout: float = 30,
+                 ollama_max_concurrency: int = 4, groq_max_concurrency: int = 16, ollama_models_ttl: float = 60, ollama_refresh_interval: float = 30,
+                 max_tokens: int = 500, prompt_tokens: int = 2048, model_prompt_tokens: Dict[str, int] = None):
+        # groq clients pool connections through their own httpx clients; ollama's pool is sized to its concurrency limit
+        self.groq_client = Groq(api_key=groq_api_key, timeout=groq_timeout) if groq_api_key else None
+        self.groq_async = AsyncGroq(api_key=groq_api_key, timeout=groq_timeout) if groq_api_key else None
+        self.ollama_client = OllamaClient(ollama_url, timeout=ollama_timeout, max_connections=ollama_max_concurrency)
+        # async calls past the limit wait their turn on the loop instead of piling onto the backend
+        self._limit_sizes = {"groq": groq_max_concurrency, "ollama": ollama_max_concurrency}
+        self._limits = weakref.WeakKeyDictionary() # event loop → {service: semaphore}, see _limit
+        self.max_tokens = max_tokens # completion tokens per answer
+        self.packer = ContextPacker(prompt_tokens, model_prompt_tokens)
+        self._usage: Dict[Tuple[str, str], Dict] = {} # (service, model) → token totals, see _record_usage
+        self._usage_lock = threading.Lock() # sync answers record from handler threads, async ones from the loop
         
         self.groq_isAvail = bool(groq_api_key)
-        self.ollama_isAvail = self.check_ollama()
+        self.ollama_models = ModelRegistry(self.ollama_client, ollama_models_ttl, ollama_refresh_interval)
+        self.check_ollama() # startup state synchronously, then the registry keeps it fresh in the background
+        self.ollama_models.start()
         
         logger.info(f"ai services - groq: {self.groq_isAvail}, ollama: {self.ollama_isAvail}")
     
-    def check_ollama(self) -> bool:
-        try:
-            greq = requests.get(f"{self.ollama_client.base_url}/api/tags", timeout=5)
-            greq.raise_for_status()
-            
-            models_data = greq.json()
-            models = models_data.get('models', [])
-            
-            logger.info(f"ollama check: found {len(models)} models")
-            if models:
-                logger.info(f"available models: {[m['name'] for m in models]}")
-            
-            return len(models)>0
-            
-        except requests.exceptions.ConnectionError:
-            logger.warning("ollama not available - using groq only")
-            return False
-        except Exception as e:
-            logger.error(f"error checking ollama: {e}")
-            return False
+    def _limit(self, service: str) -> asyncio.Semaphore:
+        """the service's concurrency limit on the running loop -- made there on first use, a semaphore
+        created outside it (or on another loop) fails on python < 3.10"""
+        limits = self._limits.setdefault(asyncio.get_running_loop(), {})
+        if service not in limits: limits[service] = asyncio.Semaphore(self._limit_sizes[service])
+        return limits[service]
+    
+    @property
+    def ollama_isAvail(self) -> bool: # live -- flips when the registry sees ollama go down or come back
+        return self.ollama_models.available
+    
+    def check_ollama(self) -> bool: # forces a refresh, off the hot path only
+        return self.ollama_models.refresh()
         
     def get_available_services(self) -> List[str]:
         services = []
@@ -45,60 +86,93 @@ class AIProcessor:
             services.append("ollama")
         return services
     
-    def get_ollama_models(self) -> List[str]:
-        try:
-            greq = requests.get(f"{self.ollama_client.base_url}/api/tags", timeout=5)
-            models = greq.json().get('models', [])
-            return [model['name'] for model in models]
-        except:
-            return []
+    def get_ollama_models(self) -> List[str]: # cached catalog, never an http call
+        return self.ollama_models.models()
     
-    def generate_answer(self, question: str, context: List[str], service: str = "groq", model: str = None) -> str:
-        context_txt = "\n\n".join(context)
-        prompt = f"""        
-you are analyzing a document. based on the content below, answer user's question clearly and concisely.
-
-document content:
-{context_txt}
-
-user question: {question}
-
-instructions:
-- answer based only on the provided content
-- if the content doesn't contain the answer, say "i don't see information about that in this document"
-- keep your answer concise but complete
-- do NOT use markdown formatting in your response
-
-answer:"""
+    def resolve_model(self, service: str, model: str = None) -> str: # the model a call w these args would actually use
+        if service == "groq": return GROQ_MODEL
+        return model or self.ollama_models.default_model()
+    
+    def _build_messages(self, question: str, context: List[Union[str, Dict]], model: str) -> Tuple[List[Dict], Dict]:
+        """chat messages w the context packed into the model's prompt budget (see ContextPacker) + the pack report"""
+        overhead = sum(self.packer.count([SYSTEM_PROMPT, PROMPT_TEMPLATE.format(context_txt="", question=question)], model))
+        context_txt, pack = self.packer.pack(context, model, overhead)
+        pack["prompt_tokens"] = overhead + pack["context_tokens"] # estimate, calibrated against what the service reports
+        prompt = PROMPT_TEMPLATE.format(context_txt=context_txt, question=question)
+        return [{"role": "system", "content": SYSTEM_PROMPT}, {"role": "user", "content": prompt}], pack
+    
+    def _record_usage(self, service: str, model: str, pack: Dict, usage: Dict, ans: str):
+        """one log line per llm call + per-model totals. counts the service didn't report are estimated"""
+        if usage.get("prompt_tokens"): self.packer.calibrate(model, pack["prompt_tokens"], usage["prompt_tokens"])
+        prompt_toks = usage.get("prompt_tokens", pack["prompt_tokens"])
+        completion_toks = usage.get("completion_tokens") or (self.packer.count([ans], model)[0] if ans else 0)
+        prefill_txt = f", prefill {usage['prefill_ms']:.0f} ms" if "prefill_ms" in usage else ""
+        logger.info(f"{service}/{model}: prompt {prompt_toks} tokens{'' if 'prompt_tokens' in usage else ' (est)'}, completion {completion_toks}{prefill_txt} "
+                    f"-- {pack['segments']} segments packed into {pack['blocks']} blocks, {pack['context_tokens']}/{pack['budget']} context tokens")
+        with self._usage_lock:
+            totals = self._usage.setdefault((service, model), {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "estimated": 0,
+                                                               "prefill_ms": 0.0, "prefill_calls": 0, "trimmed": 0})
+            totals["calls"] += 1
+            totals["prompt_tokens"] += prompt_toks
+            totals["completion_tokens"] += completion_toks
+            totals["estimated"] += "prompt_tokens" not in usage
+            totals["trimmed"] += pack["trimmed"] or bool(pack["dropped"])
+            if "prefill_ms" in usage:
+                totals["prefill_ms"] += usage["prefill_ms"]
+                totals["prefill_calls"] += 1
+    
+    def usage_stats(self) -> List[Dict]: # per (service, model): calls n average prompt / completion tokens n prefill ms
+        with self._usage_lock:
+            return [{"service": service, "model": model, "calls": t["calls"], "avg_prompt_tokens": t["prompt_tokens"] / t["calls"],
+                     "avg_completion_tokens": t["completion_tokens"] / t["calls"], "estimated": t["estimated"], "trimmed": t["trimmed"],
+                     "avg_prefill_ms": t["prefill_ms"] / t["prefill_calls"] if t["prefill_calls"] else None,
+                     "budget": self.packer.budget_for(model), "token_ratio": self.packer.ratio(model)}
+                    for (service, model), t in self._usage.items()]
+    
+    def generate_answer(self, question: str, context: List[Union[str, Dict]], service: str = "groq", model: str = None) -> str:
+        """context: search hits, plain texts or segment dicts (search(with_metadata=True)) -- dicts let parts of one section merge"""
+        model = self.resolve_model(service, model)
+        messages, pack = self._build_messages(question, context, model)
         
         try:
             if service == "groq" and self.groq_isAvail:
-                groq_req = self.groq_client.chat.completions.create(
-                    model="llama3-8b-8192",
-                    messages=[
-                        {"role": "system", "content": "you are a helpful assistant that answers questions based on provided document content. be concise and accurate."},
-                        {"role": "user", "content": prompt}
-                    ],
-                    max_tokens=500,
-                    temperature=0.1
-                )
-                return groq_req.choices[0].message.content
+                groq_req = self.groq_client.chat.completions.create(model=GROQ_MODEL, messages=messages, max_tokens=self.max_tokens, temperature=0.1)
+                ans = groq_req.choices[0].message.content
+                self._record_usage(service, model, pack, _groq_usage(groq_req.usage), ans)
+                return ans
             
             elif service == "ollama" and self.ollama_isAvail:
-                if not model:
-                    models = self.get_ollama_models()
-                    model = models[0] if models else "llama3.2"
+                lama_req = self.ollama_client.chat(model=model, messages=messages, max_tokens=self.max_tokens, temperature=0.1)
+                ans = lama_req.get('response', 'no response from ollama')
+                self._record_usage(service, model, pack, _ollama_usage(lama_req), ans)
+                return ans
+            
+            else:
+                return f"service '{service}' is not available"
                 
-                lama_req = self.ollama_client.chat(
-                    model=model,
-                    messages=[
-                        {"role": "system", "content": "you are a helpful assistant that answers questions based on provided document content. be concise and accurate."},
-                        {"role": "user", "content": prompt}
-                    ],
-                    max_tokens=500,
-                    temperature=0.1
-                )
-                return lama_req.get('response', 'no response from ollama')
+        except Exception as e:
+            logger.error(f"error generating ai response with {service}: {e}")
+            return f"|X| sorry, i encountered an error while processing your question with {service} |X|"
+    
+    async def agenerate_answer(self, question: str, context: List[Union[str, Dict]], service: str = "groq", model: str = None) -> str:
+        """async generate_answer -- runs on the shared AsyncLoop, at most *_max_concurrency calls per service at once"""
+        model = self.resolve_model(service, model)
+        messages, pack = self._build_messages(question, context, model)
+        
+        try:
+            if service == "groq" and self.groq_isAvail:
+                async with self._limit("groq"):
+                    groq_req = await self.groq_async.chat.completions.create(model=GROQ_MODEL, messages=messages, max_tokens=self.max_tokens, temperature=0.1)
+                ans = groq_req.choices[0].message.content
+                self._record_usage(service, model, pack, _groq_usage(groq_req.usage), ans)
+                return ans
+            
+            elif service == "ollama" and self.ollama_isAvail:
+                async with self._limit("ollama"):
+                    lama_req = await self.ollama_client.achat(model=model, messages=messages, max_tokens=self.max_tokens, temperature=0.1)
+                ans = lama_req.get('response', 'no response from ollama')
+                self._record_usage(service, model, pack, _ollama_usage(lama_req), ans)
+                return ans
             
             else:
                 return f"service '{service}' is not available"
@@ -106,3 +180,37 @@ answer:"""
         except Exception as e:
             logger.error(f"error generating ai response with {service}: {e}")
             return f"|X| sorry, i encountered an error while processing your question with {service} |X|"
+    
+    async def astream_answer(self, question: str, context: List[Union[str, Dict]], service: str = "groq", model: str = None) -> AsyncIterator[str]:
+        """streaming agenerate_answer: yields answer text piece by piece as the service produces it"""
+        model = self.resolve_model(service, model)
+        messages, pack = self._build_messages(question, context, model)
+        pieces = []
+        
+        try:
+            if service == "groq" and self.groq_isAvail:
+                usage = None
+                async with self._limit("groq"): # held for the whole stream -- it is one in-flight call
+                    stream = await self.groq_async.chat.completions.create(model=GROQ_MODEL, messages=messages, max_tokens=self.max_tokens, temperature=0.1, stream=True)
+                    async for chunk in stream:
+                        usage = getattr(getattr(chunk, "x_groq", None), "usage", None) or usage # on the last chunk
+                        piece = chunk.choices[0].delta.content if chunk.choices else None
+                        if piece:
+                            pieces.append(piece)
+                            yield piece
+                self._record_usage(service, model, pack, _groq_usage(usage), "".join(pieces))
+            
+            elif service == "ollama" and self.ollama_isAvail:
+                done = {}
+                async with self._limit("ollama"):
+                    async for piece in self.ollama_client.astream_chat(model=model, messages=messages, max_tokens=self.max_tokens, temperature=0.1, done=done):
+                        pieces.append(piece)
+                        yield piece
+                self._record_usage(service, model, pack, _ollama_usage(done), "".join(pieces))
+            
+            else:
+                yield f"service '{service}' is not available"
+                
+        except Exception as e:
+            logger.error(f"error streaming ai response with {service}: {e}")
+            yield ("\n\n" if pieces else "") + f"|X| sorry, i encountered an error while processing your question with {service} |X|"
@@ -0,0 +1,74 @@
+import time
+import logging
+import threading
+import numpy as np
+from collections import OrderedDict, defaultdict
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+class AnswerCache:
+    """llm answers per (document hash, service, model), matched by question embedding
+
+    a question whose normalized embedding has cosine >= threshold with a cached one for the same doc +
+    service + model gets that answer back -- no search, no llm call. lru over all entries n a ttl per entry
+    """
+    def __init__(self, threshold: float = 0.92, max_entries: int = 1000, ttl: float = 3600):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict() # entry id → (bucket key, question vec, question, answer, cost secs, stored at)
+        self._buckets: Dict[Tuple, set] = defaultdict(set) # (doc, service, model) → entry ids
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.saved_secs = 0.0 # what the hits would have cost: search + llm time of the original answer
+
+    def _drop(self, entry_id: int):
+        bucket_key = self._entries.pop(entry_id)[0]
+        self._buckets[bucket_key].discard(entry_id)
+        if not self._buckets[bucket_key]: del self._buckets[bucket_key]
+
+    def get(self, doc_id: str, service: str, model: str, qry_vec: np.ndarray) -> Optional[Tuple[str, str, float]]:
+        """(answer, cached question, similarity) of the closest cached question above threshold, or None"""
+        qry_vec = np.asarray(qry_vec, dtype=np.float32).reshape(-1)
+        with self._lock:
+            now = time.time()
+            ids = list(self._buckets.get((doc_id, service, model), ()))
+            for entry_id in ids:
+                if now - self._entries[entry_id][5] > self.ttl: self._drop(entry_id)
+            ids = [entry_id for entry_id in ids if entry_id in self._entries]
+
+            if ids:
+                sims = np.stack([self._entries[entry_id][1] for entry_id in ids]) @ qry_vec
+                best = int(np.argmax(sims))
+                if sims[best] >= self.threshold:
+                    entry_id = ids[best]
+                    self._entries.move_to_end(entry_id)
+                    _, _, question, answer, cost, _ = self._entries[entry_id]
+                    self.hits += 1
+                    self.saved_secs += cost
+                    return answer, question, float(sims[best])
+            self.misses += 1
+            return None
+
+    def put(self, doc_id: str, service: str, model: str, qry_vec: np.ndarray, question: str, answer: str, cost: float):
+        bucket_key = (doc_id, service, model)
+        with self._lock:
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = (bucket_key, np.asarray(qry_vec, dtype=np.float32).reshape(-1), question, answer, cost, time.time())
+            self._buckets[bucket_key].add(entry_id)
+            while len(self._entries) > self.max_entries: self._drop(next(iter(self._entries)))
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "saved_secs": self.saved_secs
+            }
@@ -0,0 +1,49 @@
+import asyncio
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Coroutine, Dict
+
+logger = logging.getLogger(__name__)
+
+class AsyncLoop:
+    """one asyncio event loop on a daemon thread, shared by every llm call
+
+    telebot handlers are sync n run on a couple of polling threads -- they hand their llm work to this loop
+    (submit) n return right away, so many users' questions are in flight at once without a thread each
+    """
+    def __init__(self, name: str = "llm-loop"):
+        self.loop = asyncio.new_event_loop()
+        self.in_flight = 0
+        self.completed = 0
+        self.failed = 0
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def submit(self, coro: Coroutine) -> Future: # thread safe; result/exception land on the returned future
+        with self._lock: self.in_flight += 1
+        fut = asyncio.run_coroutine_threadsafe(coro, self.loop)
+        fut.add_done_callback(self._on_done)
+        return fut
+
+    def _on_done(self, fut: Future):
+        with self._lock:
+            self.in_flight -= 1
+            if fut.cancelled() or fut.exception() is not None: self.failed += 1
+            else: self.completed += 1
+
+    def run(self, coro: Coroutine, timeout: float = None): # blocking helper for sync callers
+        return self.submit(coro).result(timeout)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {"in_flight": self.in_flight, "completed": self.completed, "failed": self.failed}
+
+    def stop(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout=5)
@@ -0,0 +1,68 @@
+import os
+import sys
+import time
+import resource
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path: sys.path.insert(0, ROOT) # so benches can import bot modules when run as scripts
+
+def rss_mb() -> float:
+    try: # current resident set, linux only
+        with open('/proc/self/status') as f:
+            for ll in f:
+                if ll.startswith('VmRSS:'): return int(ll.split()[1]) / 1024
+    except OSError: pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024 # peak rss fallback (kb on linux)
+
+class Timer:
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+    def __exit__(self, *exc):
+        self.ms = (time.perf_counter() - self.start) * 1000
+
+def synthetic_pages(pages: int, lines_per_page: int = 40, seed: int = 0):
+    """deterministic fake manual: numbered headers, prose lines, a made-up vocab so postings aren't trivial"""
+    import random
+    rnd = random.Random(seed)
+    syll = ["ka", "lo", "mi", "ne", "ru", "sa", "te", "vo", "zi", "pra", "sto", "gen", "mor", "lin", "dex"]
+    vocab = sorted({"".join(rnd.choice(syll) for _ in range(rnd.randint(2, 4))) for _ in range(6000)})
+    common = ["the", "and", "system", "value", "data", "with", "for", "this", "that", "process", "user", "file"]
+    sec = 0
+    for p in range(pages):
+        lines = []
+        for ll in range(lines_per_page):
+            if ll % 15 == 0:
+                sec += 1
+                lines.append(f"{sec}. {rnd.choice(vocab).capitalize()} {rnd.choice(vocab).capitalize()}")
+            else:
+                words = [rnd.choice(vocab) if rnd.random() < 0.4 else rnd.choice(common) for _ in range(rnd.randint(8, 16))]
+                lines.append(" ".join(words).capitalize() + ".")
+        yield "\n".join(lines)
+
+def synthetic_text(pages: int, **kwargs) -> str:
+    return "\n".join(synthetic_pages(pages, **kwargs))
+
+def write_synthetic_pdf(path: str, pages: int, lines_per_page: int = 40, seed: int = 0):
+    """tiny hand-rolled pdf writer (helvetica text only) so benches don't need reportlab"""
+    def esc(s): return s.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+    objs = [b"<< /Type /Catalog /Pages 2 0 R >>", None, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for txt in synthetic_pages(pages, lines_per_page, seed):
+        ops = ["BT /F1 9 Tf 11 TL 40 800 Td"] + [f"({esc(ll[:110])}) '" for ll in txt.split("\n")] + ["ET"]
+        stream = "\n".join(ops).encode("latin-1", "replace")
+        objs.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        objs.append(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 842] /Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % len(objs))
+        kids.append(len(objs))
+    objs[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (b" ".join(b"%d 0 R" % k for k in kids), len(kids))
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for n, body in enumerate(objs, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % n + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objs) + 1)
+    out += b"".join(b"%010d 00000 n \n" % off for off in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objs) + 1, xref)
+    with open(path, "wb") as f: f.write(out)
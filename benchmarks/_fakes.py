@@ -0,0 +1,135 @@
+"""in-process stand-ins for the telegram api surface BotHandlers uses -- no network, no token"""
+import asyncio
+import itertools
+import json
+import threading
+import time
+from types import SimpleNamespace
+
+class FakeBot:
+    def __init__(self, api_latency: float = 0.0, file_bytes: bytes = b"%PDF-fake"):
+        self.api_latency = api_latency # per call, roughly a telegram round trip
+        self.file_bytes = file_bytes
+        self.sent = []
+        self.edits = []
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def _call(self):
+        if self.api_latency: time.sleep(self.api_latency)
+
+    def send_message(self, chat_id, text, **kwargs):
+        self._call()
+        msg = SimpleNamespace(chat=SimpleNamespace(id=chat_id), message_id=next(self._ids), text=text)
+        with self._lock: self.sent.append((time.perf_counter(), chat_id, text))
+        return msg
+
+    def edit_message_text(self, text, chat_id, message_id, **kwargs):
+        self._call()
+        with self._lock: self.edits.append((time.perf_counter(), chat_id, message_id, text))
+
+    def send_chat_action(self, chat_id, action): self._call()
+    def answer_callback_query(self, *args, **kwargs): self._call()
+    def get_file(self, file_id):
+        self._call()
+        return SimpleNamespace(file_path=f"documents/{file_id}.pdf")
+    def download_file(self, file_path):
+        self._call()
+        return self.file_bytes
+
+def text_message(uid: int, text: str):
+    return SimpleNamespace(from_user=SimpleNamespace(id=uid), chat=SimpleNamespace(id=uid), text=text, message_id=0)
+
+def document_message(uid: int, file_name: str = "doc.pdf", file_size: int = 1024):
+    doc = SimpleNamespace(file_name=file_name, file_size=file_size, file_id=f"f{uid}")
+    return SimpleNamespace(from_user=SimpleNamespace(id=uid), chat=SimpleNamespace(id=uid), document=doc, message_id=0)
+
+class FakeAI:
+    """AIProcessor stand-in: answers instantly so question latency is all search + bot overhead"""
+    def get_available_services(self): return ["groq"]
+    def generate_answer(self, question, context, service="groq", model=None): return f"answer to {question}"
+    async def agenerate_answer(self, question, context, service="groq", model=None): return f"answer to {question}"
+
+class MockOllama:
+    """minimal http/1.1 keep-alive server speaking ollama's /api/tags n /api/generate, on its own loop thread
+
+    every generate takes `latency` secs; parallel caps how many run at once (real ollama serializes per model).
+    with token_delay set, `latency` is the time to the first token n each further word of the response costs
+    token_delay -- both for "stream": true (chunked ndjson) n the one-shot reply
+    """
+    def __init__(self, latency: float = 0.05, parallel: int = 0, response: str = "mock answer", token_delay: float = 0.0):
+        self.latency = latency
+        self.parallel = parallel
+        self.response = response
+        self.token_delay = token_delay
+        self.connections = 0
+        self.requests = 0
+        self.loop = asyncio.new_event_loop()
+        self._started = threading.Event()
+        threading.Thread(target=self._run, daemon=True).start()
+        self._started.wait()
+        self.base_url = f"http://127.0.0.1:{self.port}"
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self._slots = asyncio.Semaphore(self.parallel) if self.parallel else None
+        server = self.loop.run_until_complete(asyncio.start_server(self._handle, "127.0.0.1", 0, backlog=1024))
+        self.port = server.sockets[0].getsockname()[1]
+        self._started.set()
+        self.loop.run_forever()
+
+    def _pieces(self):
+        words = self.response.split(" ")
+        return [wrd if i == 0 else f" {wrd}" for i, wrd in enumerate(words)]
+
+    def _counts(self, req: dict) -> dict: # ollama's usage fields on the final reply, a word per token
+        return {"prompt_eval_count": len(req.get("prompt", "").split()), "eval_count": len(self._pieces()),
+                "prompt_eval_duration": int(self.latency * 1e9)}
+
+    async def _generate(self, req: dict) -> dict:
+        if self._slots:
+            async with self._slots: await asyncio.sleep(self.latency + self.token_delay*(len(self._pieces()) - 1))
+        else: await asyncio.sleep(self.latency + self.token_delay*(len(self._pieces()) - 1))
+        return {"model": req.get("model"), "response": self.response, "done": True, **self._counts(req)}
+
+    async def _stream(self, req: dict, writer):
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/x-ndjson\r\nTransfer-Encoding: chunked\r\n\r\n")
+        def chunk(obj):
+            data = json.dumps(obj).encode() + b"\n"
+            writer.write(b"%x\r\n" % len(data) + data + b"\r\n")
+        await asyncio.sleep(self.latency)
+        for i, piece in enumerate(self._pieces()):
+            if i: await asyncio.sleep(self.token_delay)
+            chunk({"model": req.get("model"), "response": piece, "done": False})
+            await writer.drain()
+        chunk({"model": req.get("model"), "response": "", "done": True, **self._counts(req)})
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
+
+    async def _handle(self, reader, writer):
+        self.connections += 1
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                lines = head.decode("latin-1").split("\r\n")
+                method, path, _ = lines[0].split(" ", 2)
+                hdrs = {k.strip().lower(): v.strip() for k, v in (ll.split(":", 1) for ll in lines[1:] if ":" in ll)}
+                body = await reader.readexactly(int(hdrs.get("content-length", 0)))
+                self.requests += 1
+
+                req = json.loads(body or b"{}")
+                if path == "/api/generate" and req.get("stream"):
+                    await self._stream(req, writer)
+                    continue
+                if path == "/api/tags": res = {"models": [{"name": "mock"}]}
+                elif path == "/api/generate": res = await self._generate(req)
+                else: res = {"error": "not found"}
+                out = json.dumps(res).encode()
+                writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\nContent-Length: %d\r\n\r\n" % len(out) + out)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError): pass
+        finally: writer.close()
+
+    def reset_counts(self):
+        self.connections = 0
+        self.requests = 0
@@ -0,0 +1,84 @@
+"""keyword strategy: the old overlap count vs bm25 over a sparse term matrix -- recall@5 n per-query latency
+
+    python benchmarks/bench_bm25.py [--pages 100,1000,5000] [--probes 200]
+
+corpus per size: the three fixture docs + a synthetic --pages document. two question sets:
+  fixtures  the paraphrased questions of fixtures/search_queries.json, hit = a top-5 segment has the answer
+  probes    sentences from the synthetic doc w every third word dropped, hit = a top-5 segment has the sentence
+overlap_keyword_search n overlap_doc_keywords below are the pre-bm25 code kept verbatim as the baseline.
+lexical strategies only, no embedding model needed. "weights ms" is the lazy matrix build on the first
+query after an ingest
+"""
+import argparse
+import json
+import os
+import re
+import time
+import heapq
+from _common import Timer, synthetic_pages
+from bench_chunking import make_probes
+from document_processor import DocumentProcessor
+from segment_store import SegmentStore
+from vector_search import QueryAnalysis, VectorSearch, by_score
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+def overlap_doc_keywords(lex_idx):
+    total_word_cnt = lex_idx.total_words
+    pop_wrds = set()
+    for word,cnt in lex_idx.word_cnts.items():
+        if 2 <= cnt <= total_word_cnt*0.2 and len(word)>=4: pop_wrds.add(word)
+    for section_title in lex_idx.section_titles:
+        pop_wrds.update(re.findall(r'\b[a-zA-Z]{4,}\b', section_title))
+    return pop_wrds
+
+def overlap_keyword_search(vs, doc_keywords, qa, top_k):
+    qry_wrds = qa.word_set
+    doc_keyword_matches = qry_wrds.intersection(doc_keywords)
+    resz = []
+    for i in vs.lex_idx.candidates(qry_wrds):
+        segment_words = vs.lex_idx.segment_tokens[i]
+        exact_matches = qry_wrds.intersection(segment_words)
+        keyword_overlap = doc_keyword_matches.intersection(segment_words)
+        total_matches = len(exact_matches) + len(keyword_overlap)*0.5
+        if total_matches>0:
+            resz.append({"index": i, "score": total_matches / max(len(qry_wrds), 1), "type": "keyword"})
+    return heapq.nlargest(top_k, resz, key=by_score)
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--pages', default="100,1000,5000")
+    ap.add_argument('--probes', type=int, default=200)
+    args = ap.parse_args()
+
+    with open(os.path.join(FIXTURES, "search_queries.json"), encoding="utf-8") as f:
+        fixture_qs = [(q["query"], q["answer"]) for q in json.load(f)]
+    fixture_docs = [open(os.path.join(FIXTURES, name), encoding="utf-8").read() for name in ("manual.txt", "notes.txt", "report.txt")]
+    procsr = DocumentProcessor()
+
+    print(f"{'pages':>5} {'segments':>8} {'set':>8} {'overlap r@5':>11} {'bm25 r@5':>8} {'overlap ms':>10} {'bm25 ms':>7} {'weights ms':>10} {'bm25 MB':>7}")
+    for pages in map(int, args.pages.split(",")):
+        synth = list(synthetic_pages(pages))
+        vs = VectorSearch.__new__(VectorSearch) # lexical strategies only -- no embedding model needed
+        vs.segments = SegmentStore()
+        for txt in fixture_docs + ["\n".join(synth)]: vs.segments.add(procsr.segment_text(txt))
+        vs._build_lexical_index()
+        doc_keywords = overlap_doc_keywords(vs.lex_idx)
+        with Timer() as build: vs.lex_idx.bm25._matrix()
+
+        for label, qs in (("fixtures", fixture_qs), ("probes", [(qry, sent) for qry, sent in make_probes(synth, args.probes)])):
+            res = {}
+            for name, search in (("overlap", lambda qa: overlap_keyword_search(vs, doc_keywords, qa, 5)), ("bm25", lambda qa: vs._keyword_search(qa, 5))):
+                hits, ms = 0, 0.0
+                for qry, answer in qs:
+                    qa = QueryAnalysis(qry, None)
+                    start = time.perf_counter()
+                    resz = search(qa)
+                    ms += (time.perf_counter() - start) * 1000
+                    hits += any(answer in vs.segments[r["index"]] for r in resz)
+                res[name] = (hits / len(qs), ms / len(qs))
+            print(f"{pages:5d} {len(vs.segments):8d} {label:>8} {res['overlap'][0]:11.1%} {res['bm25'][0]:8.1%} "
+                  f"{res['overlap'][1]:10.2f} {res['bm25'][1]:7.2f} {build.ms:10.0f} {vs.lex_idx.bm25.memory_bytes()/2**20:7.1f}")
+
+if __name__ == "__main__":
+    main()
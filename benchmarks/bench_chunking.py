@@ -0,0 +1,63 @@
+"""chunk size / overlap sweep: retrieval hit-rate, truncation n embedding throughput
+
+    python benchmarks/bench_chunking.py [--pages 30] [--probes 200] [--sizes 128,256,384] [--overlaps 0,32,64]
+
+probes are sentences picked from the synthetic doc with every third word dropped; a probe is a hit when one of
+the top-5 results contains the whole original sentence. sizes above the model's max_seq_length show what
+truncation costs -- those segments lose their tail at encode time
+"""
+import argparse
+import random
+from _common import Timer, synthetic_pages
+from document_processor import DocumentProcessor
+from embedding_service import EmbeddingService
+from vector_search import VectorSearch
+
+def make_probes(pages, n, seed=0):
+    rnd = random.Random(seed)
+    sents = [ll for pg in pages for ll in pg.split("\n") if ll.endswith(".") and len(ll.split()) >= 8]
+    probes = []
+    for sent in rnd.sample(sents, min(n, len(sents))):
+        words = sent.rstrip(".").split()
+        probes.append((" ".join(wrd for i, wrd in enumerate(words) if i % 3 != 2), sent.rstrip(".")))
+    return probes
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--pages', type=int, default=30)
+    ap.add_argument('--probes', type=int, default=200)
+    ap.add_argument('--sizes', default="128,256,384")
+    ap.add_argument('--overlaps', default="0,32,64")
+    args = ap.parse_args()
+
+    embedder = EmbeddingService()
+    embedder.load()
+    max_seq = embedder.max_seq_length
+    pages = list(synthetic_pages(args.pages))
+    txt = "".join(f"{pg}\n" for pg in pages)
+    probes = make_probes(pages, args.probes)
+    print(f"{args.pages} pages, {len(probes)} probes, model max_seq_length {max_seq}\n")
+    print(f"{'tokens':>6} {'overlap':>7} {'segs':>5} {'trunc':>5} {'avg tok':>7} {'seg/s':>7} {'tok/s':>7} {'hit@5 sem':>9} {'hit@5 all':>9}")
+
+    for size in map(int, args.sizes.split(",")):
+        for overlap in map(int, args.overlaps.split(",")):
+            procsr = DocumentProcessor(count_tokens=embedder.count_tokens, max_tokens=size, overlap_tokens=overlap)
+            segments = procsr.segment_text(txt)
+            toks = [tk + 2 for tk in embedder.count_tokens([f"{seg['section']} {seg['text']}" for seg in segments])]
+            truncated = sum(1 for tk in toks if tk > max_seq)
+
+            vs = VectorSearch(embedder)
+            with Timer() as t: vs.create_embeddings(segments)
+            secs = t.ms / 1000
+
+            sem_hits = all_hits = 0
+            for qry, sent in probes:
+                sem_hits += any(sent in vs.segments[r["index"]] for r in vs._semantic_search(vs.analyze(qry), 5))
+                all_hits += any(sent in seg for seg in vs.search(qry, 5))
+
+            print(f"{size:6d} {overlap:7d} {len(segments):5d} {truncated:5d} {sum(toks)/len(toks):7.1f} "
+                  f"{len(segments)/secs:7.1f} {sum(min(tk, max_seq) for tk in toks)/secs:7.0f} "
+                  f"{sem_hits/len(probes):9.1%} {all_hits/len(probes):9.1%}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""prompt context: the old "\\n\\n".join of the hits vs ContextPacker at a few prompt budgets
+
+    python benchmarks/bench_context_packing.py [--max-tokens 64,256] [--budgets 0,2048,1024,512] [--top-k 5]
+
+corpus n questions as bench_search_fusion (fixture docs + synthetic distractor). per segment size n budget:
+prompt tokens per answer (the packer's estimate, the same one for the joined text -- no llm tokenizer here),
+how often the answer phrase is still in the context, blocks per prompt (parts of one section merged), overlap
+sentences removed per prompt, how often the budget cut a block, n pack time. budget 0 = no limit, merging only
+"""
+import argparse
+import hashlib
+import json
+import os
+import time
+from _common import synthetic_text
+from ai_processor import PROMPT_TEMPLATE, SYSTEM_PROMPT
+from context_packer import ContextPacker
+from document_processor import DocumentProcessor
+from embedding_service import EmbeddingService
+from vector_search import VectorSearch
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--noise-pages', type=int, default=40)
+    ap.add_argument('--max-tokens', default="64,256", help="segment sizes, in embedding-model tokens")
+    ap.add_argument('--budgets', default="0,2048,1024,512", help="whole-prompt token budgets, 0 = unlimited")
+    ap.add_argument('--top-k', type=int, default=5)
+    args = ap.parse_args()
+
+    embedder = EmbeddingService()
+    embedder.load()
+    with open(os.path.join(FIXTURES, "search_queries.json"), encoding="utf-8") as f:
+        queries = json.load(f)
+    docs = [(name, open(os.path.join(FIXTURES, name), encoding="utf-8").read()) for name in sorted({q["doc"] for q in queries})]
+    docs.append(("noise", synthetic_text(args.noise_pages)))
+
+    print(f"{'seg tok':>7} {'budget':>6} {'prompt tok':>10} {'answer in':>9} {'blocks':>6} {'overlap':>7} {'cut':>5} {'pack ms':>7}")
+    for max_tokens in map(int, args.max_tokens.split(",")):
+        procsr = DocumentProcessor(count_tokens=embedder.count_tokens, max_tokens=max_tokens)
+        vs = VectorSearch(embedder, parallel=False)
+        for name, txt in docs:
+            doc_id = hashlib.sha256(txt.encode("utf-8")).hexdigest()
+            vs.start_document(doc_id, name)
+            vs.add_segments(procsr.segment_text(txt), doc_id)
+            vs.finish_document(doc_id)
+        hits = [vs.search(q["query"], args.top_k, with_metadata=True) for q in queries]
+
+        joined = ContextPacker(0, {}) # only for its token estimate, counted the way pack() counts: per block + 1 per separator
+        tokens = found = blocks = 0
+        for q, segs in zip(queries, hits):
+            texts = [seg["text"] for seg in segs]
+            tokens += sum(joined.count([SYSTEM_PROMPT, PROMPT_TEMPLATE.format(context_txt="", question=q["query"])] + texts, "m")) + len(texts) - 1
+            found += any(q["answer"] in txt for txt in texts)
+            blocks += len(texts)
+        n = len(queries)
+        print(f"{max_tokens:7d} {'joined':>6} {tokens/n:10.0f} {found/n:9.1%} {blocks/n:6.1f} {0:7.1f} {0:5.0%} {'-':>7}")
+
+        for budget in map(int, args.budgets.split(",")):
+            packer = ContextPacker(budget or 10**9, {})
+            tokens = found = blocks = overlap = cut = 0
+            ms = 0.0
+            for q, segs in zip(queries, hits):
+                overhead = sum(packer.count([SYSTEM_PROMPT, PROMPT_TEMPLATE.format(context_txt="", question=q["query"])], "m"))
+                start = time.perf_counter()
+                txt, report = packer.pack(segs, "m", overhead)
+                ms += (time.perf_counter() - start) * 1000
+                tokens += overhead + report["context_tokens"]
+                found += q["answer"] in txt
+                blocks += report["blocks"]
+                overlap += report["overlap_sentences"]
+                cut += report["trimmed"] or bool(report["dropped"])
+            print(f"{max_tokens:7d} {budget or '-':>6} {tokens/n:10.0f} {found/n:9.1%} {blocks/n:6.1f} {overlap/n:7.1f} {cut/n:5.0%} {ms/n:7.3f}")
+        print()
+
+if __name__ == "__main__":
+    main()
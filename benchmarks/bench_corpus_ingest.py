@@ -0,0 +1,56 @@
+"""per-user corpus: ingest cost of the nth document, one growing index vs re-indexing the whole set
+
+    python benchmarks/bench_corpus_ingest.py [--docs 8] [--pages 20] [--batch-pages 10]
+
+"corpus" appends each new pdf to the user's index batch by batch, the way uploads stream in. "re-index"
+is what users did before: re-upload the set n embed every document again. after the last document the
+first one is removed (stored embeddings, no encode) n a doc-filtered search is timed
+"""
+import argparse
+import time
+from _common import Timer, synthetic_text
+from document_processor import DocumentProcessor
+from embedding_service import EmbeddingService
+from vector_search import VectorSearch
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--docs', type=int, default=8)
+    ap.add_argument('--pages', type=int, default=20)
+    ap.add_argument('--batch-pages', type=int, default=10)
+    args = ap.parse_args()
+
+    embedder = EmbeddingService()
+    embedder.load()
+    procsr = DocumentProcessor()
+    docs = []
+    for k in range(args.docs):
+        txt = synthetic_text(args.pages, seed=k + 1)
+        docs.append((f"{k:064x}", procsr.segment_text(txt)))
+
+    corpus = VectorSearch(embedder)
+    print(f"{args.docs} docs x {args.pages} pages\n")
+    print(f"{'doc':>3} {'new segs':>8} {'corpus segs':>11} {'corpus add ms':>13} {'re-index ms':>11}")
+    for n, (doc_id, segments) in enumerate(docs, 1):
+        batch = max(1, len(segments) * args.batch_pages // args.pages)
+        with Timer() as add:
+            corpus.start_document(doc_id, f"doc{n}.pdf")
+            for start in range(0, len(segments), batch): corpus.add_segments([dict(seg) for seg in segments[start:start + batch]], doc_id)
+            corpus.finish_document(doc_id)
+        with Timer() as full:
+            fresh = VectorSearch(embedder)
+            for did, segs in docs[:n]: fresh.add_segments([dict(seg) for seg in segs], did)
+        print(f"{n:3d} {len(segments):8d} {len(corpus.segments):11d} {add.ms:13.1f} {full.ms:11.1f}")
+
+    with Timer() as rm: removed = corpus.remove_document(docs[0][0])
+    print(f"\nremove doc 1: {removed} segments in {rm.ms:.1f} ms (no encode), {len(corpus.segments)} left")
+
+    qry = "what does the manual say about the system value"
+    qry_embedding = corpus.embed_query(qry)
+    for label, doc_ids in (("all docs", None), ("one doc", [docs[-1][0]])):
+        start = time.perf_counter()
+        for _ in range(50): corpus.search(qry, 5, qry_embedding=qry_embedding, doc_ids=doc_ids)
+        print(f"search, {label}: {(time.perf_counter() - start) * 1000 / 50:.2f} ms")
+
+if __name__ == "__main__":
+    main()
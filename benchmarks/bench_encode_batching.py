@@ -0,0 +1,93 @@
+"""query encode throughput vs latency with n without the micro-batching encode scheduler
+
+    python benchmarks/bench_encode_batching.py [--users 1,8,32] [--queries 40] [--think-ms 20] [--waits 0,2,5,10]
+                                               [--max-batch 64] [--upload 0] [--simulate 8,0.5]
+
+each simulated user sends --queries distinct questions, one at a time, with an exponential think time
+between them. --upload N adds one user re-encoding an N segment document the whole run, to see what a
+big upload does to question latency. wait 0 = no batcher, every caller encodes on its own (the old path).
+--simulate CALL_MS,TEXT_MS swaps the model forward for a sleep of CALL_MS + TEXT_MS per text -- the shape
+of a cpu forward pass, for hosts without the real model
+"""
+import argparse
+import random
+import threading
+import time
+import _common # puts the repo root on sys.path
+from embedding_service import EmbeddingService
+
+def simulate(embedder, call_ms, text_ms):
+    model = embedder.load()
+    encode = model.encode
+    def slow_encode(texts, **kw):
+        time.sleep((call_ms + text_ms * (1 if isinstance(texts, str) else len(texts))) / 1000)
+        return encode(texts, **kw)
+    model.encode = slow_encode
+
+def run(users, queries, think_ms, wait_ms, max_batch, upload, sim):
+    embedder = EmbeddingService(query_cache_size=0, batch_max=max_batch, batch_wait_ms=wait_ms)
+    if sim: simulate(embedder, *sim)
+    else: embedder.load()
+
+    forwards = 0
+    encode_now = embedder._encode_now
+    def counting_encode(texts, **kw):
+        nonlocal forwards
+        forwards += 1
+        return encode_now(texts, **kw)
+    embedder._encode_now = counting_encode
+    if embedder._batcher: embedder._batcher.encode_fn = counting_encode
+
+    latencies = []
+    lat_lock = threading.Lock()
+    done = threading.Event()
+
+    def user(uid):
+        rnd = random.Random(uid)
+        for i in range(queries):
+            time.sleep(rnd.expovariate(1000 / think_ms) if think_ms else 0)
+            start = time.perf_counter()
+            embedder.encode_query(f"user {uid} asks about the system value in step {i}?")
+            with lat_lock: latencies.append(time.perf_counter() - start)
+
+    def uploader():
+        segments = [f"segment {i} of the uploaded manual, with the process data for this user file." for i in range(upload)]
+        while not done.is_set(): embedder.encode(segments)
+
+    threads = [threading.Thread(target=user, args=(uid,)) for uid in range(users)]
+    up = threading.Thread(target=uploader, daemon=True) if upload else None
+    if up: up.start()
+    start = time.perf_counter()
+    for th in threads: th.start()
+    for th in threads: th.join()
+    wall = time.perf_counter() - start
+    done.set()
+
+    latencies.sort()
+    pct = lambda p: latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000
+    return len(latencies) / wall, pct(0.5), pct(0.95), forwards
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--users', default="1,8,32")
+    ap.add_argument('--queries', type=int, default=40)
+    ap.add_argument('--think-ms', type=float, default=20)
+    ap.add_argument('--waits', default="0,2,5,10")
+    ap.add_argument('--max-batch', type=int, default=64)
+    ap.add_argument('--upload', type=int, default=0)
+    ap.add_argument('--simulate', default="")
+    args = ap.parse_args()
+    sim = tuple(map(float, args.simulate.split(","))) if args.simulate else None
+
+    print(f"{args.queries} questions per user, think {args.think_ms:.0f} ms, max batch {args.max_batch}"
+          f"{f', {args.upload} segment upload running' if args.upload else ''}"
+          f"{f', simulated forward {sim[0]:g} ms + {sim[1]:g} ms/text' if sim else ''}\n")
+    print(f"{'users':>5} {'wait ms':>7} {'q/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'forwards':>8}")
+    for users in map(int, args.users.split(",")):
+        for wait in map(float, args.waits.split(",")):
+            qps, p50, p95, fwd = run(users, args.queries, args.think_ms, wait, args.max_batch, args.upload, sim)
+            print(f"{users:5d} {wait:7g} {qps:8.1f} {p50:8.2f} {p95:8.2f} {fwd:8d}")
+        print()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""faiss index types: recall@k vs exact flat search, query latency, build time n index memory
+
+    python benchmarks/bench_faiss_index.py [--sizes 1000,10000,100000] [--types flat,hnsw,ivf,sq8,pq] [--k 10] [--queries 200]
+
+vectors are synthetic, embedding-shaped: unit-normalized gaussian clusters in 384 dims (pure random vectors
+have no neighbourhoods n make every ann index look bad). queries come from the same clusters n are sent
+one at a time, the way the bot searches. types that need more training vectors than a size has fall
+back to flat n are shown as such. index MB is the faiss index alone, total MB adds what VectorIndex keeps
+besides it -- sq8 / pq hold the normalized embeddings (4*dim bytes / vec) to rescore candidates, the other
+types read them back from the index
+"""
+import argparse
+import time
+import numpy as np
+from _common import Timer
+from vector_index import INDEX_TYPES, VectorIndex
+
+def clustered(n, dim, centers, rnd, spread=1.0): # spread 1 → same-cluster cosine ~0.5, like related segments
+    vecs = centers[rnd.integers(0, len(centers), n)] + spread * rnd.standard_normal((n, dim)).astype(np.float32)
+    return (vecs / np.linalg.norm(vecs, axis=1, keepdims=True)).astype(np.float32)
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--sizes', default="1000,10000,100000")
+    ap.add_argument('--types', default=",".join(INDEX_TYPES))
+    ap.add_argument('--k', type=int, default=10)
+    ap.add_argument('--queries', type=int, default=200)
+    ap.add_argument('--dim', type=int, default=384)
+    args = ap.parse_args()
+
+    rnd = np.random.default_rng(0)
+    print(f"{'segments':>8} {'type':>5} {'built':>5} {'build s':>8} {f'recall@{args.k}':>9} {'ms/query':>8} {'index MB':>8} {'total MB':>8}")
+    for n in map(int, args.sizes.split(",")):
+        centers = rnd.standard_normal((max(8, n // 100), args.dim)).astype(np.float32)
+        vecs = clustered(n, args.dim, centers, rnd)
+        qrys = clustered(args.queries, args.dim, centers, rnd)
+        truth = None
+
+        for kind in args.types.split(","):
+            vidx = VectorIndex(args.dim, kind)
+            with Timer() as build: vidx.add(vecs)
+            ids = []
+            start = time.perf_counter()
+            for qry in qrys: ids.append(vidx.search(qry[None, :], args.k)[1][0])
+            ms = (time.perf_counter() - start) * 1000 / len(qrys)
+            if truth is None: truth = ids if kind == "flat" else [np.argsort(-(vecs @ qry))[:args.k] for qry in qrys]
+            recall = np.mean([len(set(got) & set(exp)) / args.k for got, exp in zip(ids, truth)])
+            print(f"{n:8d} {kind:>5} {vidx.built_kind:>5} {build.ms/1000:8.2f} {recall:9.1%} {ms:8.3f} {vidx.memory_bytes()/2**20:8.1f} {vidx.resident_bytes()/2**20:8.1f}")
+        print()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""fuzzy matcher regression n speed: vectorized vocab matcher vs the old per-word char scan
+
+    python benchmarks/bench_fuzzy.py [--pages 1000] [--queries 200]
+
+regression set = real vocab words plus typo'd variants (drop / swap / substitute a letter),
+every query must match exactly the vocab words the old scalar _fuzzy_match accepted
+"""
+import argparse
+import random
+from _common import Timer, synthetic_text
+from lexical_index import FuzzyMatcher, WORD_RE
+
+def legacy_fuzzy_match(word1, word2, threshold=0.7):
+    if len(word1)<4 or len(word2)<4: return False
+    short_wrd, long_wrd = (word1, word2) if len(word1) <= len(word2) else (word2, word1)
+    return sum(1 for char in short_wrd if char in long_wrd) / len(short_wrd) >= threshold
+
+def typo(rnd, wrd):
+    i = rnd.randrange(len(wrd))
+    kind = rnd.choice(["drop", "swap", "sub"])
+    if kind == "drop": return wrd[:i] + wrd[i+1:]
+    if kind == "swap" and i < len(wrd) - 1: return wrd[:i] + wrd[i+1] + wrd[i] + wrd[i+2:]
+    return wrd[:i] + rnd.choice("abcdefghijklmnopqrstuvwxyz") + wrd[i+1:]
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--pages', type=int, default=1000)
+    ap.add_argument('--queries', type=int, default=200)
+    args = ap.parse_args()
+
+    vocab = sorted({w for w in WORD_RE.findall(synthetic_text(args.pages).lower()) if len(w) >= 4})
+    with Timer() as t: matcher = FuzzyMatcher(vocab)
+    print(f"vocab {len(vocab)} words, matcher build {t.ms:.1f} ms")
+
+    rnd = random.Random(7)
+    queries = [typo(rnd, w) if rnd.random() < 0.7 else w for w in rnd.sample(vocab, args.queries)]
+    queries += ["configuration", "installation", "performance", "troubleshooting"] # words not from the doc
+
+    old_ms = new_ms = 0.0
+    old_hits = new_hits = 0
+    for q in queries:
+        with Timer() as t: want = [w for w in vocab if legacy_fuzzy_match(q, w)]
+        old_ms += t.ms
+        matcher._cache.clear()
+        with Timer() as t: got = matcher.matches(q)
+        new_ms += t.ms
+        old_hits += len(want); new_hits += len(got)
+        assert sorted(got) == want or len(q) < 4, q
+    n = len(queries)
+    print(f"{n} queries  matches legacy {old_hits} / vectorized {new_hits}")
+    print(f"per query word: legacy scan {old_ms/n:.3f} ms   vectorized {new_ms/n:.3f} ms")
+
+if __name__ == "__main__":
+    main()
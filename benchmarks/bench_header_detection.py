@@ -0,0 +1,62 @@
+"""header analysis + sectioning on a 100k-line text: per-pattern re.match / list lookups / += vs the single pass
+
+    python benchmarks/bench_header_detection.py [--lines 100000]
+"""
+import argparse
+import re
+from _common import Timer, synthetic_text
+from document_processor import DocumentProcessor
+
+def legacy_header_score(procsr, line, pos, all_lines):
+    score = 0.0
+    for pp in procsr.header_patterns:
+        if re.match(pp, line): score += 0.3
+    if len(line)<60: score += 0.2
+    elif len(line)<30: score+=0.3
+    if pos>0 and pos<len(all_lines) - 1:
+        prev_line = all_lines[pos - 1] if pos > 0 else ""
+        next_line = all_lines[pos + 1] if pos < len(all_lines) - 1 else ""
+        if len(prev_line) == 0: score += 0.2
+        if len(next_line)>len(line)*1.5: score += 0.2
+    words = line.split()
+    if words:
+        caps_ratio = sum(1 for wrd in words if wrd[0].isupper())/len(words)
+        if caps_ratio > 0.5: score += 0.2
+    if len(line)>100: score *= 0.5
+    return min(score, 1.0)
+
+def legacy_extract_sections(procsr, txt):
+    lines = [ll.strip() for ll in txt.split('\n') if ll.strip()]
+    hdrz = [{'line': ll, 'position': i} for i, ll in enumerate(lines) if legacy_header_score(procsr, ll, i, lines) > 0.3]
+    lines = [ll.strip() for ll in txt.split('\n') if ll.strip()]
+    sections = []
+    curr_section = {"title": "Document Start", "content": "", "start_line": 0}
+    hdr_posz = [h['position'] for h in hdrz]
+    for i,ll in enumerate(lines):
+        if i in hdr_posz:
+            if curr_section["content"].strip(): sections.append(curr_section)
+            curr_section = {"title": ll, "content": "", "start_line": i}
+        else: curr_section["content"] += ll + " "
+    if curr_section["content"].strip(): sections.append(curr_section)
+    return sections
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--lines', type=int, default=100_000)
+    ap.add_argument('--legacy-lines', type=int, default=20_000, help="the old list lookup is quadratic, cap its input")
+    args = ap.parse_args()
+
+    procsr = DocumentProcessor()
+    for n in sorted({min(args.legacy_lines, args.lines), args.lines}):
+        txt = synthetic_text(n // 40 + 1)
+        txt = "\n".join(txt.split("\n")[:n])
+        with Timer() as t: new = procsr.extract_sections(txt)
+        line = f"{n:7d} lines  single pass {t.ms:9.1f} ms ({len(new)} sections)"
+        if n <= args.legacy_lines:
+            with Timer() as t: old = legacy_extract_sections(procsr, txt)
+            assert new == old
+            line += f"   legacy {t.ms:9.1f} ms"
+        print(line)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+"""repeat-upload latency: full segment + embed vs loading the on-disk index cache
+
+    python benchmarks/bench_index_cache.py [--pages 300]
+"""
+import argparse
+import tempfile
+from _common import Timer, synthetic_text
+from document_processor import DocumentProcessor
+from index_cache import IndexCache
+from vector_search import VectorSearch
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--pages', type=int, default=300)
+    args = ap.parse_args()
+
+    txt = synthetic_text(args.pages)
+    pdf_bytes = txt.encode() # stands in for the downloaded file, only the hash matters here
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cache = IndexCache(cache_dir, 200*1024*1024)
+        key = cache.key_for(pdf_bytes)
+
+        with Timer() as t:
+            assert cache.get(key) is None
+            segments = DocumentProcessor().segment_text(txt)
+            vs = VectorSearch()
+            vs.create_embeddings(segments)
+        print(f"miss: segment + embed {len(segments)} segments   {t.ms:9.1f} ms")
+
+        with Timer() as t: cache.put(key, vs, {"segments": len(segments), "segmentation_type": "universal", "search_type": "universal"})
+        print(f"put:                                  {t.ms:9.1f} ms")
+
+        with Timer() as t: loaded, info = cache.get(key)
+        print(f"hit:  load from cache                 {t.ms:9.1f} ms")
+        assert list(loaded.segments) == list(vs.segments) and loaded.search("section overview") == vs.search("section overview")
+        print(cache.stats())
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""question latency while other users upload pdfs, inline ingestion vs IngestQueue
+
+    python benchmarks/bench_ingest_queue.py [--uploads 4] [--pages 400]
+
+handlers are driven through a 2 thread pool, same as telebot's default threaded polling, against
+an in-process fake telegram api; pdf extraction is replaced by synthetic text so the cost is the
+real segmentation + embedding path
+"""
+import argparse
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from _common import synthetic_pages, synthetic_text
+from _fakes import FakeBot, FakeAI, text_message, document_message
+from bot_handlers import BotHandlers
+from document_processor import DocumentProcessor
+from ingest_queue import IngestQueue
+from vector_search import VectorSearch
+
+class SyntheticDocs(DocumentProcessor):
+    def __init__(self, pages):
+        super().__init__()
+        self.pages = list(synthetic_pages(pages))
+    def count_pages(self, file_path): return len(self.pages)
+    def iter_pages(self, file_path): return iter(self.pages)
+
+def run(use_queue, args):
+    bot = FakeBot(api_latency=0.005)
+    user_sess, user_prefs = {}, {}
+    ready = VectorSearch()
+    ready.create_embeddings(DocumentProcessor().segment_text(synthetic_text(20)))
+    user_sess[0] = ready # user 0 already has a document n keeps asking questions
+
+    iq = IngestQueue(workers=2, max_per_user=2, max_pending=32) if use_queue else None
+    handlers = BotHandlers(bot, SyntheticDocs(args.pages), FakeAI(), user_sess, user_prefs, ingest_queue=iq)
+    polling = ThreadPoolExecutor(2) # telebot default: threaded=True, num_threads=2
+
+    for u in range(1, args.uploads + 1): polling.submit(handlers.handle_document, document_message(u))
+    time.sleep(0.05)
+
+    lat = []
+    for i in range(args.questions):
+        t0 = time.perf_counter()
+        polling.submit(handlers.handle_question, text_message(0, f"what about section {i}")).result()
+        lat.append((time.perf_counter() - t0) * 1000)
+    polling.shutdown(wait=True)
+    while iq and iq.pending(): time.sleep(0.05)
+    return lat
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--uploads', type=int, default=4)
+    ap.add_argument('--pages', type=int, default=400)
+    ap.add_argument('--questions', type=int, default=10)
+    args = ap.parse_args()
+
+    for name, use_queue in [("inline", False), ("ingest queue", True)]:
+        lat = run(use_queue, args)
+        print(f"{name:13s} question latency during {args.uploads} uploads: "
+              f"median {statistics.median(lat):8.1f} ms   max {max(lat):8.1f} ms")
+
+if __name__ == "__main__":
+    main()
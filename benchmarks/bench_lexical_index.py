@@ -0,0 +1,85 @@
+"""per-query latency of fuzzy / section strategies, per-segment scan vs inverted index
+
+    python benchmarks/bench_lexical_index.py [--pages 1000] [--queries 20]
+
+legacy_* below are the pre-index implementations kept verbatim as the baseline,
+results are also compared so the speedup doesn't come from returning something else. keyword search
+is bm25 now n ranks differently on purpose -- see bench_bm25.py
+"""
+import argparse
+import re
+import random
+from _common import Timer, synthetic_text
+from document_processor import DocumentProcessor
+from segment_store import SegmentStore
+from vector_search import QueryAnalysis, VectorSearch
+
+def legacy_fuzzy_match(word1, word2, threshold=0.7):
+    if len(word1)<4 or len(word2)<4: return False
+    short_wrd, long_wrd = (word1, word2) if len(word1) <= len(word2) else (word2, word1)
+    return sum(1 for char in short_wrd if char in long_wrd) / len(short_wrd) >= threshold
+
+def legacy_fuzzy(vs, query, top_k):
+    qry_wrds = re.findall(r'\b[a-zA-Z]{4,}\b', query.lower())
+    resz = []
+    for i, sgmt in enumerate(vs.segments):
+        segment_lower = sgmt.lower()
+        score = 0
+        for qrywrd in qry_wrds:
+            if qrywrd in segment_lower: score += 1
+            else:
+                for sgmt_wrd in re.findall(r'\b[a-zA-Z]{4,}\b', segment_lower):
+                    if legacy_fuzzy_match(qrywrd, sgmt_wrd): score += 0.5; break
+        if score>0:
+            resz.append({"index": i, "score": score / len(qry_wrds), "type": "fuzzy"})
+    return sorted(resz, key=lambda x: x["score"], reverse=True)[:top_k]
+
+def legacy_section(vs, query, top_k):
+    qry_wrds = set(re.findall(r'\b[a-zA-Z]{3,}\b', query.lower()))
+    resz = []
+    for i, section_title in enumerate(vs.segments.iter_sections()):
+        section_title = section_title.lower()
+        if not section_title or section_title == "unknown": continue
+        section_words = set(re.findall(r'\b[a-zA-Z]{3,}\b', section_title))
+        total_score = len(qry_wrds.intersection(section_words)) + sum(1 for wrd in qry_wrds if wrd in section_title)*0.5
+        if total_score>0:
+            resz.append({"index": i, "score": total_score/len(qry_wrds) if qry_wrds else 0, "type": "section"})
+    return sorted(resz, key=lambda x: x["score"], reverse=True)[:top_k]
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--pages', type=int, default=1000)
+    ap.add_argument('--queries', type=int, default=20)
+    ap.add_argument('--skip-legacy-fuzzy', action='store_true', help="legacy fuzzy takes minutes on big docs")
+    args = ap.parse_args()
+
+    txt = synthetic_text(args.pages)
+    segments = DocumentProcessor().segment_text(txt)
+    vs = VectorSearch.__new__(VectorSearch) # lexical strategies only -- no embedding model needed
+    vs.segments = SegmentStore()
+    vs.segments.add(segments)
+    with Timer() as t: vs._build_lexical_index()
+    print(f"{args.pages} pages → {len(segments)} segments, {len(vs.lex_idx.postings)} terms, index build {t.ms:.0f} ms\n")
+
+    rnd = random.Random(1)
+    vocab = sorted(vs.lex_idx.vocabulary(min_len=5))
+    queries = [" ".join(rnd.sample(vocab, 3)) + " explained" for _ in range(args.queries)]
+
+    pairs = [("fuzzy", legacy_fuzzy, vs._fuzzy_search),
+             ("section", legacy_section, vs._section_search)]
+    for name, old, new in pairs:
+        skip_old = name == "fuzzy" and args.skip_legacy_fuzzy
+        old_ms = new_ms = 0.0
+        for q in queries:
+            with Timer() as t: got = new(QueryAnalysis(q, None), 5) # lexical strategies don't touch the embedding
+            new_ms += t.ms
+            if skip_old: continue
+            with Timer() as t: want = old(vs, q, 5)
+            old_ms += t.ms
+            assert [(r["index"], r["score"]) for r in got] == [(r["index"], r["score"]) for r in want], (name, q)
+        n = len(queries)
+        old_txt = "skipped" if skip_old else f"{old_ms/n:9.2f} ms"
+        print(f"{name:8s} legacy {old_txt}   indexed {new_ms/n:9.2f} ms / query")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""ollama client throughput at 1/10/100 concurrent questions against a local mock server
+
+    python benchmarks/bench_llm_clients.py [--questions 300] [--latency 0.05] [--levels 1,10,100]
+
+legacy = the old client: bare requests.post per question, a thread per in-flight question, new tcp conn each time
+pooled = OllamaClient.chat over its keep-alive session, still a thread per in-flight question
+async  = AIProcessor.agenerate_answer on one AsyncLoop, ollama_max_concurrency = level, no extra threads
+"""
+import argparse
+import asyncio
+import logging
+import threading
+import requests
+from concurrent.futures import ThreadPoolExecutor
+from _common import Timer
+from _fakes import MockOllama
+from ai_processor import AIProcessor
+from async_loop import AsyncLoop
+from ollama import OllamaClient
+
+MESSAGES = [{"role": "system", "content": "be brief"}, {"role": "user", "content": "what is in the document?"}]
+
+def legacy_call(base_url):
+    payload = OllamaClient(base_url)._build_payload("mock", MESSAGES, 500, 0.1)
+    preq = requests.post(f"{base_url}/api/generate", json=payload, timeout=60)
+    preq.raise_for_status()
+    return preq.json()
+
+def run_threads(fn, n, level):
+    with ThreadPoolExecutor(level) as pool:
+        with Timer() as t: list(pool.map(lambda _: fn(), range(n)))
+    return t.ms
+
+def run_async(base_url, n, level):
+    ai = AIProcessor(None, base_url, ollama_max_concurrency=level)
+    loop = AsyncLoop()
+    async def batch(): return await asyncio.gather(*(ai.agenerate_answer("q", ["ctx"], service="ollama", model="mock") for _ in range(n)))
+    threads = threading.active_count()
+    with Timer() as t: answers = loop.run(batch())
+    assert all(ans == "mock answer" for ans in answers), answers[:3]
+    loop.run(ai.ollama_client.aclose())
+    loop.stop()
+    return t.ms, threads
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--questions', type=int, default=300)
+    ap.add_argument('--latency', type=float, default=0.05, help="mock generate time, secs")
+    ap.add_argument('--levels', default="1,10,100")
+    args = ap.parse_args()
+    logging.getLogger().setLevel(logging.WARNING) # the clients log every request at info
+
+    mock = MockOllama(args.latency)
+    print(f"{args.questions} questions per run, mock generate latency {args.latency*1000:.0f} ms\n")
+    print(f"{'level':>5} {'client':>7} {'q/s':>8} {'total ms':>9} {'tcp conns':>9} {'threads':>7}")
+    for level in map(int, args.levels.split(",")):
+        n = max(args.questions, level)
+
+        mock.reset_counts()
+        ms = run_threads(lambda: legacy_call(mock.base_url), n, level)
+        print(f"{level:5d} {'legacy':>7} {n/(ms/1000):8.1f} {ms:9.0f} {mock.connections:9d} {level:7d}")
+
+        mock.reset_counts()
+        client = OllamaClient(mock.base_url, max_connections=level)
+        ms = run_threads(lambda: client.chat("mock", MESSAGES), n, level)
+        client.close()
+        print(f"{level:5d} {'pooled':>7} {n/(ms/1000):8.1f} {ms:9.0f} {mock.connections:9d} {level:7d}")
+
+        mock.reset_counts()
+        ms, threads = run_async(mock.base_url, n, level)
+        print(f"{level:5d} {'async':>7} {n/(ms/1000):8.1f} {ms:9.0f} {mock.connections:9d} {'1 loop':>7}")
+
+if __name__ == "__main__":
+    main()
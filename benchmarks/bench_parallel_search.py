@@ -0,0 +1,77 @@
+"""search strategies sequential vs on the shared pool: latency, budget drops n what they cost in recall
+
+    python benchmarks/bench_parallel_search.py [--noise-pages 400] [--users 1,8] [--tight-ms 5]
+
+same corpus n questions as bench_search_fusion, but w a bigger distractor doc so the lexical passes take
+real time. --users questions are asked at once from that many threads (the pool is shared by every
+session, so contention shows up as budget drops). modes: sequential, parallel waiting for everything,
+parallel w SEARCH_BUDGET_MS n parallel w a --tight-ms budget. the semantic shortcut is off so every
+question runs all four strategies
+"""
+import argparse
+import hashlib
+import json
+import os
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from _common import synthetic_text
+from config import SEARCH_BUDGET_MS
+from document_processor import DocumentProcessor
+from embedding_service import EmbeddingService
+from vector_search import VectorSearch
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+LEXICAL = ("keyword", "fuzzy", "section")
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--noise-pages', type=int, default=400)
+    ap.add_argument('--max-tokens', type=int, default=64)
+    ap.add_argument('--users', default="1,8")
+    ap.add_argument('--tight-ms', type=float, default=5)
+    ap.add_argument('--rounds', type=int, default=3)
+    args = ap.parse_args()
+
+    embedder = EmbeddingService()
+    embedder.load()
+    procsr = DocumentProcessor(count_tokens=embedder.count_tokens, max_tokens=args.max_tokens)
+    with open(os.path.join(FIXTURES, "search_queries.json"), encoding="utf-8") as f:
+        queries = json.load(f)
+
+    vs = VectorSearch(embedder, semantic_shortcut=0)
+    docs = [(name, open(os.path.join(FIXTURES, name), encoding="utf-8").read()) for name in sorted({q["doc"] for q in queries})]
+    docs.append(("noise", synthetic_text(args.noise_pages)))
+    for name, txt in docs:
+        doc_id = hashlib.sha256(txt.encode("utf-8")).hexdigest()
+        vs.start_document(doc_id, name)
+        vs.add_segments(procsr.segment_text(txt), doc_id)
+        vs.finish_document(doc_id)
+    embs = [vs.embed_query(q["query"]) for q in queries]
+    print(f"{len(vs.segments)} segments, {len(queries)} questions x {args.rounds} rounds\n")
+
+    modes = [("sequential", False, 0), ("parallel", True, 0), (f"budget {SEARCH_BUDGET_MS:g}ms", True, SEARCH_BUDGET_MS),
+             (f"budget {args.tight_ms:g}ms", True, args.tight_ms)]
+    print(f"{'users':>5} {'mode':>14} {'recall@5':>8} {'p50 ms':>7} {'p95 ms':>7} {'dropped':>7}  mean ms " + " ".join(f"{n:>8}" for n in ("semantic",) + LEXICAL))
+    for users in map(int, args.users.split(",")):
+        for label, parallel, budget in modes:
+            vs.parallel = parallel
+            vs.budgets_ms = {name: budget for name in LEXICAL}
+            def ask(i):
+                q = queries[i % len(queries)]
+                qa = vs.analyze(q["query"], embs[i % len(queries)])
+                start = time.perf_counter()
+                resz = vs._ranked(qa, 5) # no lock: nothing ingests here, so N threads stand in for N users' own corpora
+                ms = (time.perf_counter() - start) * 1000
+                return ms, any(q["answer"] in vs.segments[r["index"]] for r in resz), qa
+            with ThreadPoolExecutor(users) as askers:
+                runs = list(askers.map(ask, range(len(queries) * args.rounds)))
+            lat = sorted(ms for ms, _, _ in runs)
+            dropped = sum(len(qa.dropped) for _, _, qa in runs) / (len(runs) * len(LEXICAL))
+            means = [statistics.mean(qa.timings.get(name, 0) for _, _, qa in runs) for name in ("semantic",) + LEXICAL]
+            print(f"{users:5d} {label:>14} {sum(hit for _, hit, _ in runs)/len(runs):8.1%} {lat[len(lat)//2]:7.2f} {lat[int(len(lat)*0.95)]:7.2f} "
+                  f"{dropped:7.0%}          " + " ".join(f"{ms:8.2f}" for ms in means))
+        print()
+
+if __name__ == "__main__":
+    main()
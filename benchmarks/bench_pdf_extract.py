@@ -0,0 +1,51 @@
+"""pdf text extraction: legacy page loop with txt += vs page-parallel extract_text_with_pages
+
+    python benchmarks/bench_pdf_extract.py [--sizes 50 500 2000] [--workers 4]
+
+wall time is measured on a plain run, peak memory on a second run under tracemalloc (bot process only,
+pool workers hold one page range each n aren't included)
+"""
+import argparse
+import os
+import tempfile
+import tracemalloc
+import PyPDF2
+from _common import Timer, write_synthetic_pdf
+from document_processor import DocumentProcessor
+
+def legacy_extract(file_path):
+    with open(file_path, 'rb') as file:
+        pdf_reader = PyPDF2.PdfReader(file)
+        txt = ""
+        for pg in pdf_reader.pages:
+            txt += pg.extract_text() + "\n"
+        return txt
+
+def measure(fn):
+    with Timer() as t: res = fn()
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1] / (1024*1024)
+    tracemalloc.stop()
+    return res, t.ms, peak
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--sizes', type=int, nargs='+', default=[50, 500, 2000])
+    ap.add_argument('--workers', type=int, default=min(4, os.cpu_count() or 1))
+    args = ap.parse_args()
+
+    procsr = DocumentProcessor(extract_workers=args.workers, parallel_min_pages=1)
+    procsr._get_pool().submit(int).result() # warm the spawn pool so startup isn't billed to the first size
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in args.sizes:
+            path = os.path.join(tmp, f"synthetic_{n}.pdf")
+            write_synthetic_pdf(path, n)
+            old, old_ms, old_peak = measure(lambda: legacy_extract(path))
+            (new, offsets), new_ms, new_peak = measure(lambda: procsr.extract_text_with_pages(path))
+            assert new == old and len(offsets) == n
+            print(f"{n:5d} pages  legacy {old_ms:9.1f} ms {old_peak:7.1f} mb   parallel x{args.workers} {new_ms:9.1f} ms {new_peak:7.1f} mb")
+    procsr.close()
+
+if __name__ == "__main__":
+    main()
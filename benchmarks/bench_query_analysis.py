@@ -0,0 +1,64 @@
+"""cpu time per question with n without the query-embedding lru
+
+    python benchmarks/bench_query_analysis.py [--pages 50] [--questions 200] [--repeat 0.3] [--debug-every 5]
+
+one "question" = what the bot does for it: embed for the answer cache, search(), n every --debug-every-th
+question also /debug. --repeat is the share of questions that were asked before. cpu time is
+process_time, so on a cpu-only host the model forward passes dominate it
+"""
+import argparse
+import random
+import time
+from _common import synthetic_text
+from document_processor import DocumentProcessor
+from embedding_service import EmbeddingService
+from vector_search import VectorSearch
+
+def make_questions(n, repeat, seed=0):
+    rnd = random.Random(seed)
+    topics = ["system value", "user file", "process data", "the setup", "error codes", "file limits", "data export"]
+    asked = []
+    for i in range(n):
+        if asked and rnd.random() < repeat: asked.append(rnd.choice(asked))
+        else: asked.append(f"what does the manual say about {rnd.choice(topics)} in step {i}?")
+    return asked
+
+def run(cache_size, segments, questions, debug_every):
+    embedder = EmbeddingService(query_cache_size=cache_size)
+    embedder.load()
+    vs = VectorSearch(embedder)
+    vs.create_embeddings(segments)
+
+    forwards = 0
+    encode = embedder.encode
+    def counting_encode(texts, **kw):
+        nonlocal forwards
+        forwards += 1
+        return encode(texts, **kw)
+    embedder.encode = counting_encode
+
+    start = time.process_time()
+    for i, q in enumerate(questions):
+        qry_embedding = vs.embed_query(q) # answer cache lookup
+        vs.search(q, 5, qry_embedding=qry_embedding)
+        if i % debug_every == 0: vs.debug_search(q)
+    cpu_ms = (time.process_time() - start) * 1000
+    return cpu_ms / len(questions), forwards / len(questions)
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--pages', type=int, default=50)
+    ap.add_argument('--questions', type=int, default=200)
+    ap.add_argument('--repeat', type=float, default=0.3)
+    ap.add_argument('--debug-every', type=int, default=5)
+    args = ap.parse_args()
+
+    segments = DocumentProcessor().segment_text(synthetic_text(args.pages))
+    questions = make_questions(args.questions, args.repeat)
+    print(f"{len(segments)} segments, {len(questions)} questions ({len(set(questions))} distinct)\n")
+    for name, size in (("no lru", 0), ("lru 256", 256)):
+        cpu_ms, fwd = run(size, segments, questions, args.debug_every)
+        print(f"{name:8s} {cpu_ms:8.2f} ms cpu / question   {fwd:5.2f} model forwards / question")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""reranking before prompt assembly: what the fused top 5 costs in prompt tokens vs mmr / cross-encoder picks
+
+    python benchmarks/bench_rerank.py [--noise-pages 40] [--max-tokens 64] [--overlap-tokens 32] [--tight-ms 5]
+
+same corpus n questions as bench_search_fusion. segments are small n overlap, so one section's parts come
+back next to each other in the fused list. per mode: recall@5 (a returned segment contains the answer),
+segments n prompt tokens (the packer's estimate, as in the reranker's report) per answer, tokens saved vs the fused top 5, distinct
+sections per answer, rerank p50 / p95 ms n how often the cross-encoder missed its budget. cross modes are
+skipped when the model can't be loaded (no network for the first download)
+"""
+import argparse
+import hashlib
+import json
+import os
+from _common import synthetic_text
+from config import RERANK_BUDGET_MS, RERANK_CROSS_MODEL
+from document_processor import DocumentProcessor, approx_token_counts
+from embedding_service import EmbeddingService
+from reranker import Reranker
+from vector_search import VectorSearch
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--noise-pages', type=int, default=40)
+    ap.add_argument('--max-tokens', type=int, default=64)
+    ap.add_argument('--overlap-tokens', type=int, default=32)
+    ap.add_argument('--tight-ms', type=float, default=5, help="a cross-encoder budget it can't meet")
+    args = ap.parse_args()
+
+    embedder = EmbeddingService()
+    embedder.load()
+    procsr = DocumentProcessor(count_tokens=embedder.count_tokens, max_tokens=args.max_tokens, overlap_tokens=args.overlap_tokens)
+    with open(os.path.join(FIXTURES, "search_queries.json"), encoding="utf-8") as f:
+        queries = json.load(f)
+
+    vs = VectorSearch(embedder, parallel=False)
+    docs = [(name, open(os.path.join(FIXTURES, name), encoding="utf-8").read()) for name in sorted({q["doc"] for q in queries})]
+    docs.append(("noise", synthetic_text(args.noise_pages)))
+    for name, txt in docs:
+        doc_id = hashlib.sha256(txt.encode("utf-8")).hexdigest()
+        vs.start_document(doc_id, name)
+        vs.add_segments(procsr.segment_text(txt), doc_id)
+        vs.finish_document(doc_id)
+    embs = [vs.embed_query(q["query"]) for q in queries]
+    print(f"{len(vs.segments)} segments, {len(queries)} questions\n")
+
+    modes = [("fused top 5", Reranker("off")), ("mmr", Reranker("mmr")), ("mmr lambda .5", Reranker("mmr", lambda_=0.5)),
+             ("mmr no floor", Reranker("mmr", min_rel=0)), ("mmr no dedup", Reranker("mmr", dup_sim=1.0))]
+    cross = Reranker("cross", budget_ms=60_000) # warm-up: loads the model, n tells whether it can be loaded at all
+    try:
+        cross._cross_scores("warm up", ["the model loads on first use"])
+        modes += [(f"cross {RERANK_BUDGET_MS:g}ms", Reranker("cross")), (f"cross {args.tight_ms:g}ms", Reranker("cross", budget_ms=args.tight_ms))]
+        for _, r in modes[-2:]: r._cross = cross._cross
+    except Exception as e: print(f"cross-encoder {RERANK_CROSS_MODEL} unavailable, cross modes skipped: {e}\n")
+
+    print(f"{'mode':>14} {'recall@5':>8} {'segments':>8} {'tokens':>7} {'saved':>6} {'sections':>8} {'p50 ms':>7} {'p95 ms':>7} {'late':>5}")
+    for label, reranker in modes:
+        vs.reranker = reranker
+        hits = n_segs = n_tokens = n_sections = 0
+        lat, saved, late = [], 0, 0
+        for q, emb in zip(queries, embs):
+            report = {}
+            texts = vs.search(q["query"], 5, qry_embedding=emb, report=report)
+            hits += any(q["answer"] in txt for txt in texts)
+            n_segs += len(texts)
+            n_tokens += sum(approx_token_counts(texts))
+            n_sections += len({vs.segments.section(vs.segments.index(txt)) for txt in texts})
+            if report:
+                lat.append(report["ms"])
+                saved += report["tokens_saved"]
+                late += report["relevance"].startswith("cross ")
+        n = len(queries)
+        lat.sort()
+        ms = f"{lat[len(lat)//2]:7.2f} {lat[int(len(lat)*0.95)]:7.2f}" if lat else f"{'-':>7} {'-':>7}"
+        print(f"{label:>14} {hits/n:8.1%} {n_segs/n:8.1f} {n_tokens/n:7.0f} {saved/n:6.0f} {n_sections/n:8.1f} {ms} {late/n:5.0%}")
+
+if __name__ == "__main__":
+    main()
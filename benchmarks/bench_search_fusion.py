@@ -0,0 +1,81 @@
+"""search fusion: recall@5, mrr n latency of the old first-seen merge vs weighted rrf (w n w/o the semantic shortcut)
+
+    python benchmarks/bench_search_fusion.py [--noise-pages 40] [--max-tokens 64] [--runs 5]
+
+one corpus, the way a user builds it: the three fixture docs plus a synthetic --noise-pages document as
+distractor. questions in fixtures/search_queries.json are paraphrased n each names a phrase the answering
+segment contains; a query is a hit when one of the top 5 segments contains it. legacy_search below is the
+pre-fusion merge kept verbatim (semantic top_k*2, concatenate, keep first copy, sort on raw scores)
+"""
+import argparse
+import hashlib
+import json
+import os
+import time
+from _common import synthetic_text
+from document_processor import DocumentProcessor
+from embedding_service import EmbeddingService
+from vector_search import VectorSearch
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+def legacy_search(vs, qa, top_k):
+    all_resz = vs._semantic_search(qa, top_k * 2) + vs._keyword_search(qa, top_k) + vs._fuzzy_search(qa, top_k) + vs._section_search(qa, top_k)
+    seen_idxs = set()
+    final_res = []
+    for res in all_resz:
+        if res["index"] not in seen_idxs:
+            final_res.append(res)
+            seen_idxs.add(res["index"])
+    final_res.sort(key=lambda x: x["score"], reverse=True)
+    return final_res[:top_k]
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--noise-pages', type=int, default=40)
+    ap.add_argument('--max-tokens', type=int, default=64, help="segment size -- small, so answers compete w their neighbours")
+    ap.add_argument('--runs', type=int, default=5, help="timing repeats per query")
+    args = ap.parse_args()
+
+    embedder = EmbeddingService()
+    embedder.load()
+    procsr = DocumentProcessor(count_tokens=embedder.count_tokens, max_tokens=args.max_tokens)
+    with open(os.path.join(FIXTURES, "search_queries.json"), encoding="utf-8") as f:
+        queries = json.load(f)
+
+    vs = VectorSearch(embedder, parallel=False) # fusion only -- bench_parallel_search times the concurrent mode
+    docs = [(name, open(os.path.join(FIXTURES, name), encoding="utf-8").read()) for name in sorted({q["doc"] for q in queries})]
+    docs.append(("noise", synthetic_text(args.noise_pages)))
+    for name, txt in docs:
+        doc_id = hashlib.sha256(txt.encode("utf-8")).hexdigest()
+        vs.start_document(doc_id, name)
+        vs.add_segments(procsr.segment_text(txt), doc_id)
+        vs.finish_document(doc_id)
+    missing = [q["answer"] for q in queries if not any(q["answer"] in seg for seg in vs.segments)]
+    if missing: print(f"answers split across segments, can't be hit: {missing}")
+    print(f"{len(vs.segments)} segments ({', '.join(name for name, _ in docs)}), {len(queries)} questions\n")
+
+    qas = [vs.analyze(q["query"]) for q in queries] # embeddings computed once, modes time only the ranking
+    modes = [("legacy merge", legacy_search, 0), ("rrf", None, 0), ("rrf + shortcut", None, vs.semantic_shortcut)]
+    print(f"{'mode':>15} {'recall@5':>8} {'mrr':>6} {'p50 ms':>7} {'p95 ms':>7} {'shortcut':>8}")
+    for label, func, shortcut in modes:
+        vs.semantic_shortcut = shortcut
+        func = func or vs._ranked
+        hits = rr = shortcuts = 0
+        lat = []
+        for q, qa in zip(queries, qas):
+            for _ in range(args.runs):
+                start = time.perf_counter()
+                resz = func(vs, qa, 5) if func is legacy_search else func(qa, 5)
+                lat.append((time.perf_counter() - start) * 1000)
+            texts = [vs.segments[r["index"]] for r in resz]
+            rank = next((pos for pos, txt in enumerate(texts, 1) if q["answer"] in txt), None)
+            hits += rank is not None
+            rr += 1 / rank if rank else 0
+            shortcuts += bool(resz) and resz[0]["type"] == "semantic" and func is not legacy_search
+        lat.sort()
+        print(f"{label:>15} {hits/len(queries):8.1%} {rr/len(queries):6.3f} {lat[len(lat)//2]:7.2f} {lat[int(len(lat)*0.95)]:7.2f} "
+              f"{shortcuts/len(queries):8.0%}")
+
+if __name__ == "__main__":
+    main()
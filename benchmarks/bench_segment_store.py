@@ -0,0 +1,73 @@
+"""segment storage: per-session memory of list-of-str + list-of-dict vs the columnar SegmentStore
+
+    python benchmarks/bench_segment_store.py [--pages 200,1000,5000]
+
+measured w tracemalloc (python heap only, embeddings n faiss are the same for both n left out).
+"ingest" is the old layout as built from a fresh upload -- texts shared between the two lists, section
+titles shared between a section's parts. "reload" is the old layout after a cache hit / session reload:
+json gives every dict its own text n section copy. "mmap" is SegmentStore.load(mmap=True). also timed, best
+of 7, for the list / the store in ram / the mapped store: reading every text back (lexical index rebuild) n
+a top-5 fetch (every question) -- the store pays a utf-8 decode per text the list doesn't
+"""
+import argparse
+import json
+import tempfile
+import timeit
+import tracemalloc
+from _common import synthetic_text
+from document_processor import DocumentProcessor
+from segment_store import SegmentStore
+
+def traced(build):
+    tracemalloc.start()
+    obj = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return obj, size
+
+def best(fn, number: int) -> float: # secs per call
+    return min(timeit.repeat(fn, number=number, repeat=7)) / number
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--pages', default="200,1000,5000")
+    args = ap.parse_args()
+
+    procsr = DocumentProcessor()
+    print(f"{'pages':>5} {'segments':>8} {'text MB':>7} {'ingest MB':>9} {'reload MB':>9} {'store MB':>8} {'mmap MB':>7} {'iter ms list/ram/mmap':>21} {'top5 us list/ram/mmap':>21}")
+    for pages in map(int, args.pages.split(",")):
+        txt = synthetic_text(pages)
+        segments = procsr.segment_text(txt)
+        blob = json.dumps(segments)
+        text_mb = sum(len(seg["text"].encode("utf-8")) for seg in segments) / 2**20
+
+        def ingested(): # what _append kept: the processor's dicts + a list of their texts
+            segs = procsr.segment_text(txt)
+            return [seg["text"] for seg in segs], segs
+        def reloaded():
+            mtdt = json.loads(blob)
+            return [m["text"] for m in mtdt], mtdt
+        def columnar():
+            store = SegmentStore()
+            store.add(segments)
+            return store
+
+        old, old_ingest = traced(ingested)
+        _, old_reload = traced(reloaded)
+        store, new = traced(columnar)
+        with tempfile.TemporaryDirectory() as tmp:
+            store.save(tmp)
+            mapped, mmap_size = traced(lambda: SegmentStore.load(tmp, mmap=True))
+
+            texts = old[0]
+            rows = list(range(0, len(segments), max(1, len(segments) // 5)))[:5]
+            iters = [best(lambda: sum(len(t) for t in seq), 3) * 1e3 for seq in (texts, store, mapped)]
+            tops = [best(lambda: [seq[i] for i in rows], 2000) * 1e6 for seq in (texts, store, mapped)]
+            assert list(mapped) == texts and [mapped.metadata(i) for i in range(len(mapped))] == segments
+            del mapped
+
+        print(f"{pages:5d} {len(segments):8d} {text_mb:7.1f} {old_ingest/2**20:9.1f} {old_reload/2**20:9.1f} {new/2**20:8.1f} {mmap_size/2**20:7.2f} "
+              f"{'/'.join(f'{ms:.1f}' for ms in iters):>21} {'/'.join(f'{us:.2f}' for us in tops):>21}")
+
+if __name__ == "__main__":
+    main()
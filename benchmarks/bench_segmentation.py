@@ -0,0 +1,70 @@
+"""segmentation regression check + ingest timing on fixture documents
+
+    python benchmarks/bench_segmentation.py            # check against fixtures/expected_segments.json
+    python benchmarks/bench_segmentation.py --update   # re-record after an intended segmentation change
+
+fails (exit 1) if structured segmentation silently falls back to the simple splitter, or if segment
+counts / section titles drift from the recorded ones, or if ingest of the big synthetic doc blows its budget
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+from _common import Timer, synthetic_text
+from document_processor import DocumentProcessor
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+EXPECTED = os.path.join(FIXTURES, "expected_segments.json")
+
+class WarningCounter(logging.Handler):
+    def __init__(self):
+        super().__init__(logging.WARNING)
+        self.records = []
+    def emit(self, record): self.records.append(record.getMessage())
+
+def summarize(segments):
+    return {"segments": len(segments), "sections": [seg["section"] for seg in segments]}
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--update', action='store_true')
+    ap.add_argument('--pages', type=int, default=1000)
+    ap.add_argument('--budget-ms', type=float, default=10_000, help="max segmentation time for the synthetic doc")
+    args = ap.parse_args()
+
+    warnings = WarningCounter()
+    logging.getLogger("document_processor").addHandler(warnings)
+    procsr = DocumentProcessor()
+    failures = []
+
+    got = {}
+    for fn in sorted(os.listdir(FIXTURES)):
+        if not fn.endswith(".txt"): continue
+        with open(os.path.join(FIXTURES, fn), encoding="utf-8") as f: txt = f.read()
+        with Timer() as t: segments = procsr.segment_text(txt)
+        got[fn] = summarize(segments)
+        fallback = [seg for seg in segments if seg["type"] == "simple"]
+        print(f"{fn:14s} {len(segments):3d} segments  {t.ms:7.2f} ms")
+        if fallback: failures.append(f"{fn}: fell back to simple segmentation")
+
+    if args.update:
+        with open(EXPECTED, "w", encoding="utf-8") as f: json.dump(got, f, indent=2)
+        print(f"recorded {EXPECTED}")
+    else:
+        with open(EXPECTED, encoding="utf-8") as f: expected = json.load(f)
+        for fn, want in expected.items():
+            if got.get(fn) != want: failures.append(f"{fn}: expected {want}, got {got.get(fn)}")
+
+    txt = synthetic_text(args.pages)
+    with Timer() as t: segments = procsr.segment_text(txt)
+    print(f"synthetic {args.pages} pages: {len(segments)} segments in {t.ms:.0f} ms (budget {args.budget_ms:.0f} ms)")
+    if t.ms > args.budget_ms: failures.append(f"synthetic ingest took {t.ms:.0f} ms")
+    if any(seg["type"] == "simple" for seg in segments): failures.append("synthetic doc fell back to simple segmentation")
+
+    failures += [f"warning logged: {msg}" for msg in warnings.records]
+    for fl in failures: print(f"FAIL {fl}")
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""session store: memory held by idle users' indexes n the cost of bringing one back from disk
+
+    python benchmarks/bench_session_store.py [--users 40] [--pages 30] [--budget-mb 20] [--questions 400]
+
+every user uploads one --pages document, then questions arrive from users picked zipf-like (a few busy users,
+a long idle tail). compared: the old plain dict vs SessionStore w --budget-mb. reported: sessions n estimated
+bytes resident, process rss, evictions, reload latency n whether reloaded sessions answer exactly as before
+"""
+import argparse
+import random
+import tempfile
+import time
+from _common import rss_mb, synthetic_text
+from document_processor import DocumentProcessor
+from embedding_service import EmbeddingService
+from session_store import SessionStore
+from vector_search import VectorSearch
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--users', type=int, default=40)
+    ap.add_argument('--pages', type=int, default=30)
+    ap.add_argument('--budget-mb', type=float, default=20)
+    ap.add_argument('--questions', type=int, default=400)
+    args = ap.parse_args()
+
+    embedder = EmbeddingService()
+    embedder.load()
+    procsr = DocumentProcessor()
+    docs = [procsr.segment_text(synthetic_text(args.pages, seed=uid + 1)) for uid in range(args.users)]
+    rnd = random.Random(0)
+    weights = [1 / (rank + 1) for rank in range(args.users)]
+    asks = rnd.choices(range(args.users), weights, k=args.questions)
+    qry = "what does the manual say about the system value"
+    qry_embedding = embedder.encode_query(qry)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, budget in (("dict", None), (f"store {args.budget_mb:g} MB", args.budget_mb)):
+            rss0 = rss_mb()
+            sess = {} if budget is None else SessionStore(tmp, int(budget * 1024 * 1024), embedder)
+            expected = {}
+            for uid, segments in enumerate(docs):
+                vs = VectorSearch(embedder)
+                vs.start_document(f"{uid:064x}", f"doc{uid}.pdf")
+                vs.add_segments([dict(seg) for seg in segments], f"{uid:064x}")
+                vs.finish_document(f"{uid:064x}")
+                expected[uid] = vs.search(qry, 5, qry_embedding=qry_embedding)
+                sess[uid] = vs
+
+            lat, same = [], 0
+            for uid in asks:
+                start = time.perf_counter()
+                vs = sess[uid]
+                res = vs.search(qry, 5, qry_embedding=qry_embedding)
+                lat.append((time.perf_counter() - start) * 1000)
+                same += res == expected[uid]
+            lat.sort()
+
+            resident = len(sess) if budget is None else sess.stats()["resident"]
+            est = sum(sess[uid].memory_bytes() for uid in range(args.users)) if budget is None else sess.stats()["bytes"]
+            print(f"{label}: {resident}/{args.users} sessions resident, ~{est/2**20:.1f} MB estimated, rss {rss_mb() - rss0:+.1f} MB")
+            print(f"   question p50 {lat[len(lat)//2]:.2f} ms, p95 {lat[int(len(lat)*0.95)]:.2f} ms, max {lat[-1]:.2f} ms, "
+                  f"{same}/{len(asks)} answers identical to before any spill")
+            if budget is not None:
+                st = sess.stats()
+                print(f"   {st['evictions']} evictions, {st['reloads']} reloads, avg reload {st['avg_reload_ms']:.1f} ms\n")
+            del sess, vs
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+"""rss n session-creation latency as VectorSearch sessions go 1 → 500
+
+    python benchmarks/bench_shared_model.py [--legacy-max 3]
+
+shared mode borrows the process-wide EmbeddingService, legacy mode gives every session
+its own model copy (what VectorSearch did before) -- capped since each copy is ~90mb
+"""
+import argparse
+from _common import rss_mb, Timer
+from embedding_service import EmbeddingService, get_embedding_service
+from vector_search import VectorSearch
+
+SEGMENTS = [{"text": f"Section {i}\nsome sample text about topic {i} and its details", "section": f"Section {i}", "type": "complete_section"} for i in range(20)]
+
+def run(steps, make_embedder):
+    sessions = []
+    for target in steps:
+        with Timer() as t:
+            while len(sessions) < target:
+                vs = VectorSearch(make_embedder())
+                vs.create_embeddings(SEGMENTS)
+                sessions.append(vs)
+        print(f"  sessions={target:4d}  rss={rss_mb():8.1f} mb  last batch {t.ms:9.1f} ms")
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--legacy-max', type=int, default=3)
+    args = ap.parse_args()
+
+    base = rss_mb()
+    print(f"baseline rss: {base:.1f} mb")
+    with Timer() as t: get_embedding_service().load()
+    print(f"shared model load: {t.ms:.1f} ms, rss {rss_mb():.1f} mb\n")
+
+    print("shared embedding service:")
+    run([1, 10, 50, 100, 250, 500], get_embedding_service)
+
+    if args.legacy_max > 0:
+        print("\nlegacy (one model per session):")
+        run(list(range(1, args.legacy_max + 1)), EmbeddingService)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""time to first visible answer token, streaming vs one-shot answers, against a local fake ollama
+
+    python benchmarks/bench_streaming_answers.py [--users 1,20] [--first-token 0.5] [--token-delay 0.03] [--words 150]
+
+each user asks one question at the same time; "first token" is when the chat first shows answer text,
+"done" when the final answer lands. edits/answer shows the coalescing (one edit per token would be --words)
+"""
+import argparse
+import logging
+import statistics
+import time
+import _common # puts the repo root on sys.path
+from _fakes import FakeBot, MockOllama, text_message
+from ai_processor import AIProcessor
+from async_loop import AsyncLoop
+from bot_handlers import BotHandlers
+
+class StubSearch: # retrieval is not what's measured here
+    segments = ["some document content"]
+    docs = {}
+    def corpus_key(self, doc_ids=None): return None
+    def embed_query(self, query): return None
+    def search(self, query, top_k=5, qry_embedding=None, doc_ids=None, **kwargs): return ["some document content"]
+
+def run(mock, users, stream):
+    bot = FakeBot(api_latency=0.03)
+    loop = AsyncLoop()
+    ai = AIProcessor(None, mock.base_url, ollama_max_concurrency=users)
+    sess = {uid: StubSearch() for uid in range(users)}
+    prefs = {uid: {"ai_service": "ollama", "ollama_model": "mock"} for uid in range(users)}
+    handlers = BotHandlers(bot, None, ai, sess, prefs, llm_loop=loop, stream_answers=stream)
+
+    start = time.perf_counter()
+    for uid in range(users): handlers.answer_question(text_message(uid, "what is it about?"))
+    while loop.stats()["in_flight"] or loop.stats()["completed"] < users: time.sleep(0.01)
+
+    first, done, edits = [], [], []
+    for uid in range(users):
+        answer_evts = [ts for ts, chat, _, txt in bot.edits if chat == uid and "Answer (" in txt]
+        answer_evts += [ts for ts, chat, txt in bot.sent if chat == uid and "Answer (" in txt]
+        first.append(min(answer_evts) - start)
+        done.append(max(answer_evts) - start)
+        edits.append(len(answer_evts))
+    loop.run(ai.ollama_client.aclose())
+    loop.stop()
+    return first, done, edits
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--users', default="1,20")
+    ap.add_argument('--first-token', type=float, default=0.5, help="mock prompt eval time, secs")
+    ap.add_argument('--token-delay', type=float, default=0.03, help="mock secs per generated word")
+    ap.add_argument('--words', type=int, default=150)
+    args = ap.parse_args()
+    logging.getLogger().setLevel(logging.WARNING)
+
+    mock = MockOllama(args.first_token, response=" ".join(f"word{i}" for i in range(args.words)), token_delay=args.token_delay)
+    print(f"fake ollama: {args.first_token*1000:.0f} ms to first token, {args.token_delay*1000:.0f} ms/word, {args.words} words\n")
+    print(f"{'users':>5} {'mode':>8} {'first p50':>9} {'first max':>9} {'done p50':>8} {'edits/answer':>12}")
+    for users in map(int, args.users.split(",")):
+        for stream in (False, True):
+            first, done, edits = run(mock, users, stream)
+            print(f"{users:5d} {'stream' if stream else 'one-shot':>8} {statistics.median(first)*1000:7.0f}ms {max(first)*1000:7.0f}ms "
+                  f"{statistics.median(done)*1000:6.0f}ms {statistics.mean(edits):12.1f}")
+
+if __name__ == "__main__":
+    main()
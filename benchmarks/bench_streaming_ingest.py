@@ -0,0 +1,95 @@
+"""time-to-first-answer n peak memory: whole-document ingest vs streaming page batches
+
+    python benchmarks/bench_streaming_ingest.py [--pages 300] [--batch 10]
+
+runs BotHandlers._ingest_document against the fake telegram api with a synthetic pdf on disk;
+"first answer" is when user_sess first holds a searchable index for the uploader. also checks that
+the page batches come out w the same section titles n pages as one whole-document run
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+import tracemalloc
+from _common import Timer, synthetic_text, write_synthetic_pdf
+from _fakes import FakeBot, FakeAI, document_message
+from bot_handlers import BotHandlers
+from document_processor import DocumentProcessor
+from vector_search import VectorSearch
+
+class FileBot(FakeBot):
+    def __init__(self, path):
+        with open(path, "rb") as f: super().__init__(file_bytes=f.read())
+
+def legacy_ingest(procsr, path):
+    txt = procsr.extract_text_from_pdf(path)
+    vs = VectorSearch()
+    vs.create_embeddings(procsr.segment_text(txt))
+    return vs
+
+def section_runs(segments): # (title, page) of each run of segments from one section
+    runs = []
+    for seg in segments:
+        key = (seg["section"], seg.get("page"))
+        if not runs or runs[-1] != key: runs.append(key)
+    return runs
+
+def check_titles(procsr, pages, label):
+    txt = "".join(f"{pg}\n" for pg in pages) # how extract_text_with_pages joins them
+    page_offsets = [0]
+    for pg in pages[:-1]: page_offsets.append(page_offsets[-1] + len(pg) + 1)
+    whole = section_runs(procsr.segment_text(txt, page_offsets=page_offsets))
+    streamed = section_runs([seg for _, segs in procsr.iter_segments(pages) for seg in segs])
+    diff = next((i for i, (a, b) in enumerate(zip(whole, streamed)) if a != b), min(len(whole), len(streamed)))
+    ok = whole == streamed
+    print(f"section titles, {label}: {len(whole)} whole vs {len(streamed)} streamed, " + ("identical" if ok else
+          f"differ at #{diff}: {whole[diff:diff+1]} vs {streamed[diff:diff+1]}"))
+    return ok
+
+def headless_pages(batch): # one header, then nothing to carry -- the next batch opens w a short line that is no header
+    body = "\n".join(["the body of this page goes on with plain prose, not a header at all."] * 5)
+    pages = ["Introduction\n" + body] + [body] * (batch - 1)
+    return pages + ["this continues the discussion from the prior page\n" + body, body]
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--pages', type=int, default=300)
+    ap.add_argument('--batch', type=int, default=10)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "doc.pdf")
+        write_synthetic_pdf(path, args.pages)
+        procsr = DocumentProcessor(pages_per_batch=args.batch)
+        titles_ok = check_titles(procsr, procsr.extract_pages(path), "synthetic pdf")
+        titles_ok &= check_titles(procsr, headless_pages(args.batch), "continued batch")
+
+        tracemalloc.start()
+        with Timer() as t: vs = legacy_ingest(procsr, path)
+        peak = tracemalloc.get_traced_memory()[1] / (1024*1024)
+        tracemalloc.stop()
+        print(f"whole document: first answer after {t.ms:8.0f} ms, {len(vs.segments)} segments, peak {peak:.1f} mb")
+
+        user_sess = {}
+        handlers = BotHandlers(FileBot(path), procsr, FakeAI(), user_sess, {})
+        first = {}
+        def watch(t0):
+            while "t" not in first:
+                if user_sess.get(1) is not None and user_sess[1].search("overview"): first["t"] = time.perf_counter() - t0
+                time.sleep(0.005)
+        tracemalloc.start()
+        t0 = time.perf_counter()
+        watcher = threading.Thread(target=watch, args=(t0,), daemon=True)
+        watcher.start()
+        handlers.process_document(document_message(1))
+        total = time.perf_counter() - t0
+        peak = tracemalloc.get_traced_memory()[1] / (1024*1024)
+        tracemalloc.stop()
+        first.setdefault("t", total)
+        print(f"streaming x{args.batch}:  first answer after {first['t']*1000:8.0f} ms, "
+              f"fully indexed {total*1000:.0f} ms, {len(user_sess[1].segments)} segments, peak {peak:.1f} mb")
+    if not titles_ok: raise SystemExit("streaming segmentation diverged from the whole-document run")
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,97 @@
+import asyncio
+import hashlib
 import tempfile
 import os
+import time
 import logging
-from typing import Dict
+import threading
+from typing import Dict, List, Optional
 from telebot import types
+from reranker import get_reranker
 
 logger = logging.getLogger(__name__)
 
+PROGRESS_EDIT_INTERVAL = 3.0 # secs between "indexed X/Y pages" edits -- telegram flood limits
+STREAM_EDIT_INTERVAL = 1.0 # secs between edits of one streaming answer (telegram allows ~1 msg/s per chat)
+STREAM_EDITS_PER_SEC = 20 # bot-wide budget for streaming edits, under telegram's ~30 msgs/s per bot
+TELEGRAM_MAX_MSG = 4096
+
+class EditBudget:
+    """token bucket for streamed edits shared by all chats -- lives on the llm loop, so no locking"""
+    def __init__(self, rate: float):
+        self.rate = rate
+        self.tokens = rate
+        self.stamp = time.monotonic()
+    
+    def try_take(self) -> bool:
+        now = time.monotonic()
+        self.tokens = min(self.rate, self.tokens + (now - self.stamp)*self.rate)
+        self.stamp = now
+        if self.tokens < 1: return False
+        self.tokens -= 1
+        return True
+    
+    async def take(self): # for edits that must land (the final text)
+        while not self.try_take(): await asyncio.sleep(1/self.rate)
+
+class StreamEditor:
+    """turns a token stream into a few telegram edits: the first piece shows up right away, after that
+    edits are coalesced to one per STREAM_EDIT_INTERVAL n skipped while the bot-wide budget is spent"""
+    def __init__(self, handlers, message, question: str, ai_service: str, processing_msg, budget: EditBudget):
+        self.handlers = handlers
+        self.chat_id = message.chat.id
+        self.question = question
+        self.ai_service = ai_service
+        self.msg_id = processing_msg.message_id if processing_msg else None
+        self.budget = budget
+        self.parts = []
+        self.shown = False # any answer text on screen yet
+        self.last_txt = None
+        self.last_edit = 0.0
+        self.edits = 0
+    
+    async def feed(self, piece: str):
+        self.parts.append(piece)
+        if self.shown and time.monotonic() - self.last_edit < STREAM_EDIT_INTERVAL: return
+        if self.budget.try_take(): await self._push(partial=True)
+    
+    async def finish(self):
+        await self.budget.take()
+        await self._push(partial=False)
+    
+    async def _push(self, partial: bool):
+        txt = self.handlers._answer_txt(self.question, "".join(self.parts), self.ai_service)
+        if partial: txt = txt[:TELEGRAM_MAX_MSG - 4] + " ..."
+        txt = txt[:TELEGRAM_MAX_MSG]
+        if txt == self.last_txt: return # telegram rejects edits that change nothing
+        
+        self.last_edit = time.monotonic()
+        bot = self.handlers.bot
+        try: # telebot calls block -- keep them off the loop
+            if self.msg_id is None: self.msg_id = (await asyncio.to_thread(bot.send_message, self.chat_id, txt)).message_id
+            else: await asyncio.to_thread(bot.edit_message_text, txt, self.chat_id, self.msg_id)
+        except Exception as e:
+            if partial: logger.debug(f"stream edit failed: {e}"); return
+            raise
+        self.last_txt = txt
+        self.shown = True
+        self.edits += 1
+
 class BotHandlers:
-    def __init__(self, bot, doc_procsr, ai_procsr, user_sess: Dict, user_prefs: Dict):
+    def __init__(self, bot, doc_procsr, ai_procsr, user_sess: Dict, user_prefs: Dict, idx_cache=None, ingest_queue=None, llm_loop=None, stream_answers: bool = True, answer_cache=None):
         self.bot = bot
         self.doc_procsr = doc_procsr
         self.ai_procsr = ai_procsr
         self.user_sess = user_sess
         self.user_prefs = user_prefs
+        self.idx_cache = idx_cache
+        self.ingest_queue = ingest_queue
+        self.llm_loop = llm_loop # AsyncLoop: llm calls run there instead of blocking a polling thread
+        self.stream_answers = stream_answers # only with llm_loop -- answers are edited in as tokens arrive
+        self.edit_budget = EditBudget(STREAM_EDITS_PER_SEC)
+        self.answer_cache = answer_cache # AnswerCache shared by everyone: same pdf + near-same question → same answer
+        self.indexing_progress: Dict[int, tuple] = {} # uid → (pages indexed, total pages) while a pdf streams in
+        self._corpus_lock = threading.Lock()
     
     def get_user_ai_service(self, uid: int) -> str:
         return self.user_prefs.get(uid, {}).get('ai_service', 'groq')
@@ -34,7 +113,8 @@ Commands:
 /settings - choose AI service (Groq/Ollama)
 /models - list and switch ollama models
 /status - check ai services status
-/clear - clear current document
+/docs - list your documents, search one or remove it
+/clear - clear all your documents
 /help - show help
 /debug <your question> - debug search results
 
@@ -55,11 +135,29 @@ Let's get started! Use /settings to choose your AI, then send me a PDF file!
         uid = message.from_user.id
         if uid in self.user_sess:
             del self.user_sess[uid]
-        self.bot.send_message(message.chat.id, "|OK| Document Cleared. Send a new PDF to start over.")
+        self.user_prefs.get(uid, {}).pop('doc_filter', None)
+        self.bot.send_message(message.chat.id, "|OK| Documents Cleared. Send a new PDF to start over.")
+    
+    def handle_docs(self, message):
+        self.show_documents(message)
+    
+    def _corpus(self, uid: int) -> Optional["VectorSearch"]: # the user's corpus once it has anything searchable
+        vector_search = self.user_sess.get(uid)
+        return vector_search if vector_search is not None and vector_search.segments else None
+    
+    def _user_corpus(self, uid: int) -> "VectorSearch": # get or create -- two uploads of one user must land in the same corpus
+        from vector_search import VectorSearch
+        with self._corpus_lock:
+            if uid not in self.user_sess: self.user_sess[uid] = VectorSearch()
+            return self.user_sess[uid]
+    
+    def _doc_filter(self, uid: int, vector_search: "VectorSearch") -> Optional[List[str]]: # docs picked in /docs, None = all
+        doc_filter = [doc_id for doc_id in self.user_prefs.get(uid, {}).get('doc_filter', ()) if doc_id in vector_search.docs]
+        return doc_filter or None
     
     def handle_debug(self, message): # to see whats happening
         uid = message.from_user.id        
-        if uid not in self.user_sess: self.bot.send_message(message.chat.id, "Please upload a PDF document first!"); return
+        if not self._corpus(uid): self.bot.send_message(message.chat.id, "Please upload a PDF document first!"); return
         
         query = message.text.replace('/debug', '').strip() # extract query from msg | rm /debug cmd
         if not query: self.bot.send_message(message.chat.id, "Usage: /debug your search query here"); return
@@ -67,20 +165,30 @@ Let's get started! Use /settings to choose your AI, then send me a PDF file!
         vector_search = self.user_sess[uid]
         try:
             if hasattr(vector_search, 'debug_search'):
-                debug_info = vector_search.debug_search(query)        
+                debug_info = vector_search.debug_search(query, self._doc_filter(uid, vector_search))
                 debug_msg = f"Debug Search Results for: '{query}'\n\n"
                 debug_msg += f"Total segments: {debug_info.get('total_segments', 'unknown')}\n\n"
                 
                 if 'search_strategies' in debug_info:
                     for strat,resz in debug_info['search_strategies'].items():
                         debug_msg += f"{strat.upper()}: {resz.get('found', 0)} i,  s\n"
+                if debug_info.get('timings_ms'):
+                    debug_msg += "\nTimings: " + ", ".join(f"{strat} {ms:.1f} ms" for strat, ms in debug_info['timings_ms'].items())
+                    if debug_info.get('dropped'): debug_msg += f" (over budget, left out: {', '.join(debug_info['dropped'])})"
+                    debug_msg += "\n"
+                if debug_info.get('rerank'):
+                    rr = debug_info['rerank']
+                    debug_msg += f"Rerank ({rr['mode']}, {rr['relevance']} relevance): kept {rr['kept']} of {rr['candidates']}"
+                    if 'tokens_saved' in rr: debug_msg += f", {rr['tokens_before']} → {rr['tokens_after']} prompt tokens"
+                    debug_msg += "\n"
                 
                 debug_msg += "\nTop matches:\n"
                 if 'search_strategies' in debug_info:
                     for strat, resz in debug_info['search_strategies'].items():
                         if 'top_3' in resz:
                             for i,match in enumerate(resz['top_3'][:2]):  # show top 2
-                                debug_msg += f"{i+1}. {strat} - Score: {match['score']:.3f}\n"
+                                page_txt = f" (page {match['page']})" if match.get('page') else ""
+                                debug_msg += f"{i+1}. {strat} - Score: {match['score']:.3f}{page_txt}\n"
                                 debug_msg += f"   {match['preview']}\n\n"
                                 
                 if len(debug_msg)>4000: 
@@ -148,6 +256,54 @@ Let's get started! Use /settings to choose your AI, then send me a PDF file!
             self.bot.edit_message_text(f"Ollama model changed to: {model}\n\nYou can now upload a PDF document!", 
                                      call.message.chat.id, call.message.message_id)
             self.show_ai_settings_edit(call.message)
+        
+        elif data.startswith("docs_"):
+            vector_search = self.user_sess.get(uid)
+            action, _, prefix = data[len("docs_"):].partition("_")
+            doc_id = next((did for did in (vector_search.docs if vector_search else ()) if did.startswith(prefix)), None) if prefix else None
+            prefs = self.user_prefs.setdefault(uid, {})
+            
+            if action == "all":
+                prefs.pop('doc_filter', None)
+                self.bot.answer_callback_query(call.id, "Searching all documents")
+            elif doc_id is None:
+                self.bot.answer_callback_query(call.id, "That document is no longer in your library")
+            elif action == "only":
+                prefs['doc_filter'] = [doc_id]
+                self.bot.answer_callback_query(call.id, f"Searching only {vector_search.docs[doc_id]['name']}")
+            elif action == "rm":
+                if not vector_search.docs[doc_id]["complete"]:
+                    self.bot.answer_callback_query(call.id, "Still indexing that document, try again when it's done")
+                    return
+                name = vector_search.docs[doc_id]["name"]
+                removed = vector_search.remove_document(doc_id)
+                if doc_id in prefs.get('doc_filter', ()): prefs.pop('doc_filter')
+                self.bot.answer_callback_query(call.id, f"Removed {name} ({removed} segments)")
+            
+            txt, markup = self._documents_view(uid)
+            self.bot.edit_message_text(txt, call.message.chat.id, call.message.message_id, reply_markup=markup)
+    
+    def show_documents(self, message):
+        txt, markup = self._documents_view(message.from_user.id)
+        self.bot.send_message(message.chat.id, txt, reply_markup=markup)
+    
+    def _documents_view(self, uid: int):
+        vector_search = self.user_sess.get(uid)
+        if vector_search is None or not vector_search.docs: return "No documents yet. Send me a PDF to start your library.", None
+        
+        doc_filter = self._doc_filter(uid, vector_search) or []
+        txt = "Your Documents\n\n"
+        markup = types.InlineKeyboardMarkup()
+        for n, (doc_id, info) in enumerate(list(vector_search.docs.items()), 1):
+            state = "" if info["complete"] else " (indexing...)"
+            active = " <- searching only this" if doc_id in doc_filter else ""
+            txt += f"{n}. {info['name']} - {info['segments']} segments{state}{active}\n"
+            # callback data is capped at 64 bytes by telegram -- a 16 char prefix of the sha-256 is plenty per user
+            markup.row(types.InlineKeyboardButton(f"Search only {n}", callback_data=f"docs_only_{doc_id[:16]}"),
+                       types.InlineKeyboardButton(f"Remove {n}", callback_data=f"docs_rm_{doc_id[:16]}"))
+        txt += f"\nSearching: {'selected document' if doc_filter else 'all documents'}"
+        if doc_filter: markup.add(types.InlineKeyboardButton("Search all documents", callback_data="docs_all"))
+        return txt, markup
     
     def show_ai_settings(self, message):
         avail_services = self.ai_procsr.get_available_services()        
@@ -217,6 +373,13 @@ Available models:"""
                 status_msg += "\n"
         else: status_msg += "OLLAMA: Not available (not running or no models)\n"
         
+        mstats = self.ai_procsr.ollama_models.stats()
+        status_msg += f"   Model list checked {self._ago(mstats['age'])}"
+        if mstats['transitions']:
+            when, state = mstats['transitions'][-1]
+            status_msg += f", went {state} {self._ago(time.time() - when)} ({len(mstats['transitions'])} changes)"
+        status_msg += "\n"
+        
         uid = message.from_user.id
         curr_srvc = self.get_user_ai_service(uid)
         status_msg += f"\nYour current AI: {curr_srvc.upper()}"
@@ -225,11 +388,59 @@ Available models:"""
             curr_model = self.user_prefs.get(uid, {}).get('ollama_model', 'default')
             status_msg += f"\nYour current model: {curr_model}"
         
-        if uid in self.user_sess: status_msg += "\nDocument: Loaded and ready for questions"
-        else: status_msg += "\nDocument: No document loaded"
+        if uid in self.indexing_progress:
+            pages_done, n_pages = self.indexing_progress[uid]
+            status_msg += f"\nDocument: Indexing ({pages_done}/{n_pages} pages), indexed part is ready for questions"
+        elif self._corpus(uid): status_msg += f"\nDocuments: {len(self.user_sess[uid].docs)} loaded and ready for questions (/docs)"
+        else: status_msg += "\nDocuments: None loaded"
+        
+        if self.ingest_queue:
+            qstats = self.ingest_queue.stats()
+            status_msg += f"\nUploads being processed: {qstats['pending']} (yours: {self.ingest_queue.pending(uid)})"
+        
+        if self.llm_loop:
+            lstats = self.llm_loop.stats()
+            status_msg += f"\nQuestions being answered: {lstats['in_flight']} ({lstats['completed']} done, {lstats['failed']} failed)"
+        
+        if self.idx_cache:
+            cstats = self.idx_cache.stats()
+            status_msg += f"\n\nIndex cache: {cstats['hits']} hits / {cstats['misses']} misses"
+            status_msg += f"\n   {cstats['entries']} documents, {cstats['bytes']/(1024*1024):.1f} of {cstats['max_bytes']/(1024*1024):.0f} MB"
+        
+        if hasattr(self.user_sess, "stats"):
+            sstats = self.user_sess.stats()
+            status_msg += f"\n\nUser sessions: {sstats['resident']} in memory ({sstats['bytes']/(1024*1024):.1f} MB"
+            status_msg += f" of {sstats['max_bytes']/(1024*1024):.0f} MB), {sstats['spilled']} on disk" if sstats['max_bytes'] else ", no limit)"
+            if sstats['reloads']: status_msg += f"\n   {sstats['reloads']} reloads, avg {sstats['avg_reload_ms']:.0f} ms"
+        
+        ustats = self.ai_procsr.usage_stats() if hasattr(self.ai_procsr, "usage_stats") else []
+        if ustats:
+            status_msg += "\n\nLLM tokens per answer (prompt / completion):"
+            for u in ustats:
+                status_msg += f"\n   {u['service']}/{u['model']}: {u['avg_prompt_tokens']:.0f} / {u['avg_completion_tokens']:.0f} over {u['calls']} calls"
+                if u['avg_prefill_ms'] is not None: status_msg += f", prefill {u['avg_prefill_ms']:.0f} ms"
+                if u['trimmed']: status_msg += f", {u['trimmed']} cut to the {u['budget']} token budget"
+        
+        rstats = get_reranker().stats()
+        if rstats['reranked']:
+            status_msg += f"\n\nReranking ({rstats['mode']}): {rstats['reranked']} answers, avg {rstats['avg_ms']:.1f} ms"
+            status_msg += f"\n   ~{rstats['avg_tokens_saved']:.0f} prompt tokens saved per answer"
+            if rstats['cross_late']: status_msg += f", cross-encoder over budget {rstats['cross_late']}x"
+        
+        if self.answer_cache:
+            astats = self.answer_cache.stats()
+            status_msg += f"\n\nAnswer cache: {astats['hits']} hits / {astats['misses']} misses ({astats['hit_rate']:.0%})"
+            status_msg += f"\n   {astats['entries']} answers, ~{astats['saved_secs']:.0f}s of search + AI time saved"
         
         self.bot.send_message(message.chat.id, status_msg)
     
+    @staticmethod
+    def _ago(secs: float) -> str:
+        if secs == float("inf"): return "never"
+        if secs < 60: return f"{secs:.0f}s ago"
+        if secs < 3600: return f"{secs/60:.0f} min ago"
+        return f"{secs/3600:.1f} h ago"
+    
     def show_ai_settings_edit(self, message):
         avail_services = self.ai_procsr.get_available_services()
         markup = types.InlineKeyboardMarkup()
@@ -273,83 +484,159 @@ Choose your preferred service:"""
         
         processing_msg = self.bot.send_message(message.chat.id, f"Processing your PDF with {curr_srvc.upper()}... this might take a moment.")
         
+        if not self.ingest_queue: self._ingest_document(message, processing_msg, curr_srvc); return
+        
+        queued_ahead = self.ingest_queue.pending()
+        if not self.ingest_queue.submit(uid, self._ingest_document, message, processing_msg, curr_srvc):
+            self.bot.edit_message_text("|X| Too many PDFs are being processed right now. Please wait for your current upload to finish and try again.",
+                                       message.chat.id, processing_msg.message_id)
+            return
+        if queued_ahead: self._report_progress(message, processing_msg, f"Queued behind {queued_ahead} other upload(s)... your PDF will be processed shortly.")
+    
+    def _report_progress(self, message, processing_msg, txt: str): # best effort -- never let a failed edit kill the job
+        try: self.bot.edit_message_text(txt, message.chat.id, processing_msg.message_id)
+        except Exception as e: logger.debug(f"progress edit failed: {e}")
+    
+    def _ingest_document(self, message, processing_msg, curr_srvc: str): # runs on an ingest worker when the queue is enabled
+        uid = message.from_user.id
+        pinned = hasattr(self.user_sess, "pin") # SessionStore: the corpus must stay in ram while batches stream into it
+        if pinned: self.user_sess.pin(uid)
+        try: self._ingest(message, processing_msg, curr_srvc)
+        finally:
+            if pinned: self.user_sess.unpin(uid)
+    
+    def _ingest(self, message, processing_msg, curr_srvc: str):
+        uid = message.from_user.id
         try:
+            self._report_progress(message, processing_msg, f"Processing your PDF with {curr_srvc.upper()}...\nDownloading file...")
             file_info = self.bot.get_file(message.document.file_id)
             file = self.bot.download_file(file_info.file_path)
+            doc_id = hashlib.sha256(file).hexdigest()
+            file_name = message.document.file_name
+            
+            corpus = self._user_corpus(uid)
+            already_txt = f"|OK| {file_name} is already in your documents, nothing to do. See /docs."
+            if doc_id in corpus.docs:
+                self.bot.edit_message_text(already_txt, message.chat.id, processing_msg.message_id)
+                return
+            
+            # the index depends on the bytes, how they were segmented n which model embedded them
+            doc_key = self.idx_cache.key_for(file, f"{self.doc_procsr.chunking_key},{corpus.model.cache_key}") if self.idx_cache else None
+            cached = self.idx_cache.get(doc_key) if self.idx_cache else None
+            if cached: # same pdf bytes seen before → merge its stored index, no extraction or embedding
+                vector_search, info = cached
+                if not corpus.add_document_index(vector_search, doc_id, file_name):
+                    self.bot.edit_message_text(already_txt, message.chat.id, processing_msg.message_id)
+                    return
+                self.bot.edit_message_text(self._doc_ready_txt(curr_srvc, info['segments'], f"{info['segmentation_type']}, cached", info['search_type'], file_name, len(corpus.docs)),
+                                           message.chat.id, processing_msg.message_id)
+                return
             
             with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp_file:
                 tmp_file.write(file)
                 tmp_file_path = tmp_file.name
             
-            txt = self.doc_procsr.extract_text_from_pdf(tmp_file_path)
-            os.unlink(tmp_file_path)
-            
-            if not txt.strip():
-                self.bot.edit_message_text("|X| Couldn't extract text from this pdf. The file might be image-based or corrupted.", message.chat.id, processing_msg.message_id)
-                return
-            
-            segmentation_type = "unknown"
-            try: # try universal / mixed , if fials → simple
-                segments = self.doc_procsr.segment_text(txt)
-                segmentation_type = "universal"
-                
-                try:
-                    from vector_search import VectorSearch
-                    vector_search = VectorSearch()
-                    vector_search.create_embeddings(segments)
-                    search_type = "universal"
-                except ImportError:
-                    from vector_search import VectorSearch
-                    vector_search = VectorSearch()
-                    smp_sgmts = [seg["text"] if isinstance(seg, dict) else seg for seg in segments] # convert sgmts to simple strs for compat-ty
-                    vector_search.create_embeddings_simple(smp_sgmts)
-                    search_type = "basic"
-                
-            except Exception as e:
-                logger.warning(f"universal segmentation failed, using simple: {e}")
-                segments = self.doc_procsr.segment_text_simple(txt)
-                segmentation_type = "simple"
+            try:
+                try: n_pages = self.doc_procsr.count_pages(tmp_file_path)
+                except Exception as e:
+                    logger.error(f"error reading pdf: {e}")
+                    n_pages = 0
+                if not n_pages:
+                    self.bot.edit_message_text("|X| Couldn't extract text from this pdf. The file might be image-based or corrupted.", message.chat.id, processing_msg.message_id)
+                    return
                 
-                try: #basic vector search
-                    from vector_search import VectorSearch
-                    vector_search = VectorSearch()
-                    vector_search.create_embeddings_simple(segments)
-                    search_type = "basic"
-                except:
-                    logger.error("all vector search methods failed")
-                    self.bot.edit_message_text("|X| Error setting up document search.", message.chat.id, processing_msg.message_id)
+                if not corpus.start_document(doc_id, file_name): # the same pdf sent twice in a row
+                    self.bot.edit_message_text(already_txt, message.chat.id, processing_msg.message_id)
                     return
+                self._report_progress(message, processing_msg, f"Processing your PDF with {curr_srvc.upper()}...\nExtracting text from {n_pages} pages...")
+                try: # try universal / mixed streamed page batch by page batch, if fials → simple
+                    self._stream_index(uid, corpus, doc_id, message, processing_msg, curr_srvc, tmp_file_path, n_pages)
+                    segmentation_type = "universal"
+                    search_type = "universal"
+                except Exception as e:
+                    logger.warning(f"universal segmentation failed, using simple: {e}")
+                    segmentation_type = "simple"
+                    corpus.remove_document(doc_id) # drop whatever the failed run managed to index
+                    
+                    txt = self.doc_procsr.extract_text_from_pdf(tmp_file_path)
+                    if not txt.strip():
+                        self.bot.edit_message_text("|X| Couldn't extract text from this pdf. The file might be image-based or corrupted.", message.chat.id, processing_msg.message_id)
+                        return
+                    
+                    segments = self.doc_procsr.segment_text_simple(txt)
+                    try: #basic vector search
+                        corpus.start_document(doc_id, file_name)
+                        corpus.add_segments([{"text": seg, "section": "", "type": "text"} for seg in segments], doc_id)
+                        search_type = "basic"
+                    except:
+                        logger.error("all vector search methods failed")
+                        corpus.remove_document(doc_id)
+                        self.bot.edit_message_text("|X| Error setting up document search.", message.chat.id, processing_msg.message_id)
+                        return
+            finally: os.unlink(tmp_file_path)
             
-            if not segments:
+            n_segments = corpus.docs.get(doc_id, {}).get("segments", 0)
+            if not n_segments:
+                corpus.remove_document(doc_id)
                 self.bot.edit_message_text("|X| The document appears to be empty or unreadable.",message.chat.id, processing_msg.message_id)
                 return
             
-            self.user_sess[uid] = vector_search
-            success_txt = f"""
+            corpus.finish_document(doc_id) # only now: answers from a partly indexed doc must not be cached
+            if self.idx_cache:
+                self.idx_cache.put(doc_key, corpus.document_index(doc_id), {"segments": n_segments, "segmentation_type": segmentation_type, "search_type": search_type})
+            
+            success_txt = self._doc_ready_txt(curr_srvc, n_segments, segmentation_type, search_type, file_name, len(corpus.docs))
+            self.bot.edit_message_text(success_txt, message.chat.id, processing_msg.message_id)
+            
+        except Exception as e:
+            logger.error(f"error processing document: {e}")
+            self.bot.edit_message_text(f"Error processing document: {str(e)}", message.chat.id, processing_msg.message_id)
+    
+    def _stream_index(self, uid: int, corpus: "VectorSearch", doc_id: str, message, processing_msg, curr_srvc: str, file_path: str, n_pages: int):
+        """pages → segments → embedding batches appended to the user's live corpus
+
+        each batch is searchable as soon as it's added, so the user can ask about the first pages
+        while the rest of the pdf is still being indexed
+        """
+        last_edit = time.monotonic()
+        
+        try:
+            for pages_done, segments in self.doc_procsr.iter_segments(self.doc_procsr.iter_pages(file_path)):
+                corpus.add_segments(segments, doc_id)
+                n_segments = corpus.docs.get(doc_id, {}).get("segments", 0)
+                if not n_segments: continue
+                
+                self.indexing_progress[uid] = (pages_done, n_pages)
+                if pages_done < n_pages and time.monotonic() - last_edit >= PROGRESS_EDIT_INTERVAL:
+                    last_edit = time.monotonic()
+                    self._report_progress(message, processing_msg, f"Processing your PDF with {curr_srvc.upper()}...\n"
+                                          f"Indexed {pages_done}/{n_pages} pages ({n_segments} segments)\n\n"
+                                          f"You can already ask questions about the indexed pages.")
+        finally: self.indexing_progress.pop(uid, None)
+    
+    def _doc_ready_txt(self, curr_srvc: str, n_segments: int, segmentation_type: str, search_type: str, file_name: str, n_docs: int = 1) -> str:
+        return f"""
 |DONE| Document Processed Successfully!
 
 AI Service: {curr_srvc.upper()}
-Extracted {len(segments)} text segments ({segmentation_type})
+Extracted {n_segments} text segments ({segmentation_type})
 Search: {search_type}
-Document: {message.document.file_name}
+Document: {file_name}
+Documents in your library: {n_docs}
 
-Now you can ask questions about the document!
+Now you can ask questions about your documents!
 Examples: "What is the Main Topic?" or "Summarize the Key Points"
 
 Commands:
 - Ask any question about the document
+- /docs - search a single document or remove one
 - /debug <query> - see detailed search results
 """
-            self.bot.edit_message_text(success_txt, message.chat.id, processing_msg.message_id)
-            
-        except Exception as e:
-            logger.error(f"error processing document: {e}")
-            self.bot.edit_message_text(f"Error processing document: {str(e)}", message.chat.id, processing_msg.message_id)
     
     def answer_question(self, message):
         uid = message.from_user.id
         
-        if uid not in self.user_sess: self.bot.send_message(message.chat.id, "Please upload a PDF document first!"); return
+        if not self._corpus(uid): self.bot.send_message(message.chat.id, "Please upload a PDF document first!"); return
         
         question = message.text.strip()
         if not question: self.bot.send_message(message.chat.id, "Please ask a question about your document."); return
@@ -361,31 +648,94 @@ Commands:
         try: self.bot.send_chat_action(message.chat.id, 'typing')
         except: pass  # ignore if typing action fails
         
+        processing_msg = None
         if ai_service == "ollama":
             processing_msg = self.bot.send_message(message.chat.id, 
                                                    f"Processing with {ai_service.upper()}... this may take a moment (up to 1 minute)")
         
         try:
             vector_search = self.user_sess[uid]
-            relevnt_txt = vector_search.search(question, top_k=5)
+            doc_filter = self._doc_filter(uid, vector_search)
+            started = time.perf_counter()
+            qry_embedding = vector_search.embed_query(question) # one encode, shared by the answer cache n search
+            
+            cache_ctx = None
+            corpus_key = vector_search.corpus_key(doc_filter) # the searched document set, None while any of it is indexing
+            if self.answer_cache and corpus_key:
+                model = self.ai_procsr.resolve_model(ai_service, ollama_model)
+                hit = self.answer_cache.get(corpus_key, ai_service, model, qry_embedding)
+                if hit:
+                    logger.info(f"answer cache hit (sim {hit[2]:.3f}, cached question: {hit[1]!r})")
+                    self._send_answer(message, question, hit[0], ai_service, processing_msg)
+                    return
+                cache_ctx = (corpus_key, ai_service, model, qry_embedding, question, started)
+            
+            rerank_report = {}
+            # segment dicts, not texts -- the prompt packer merges parts of one section under one header
+            relevnt_txt = vector_search.search(question, top_k=5, qry_embedding=qry_embedding, doc_ids=doc_filter, report=rerank_report, with_metadata=True)
+            if rerank_report:
+                vector_search.reranker.record(rerank_report)
+                logger.info(f"rerank ({rerank_report['relevance']}): {rerank_report['candidates']} → {rerank_report['kept']} segments in "
+                            f"{rerank_report['ms']:.1f} ms, ~{rerank_report.get('tokens_saved', 0)} prompt tokens saved")
             
             if not relevnt_txt:
                 msg = "I couldn't find relevant information in the document to answer your question."
-                if ai_service == "ollama": self.bot.edit_message_text(msg, message.chat.id, processing_msg.message_id)
+                if processing_msg: self.bot.edit_message_text(msg, message.chat.id, processing_msg.message_id)
                 else: self.bot.send_message(message.chat.id, msg)
                 return
             
-            ans = self.ai_procsr.generate_answer(question, relevnt_txt, service=ai_service, model=ollama_model)
-            safe_ans = ans.replace('*', '').replace('_', '').replace('[', '').replace(']', '')
-            safe_res = f"Question: {question}\n\nAnswer ({ai_service.upper()}):\n{safe_ans}"
+            if self.llm_loop: # answer is delivered from the loop, this thread goes back to polling right away
+                answer_fn = self._stream_answer_async if self.stream_answers else self._answer_async
+                self.llm_loop.submit(answer_fn(message, question, relevnt_txt, ai_service, ollama_model, processing_msg, cache_ctx))
+                return
             
-            if ai_service == "ollama": self.bot.edit_message_text(safe_res, message.chat.id, processing_msg.message_id)
-            else: self.bot.send_message(message.chat.id, safe_res)
+            ans = self.ai_procsr.generate_answer(question, relevnt_txt, service=ai_service, model=ollama_model)
+            self._send_answer(message, question, ans, ai_service, processing_msg)
+            self._remember_answer(cache_ctx, ans)
             
         except Exception as e:
             logger.error(f"error answering question: {e}")
-            error_msg = f"Error processing your question with {ai_service.upper()}: {str(e)}"
-            if ai_service == "ollama" and 'processing_msg' in locals():
-                try: self.bot.edit_message_text(error_msg, message.chat.id, processing_msg.message_id)
-                except: self.bot.send_message(message.chat.id, error_msg)
-            else: self.bot.send_message(message.chat.id, error_msg)
\ No newline at end of file
+            self._send_error(message, ai_service, e, processing_msg)
+    
+    async def _answer_async(self, message, question: str, relevnt_txt, ai_service: str, ollama_model: str, processing_msg, cache_ctx=None):
+        try:
+            ans = await self.ai_procsr.agenerate_answer(question, relevnt_txt, service=ai_service, model=ollama_model)
+            # telebot calls are blocking http -- run them on the default executor, not on the loop
+            await asyncio.to_thread(self._send_answer, message, question, ans, ai_service, processing_msg)
+            self._remember_answer(cache_ctx, ans)
+        except Exception as e:
+            logger.error(f"error answering question: {e}")
+            await asyncio.to_thread(self._send_error, message, ai_service, e, processing_msg)
+    
+    async def _stream_answer_async(self, message, question: str, relevnt_txt, ai_service: str, ollama_model: str, processing_msg, cache_ctx=None):
+        editor = StreamEditor(self, message, question, ai_service, processing_msg, self.edit_budget)
+        try:
+            async for piece in self.ai_procsr.astream_answer(question, relevnt_txt, service=ai_service, model=ollama_model):
+                await editor.feed(piece)
+            await editor.finish()
+            self._remember_answer(cache_ctx, "".join(editor.parts))
+        except Exception as e:
+            logger.error(f"error answering question: {e}")
+            await asyncio.to_thread(self._send_error, message, ai_service, e, processing_msg)
+    
+    def _remember_answer(self, cache_ctx, ans: str):
+        if not cache_ctx or "|X|" in ans or ans.startswith("service '"): return # errors n unavailable services aren't answers
+        doc_id, service, model, qry_embedding, question, started = cache_ctx
+        self.answer_cache.put(doc_id, service, model, qry_embedding, question, ans, time.perf_counter() - started)
+    
+    def _answer_txt(self, question: str, ans: str, ai_service: str) -> str:
+        safe_ans = ans.replace('*', '').replace('_', '').replace('[', '').replace(']', '')
+        return f"Question: {question}\n\nAnswer ({ai_service.upper()}):\n{safe_ans}"
+    
+    def _send_answer(self, message, question: str, ans: str, ai_service: str, processing_msg):
+        safe_res = self._answer_txt(question, ans, ai_service)
+        
+        if processing_msg: self.bot.edit_message_text(safe_res, message.chat.id, processing_msg.message_id)
+        else: self.bot.send_message(message.chat.id, safe_res)
+    
+    def _send_error(self, message, ai_service: str, e: Exception, processing_msg):
+        error_msg = f"Error processing your question with {ai_service.upper()}: {str(e)}"
+        if processing_msg:
+            try: self.bot.edit_message_text(error_msg, message.chat.id, processing_msg.message_id)
+            except: self.bot.send_message(message.chat.id, error_msg)
+        else: self.bot.send_message(message.chat.id, error_msg)
@@ -7,5 +7,63 @@ TELEGRAM_BOT_TOKEN = os.environ.get('TELEGRAM_BOT_TOKEN')
 GROQ_API_KEY = os.environ.get('GROQ_API_KEY')
 OLLAMA_BASE_URL = os.environ.get('OLLAMA_BASE_URL', "http://localhost:11434")
 
+OLLAMA_TIMEOUT = float(os.environ.get('OLLAMA_TIMEOUT', 60)) # secs per generate call
+GROQ_TIMEOUT = float(os.environ.get('GROQ_TIMEOUT', 30))
+OLLAMA_MAX_CONCURRENCY = int(os.environ.get('OLLAMA_MAX_CONCURRENCY', 4)) # in-flight calls per backend, the rest wait on the loop
+GROQ_MAX_CONCURRENCY = int(os.environ.get('GROQ_MAX_CONCURRENCY', 16))
+OLLAMA_MODELS_TTL = float(os.environ.get('OLLAMA_MODELS_TTL', 60)) # secs a cached /api/tags result counts as fresh
+OLLAMA_REFRESH_INTERVAL = float(os.environ.get('OLLAMA_REFRESH_INTERVAL', 30)) # background model list + health check
+LLM_STREAM_ANSWERS = os.environ.get('LLM_STREAM_ANSWERS', '1') != '0' # edit answers in as tokens arrive
+LLM_MAX_TOKENS = int(os.environ.get('LLM_MAX_TOKENS', 500)) # completion tokens per answer
+LLM_PROMPT_TOKENS = int(os.environ.get('LLM_PROMPT_TOKENS', 2048)) # whole prompt incl. document content, segments are packed to fit
+LLM_MODEL_PROMPT_TOKENS = os.environ.get('LLM_MODEL_PROMPT_TOKENS', '') # per-model overrides, "model=tokens,model=tokens"
+
+EMBEDDING_MODEL = os.environ.get('EMBEDDING_MODEL', 'all-MiniLM-L6-v2')
+QUERY_CACHE_SIZE = int(os.environ.get('QUERY_CACHE_SIZE', 256)) # recent query embeddings kept, 0 disables
+EMBED_BATCH_MAX = int(os.environ.get('EMBED_BATCH_MAX', 64)) # texts per batched encode call
+EMBED_BATCH_WAIT_MS = float(os.environ.get('EMBED_BATCH_WAIT_MS', 5)) # how long a batch waits for more callers, 0 disables batching
+
+INDEX_CACHE_DIR = os.environ.get('INDEX_CACHE_DIR', '.index_cache')
+INDEX_CACHE_MAX_MB = int(os.environ.get('INDEX_CACHE_MAX_MB', 500)) # 0 disables the on-disk cache
+
+SESSION_MAX_MB = int(os.environ.get('SESSION_MAX_MB', 1024)) # user indexes kept in ram, lru ones spill to disk past it. 0 = no limit
+SESSION_SPILL_DIR = os.environ.get('SESSION_SPILL_DIR', '.sessions') # wiped at startup
+
+FAISS_INDEX_TYPE = os.environ.get('FAISS_INDEX_TYPE', 'auto') # auto | flat | hnsw | ivf | sq8 | pq
+FAISS_FLAT_MAX = int(os.environ.get('FAISS_FLAT_MAX', 5000)) # auto: exact flat search below this many segments
+FAISS_HNSW_MAX = int(os.environ.get('FAISS_HNSW_MAX', 200000)) # auto: hnsw below this, ivf above
+FAISS_HNSW_M = int(os.environ.get('FAISS_HNSW_M', 32))
+FAISS_EF_SEARCH = int(os.environ.get('FAISS_EF_SEARCH', 64)) # hnsw candidates per query, more = better recall, slower
+FAISS_NPROBE = int(os.environ.get('FAISS_NPROBE', 16)) # ivf lists scanned per query
+
+INGEST_WORKERS = int(os.environ.get('INGEST_WORKERS', 2))
+INGEST_MAX_PER_USER = int(os.environ.get('INGEST_MAX_PER_USER', 2)) # uploads a user can have queued/running at once
+INGEST_MAX_PENDING = int(os.environ.get('INGEST_MAX_PENDING', 32))
+
+PDF_EXTRACT_WORKERS = int(os.environ.get('PDF_EXTRACT_WORKERS', min(4, os.cpu_count() or 1))) # 1 = extract in-process
+PDF_PARALLEL_MIN_PAGES = int(os.environ.get('PDF_PARALLEL_MIN_PAGES', 64))
+INGEST_PAGES_PER_BATCH = int(os.environ.get('INGEST_PAGES_PER_BATCH', 10)) # pages segmented + embedded per streaming step
+
+SEARCH_RRF_K = int(os.environ.get('SEARCH_RRF_K', 60)) # reciprocal rank fusion constant, higher = flatter blend of the strategies
+SEARCH_SEMANTIC_SHORTCUT = float(os.environ.get('SEARCH_SEMANTIC_SHORTCUT', 0.6)) # top_k semantic hits all scoring ≥ this skip the lexical strategies, 0 disables
+SEARCH_PARALLEL = os.environ.get('SEARCH_PARALLEL', '1') != '0' # lexical strategies on a shared pool while semantic runs
+SEARCH_WORKERS = int(os.environ.get('SEARCH_WORKERS', 4)) # threads in that pool, shared by all sessions
+SEARCH_BUDGET_MS = float(os.environ.get('SEARCH_BUDGET_MS', 150)) # per lexical strategy from question start, late ones are left out of fusion. 0 = wait
+
+RERANK_MODE = os.environ.get('RERANK_MODE', 'off') # off | mmr | cross (cross-encoder relevance, then mmr) -- opt in, it changes which segments answers get
+RERANK_POOL = int(os.environ.get('RERANK_POOL', 20)) # fused candidates the reranker picks the prompt's segments from
+RERANK_LAMBDA = float(os.environ.get('RERANK_LAMBDA', 0.7)) # mmr: 1 = relevance only, lower = more diverse
+RERANK_DUP_SIM = float(os.environ.get('RERANK_DUP_SIM', 0.9)) # cosine to an already picked segment that drops a candidate, 1 disables
+RERANK_MIN_REL = float(os.environ.get('RERANK_MIN_REL', 0.4)) # relevance floor, as a share of the pool's best-to-worst range -- hits below it only backfill up to top_k
+RERANK_BUDGET_MS = float(os.environ.get('RERANK_BUDGET_MS', 200)) # cross-encoder time limit per question, late → fused scores as relevance
+RERANK_CROSS_MODEL = os.environ.get('RERANK_CROSS_MODEL', 'cross-encoder/ms-marco-MiniLM-L-6-v2')
+
+SEGMENT_MAX_TOKENS = int(os.environ.get('SEGMENT_MAX_TOKENS', 0)) # 0 = the embedding model's max_seq_length
+SEGMENT_OVERLAP_TOKENS = int(os.environ.get('SEGMENT_OVERLAP_TOKENS', 32))
+
+ANSWER_CACHE_MAX = int(os.environ.get('ANSWER_CACHE_MAX', 1000)) # cached answers across all docs, 0 disables
+ANSWER_CACHE_THRESHOLD = float(os.environ.get('ANSWER_CACHE_THRESHOLD', 0.92)) # question embedding cosine needed to reuse an answer
+ANSWER_CACHE_TTL = float(os.environ.get('ANSWER_CACHE_TTL', 3600)) # secs
+
 import logging
 logging.basicConfig(level=logging.INFO)
@@ -0,0 +1,142 @@
+import re
+import math
+import threading
+import logging
+from typing import Callable, Dict, List, Tuple, Union
+from config import LLM_PROMPT_TOKENS, LLM_MODEL_PROMPT_TOKENS
+from document_processor import approx_token_counts
+
+logger = logging.getLogger(__name__)
+
+SENTENCE_END_RE = re.compile(r'(?<=[.!?])\s+')
+MIN_TRIMMED_TOKENS = 32 # a cut block shorter than this isn't worth its header
+CALIBRATION_ALPHA = 0.2 # weight of the newest call in a model's token ratio
+
+def parse_model_budgets(spec: str) -> Dict[str, int]: # "llama3-8b-8192=3000,phi3:mini=1024" → {model: prompt tokens}
+    budgets = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        model, _, tokens = item.rpartition("=")
+        budgets[model.strip()] = int(tokens)
+    return budgets
+
+class ContextPacker:
+    """fits retrieved segments into a per-model prompt budget before they go to the llm
+
+    parts of one section (same doc) become one block under a single header, in part order, w the sentences
+    the segmenter repeated at the start of the next part (its overlap window) dropped. blocks keep the rank of
+    their best segment n go in while they fit; the first one that doesn't is cut at a sentence boundary, later
+    ones that still fit whole go in after it. only when nothing fits, not even a sentence, the best block is cut
+    at a word -- the context is only empty when the budget is under MIN_TRIMMED_TOKENS.
+
+    tokens are a tokenizer-free estimate scaled per model by what the services report back (ollama's
+    prompt_eval_count, groq's usage.prompt_tokens) -- no model tokenizers to ship, the ratio settles after a few calls
+    """
+    def __init__(self, prompt_tokens: int = LLM_PROMPT_TOKENS, model_prompt_tokens: Dict[str, int] = None,
+                 count_tokens: Callable[[List[str]], List[int]] = approx_token_counts):
+        self.prompt_tokens = prompt_tokens # whole prompt: system + instructions + question + context
+        self.model_prompt_tokens = parse_model_budgets(LLM_MODEL_PROMPT_TOKENS) if model_prompt_tokens is None else model_prompt_tokens
+        self.count_tokens = count_tokens
+        self._ratios: Dict[str, float] = {} # model → reported / estimated prompt tokens
+        self._lock = threading.Lock()
+
+    def budget_for(self, model: str) -> int:
+        return self.model_prompt_tokens.get(model, self.prompt_tokens)
+
+    def ratio(self, model: str) -> float:
+        with self._lock: return self._ratios.get(model, 1.0)
+
+    def count(self, texts: List[str], model: str) -> List[int]: # estimated tokens of each text for model
+        ratio = self.ratio(model)
+        return [math.ceil(n * ratio) for n in self.count_tokens(texts)]
+
+    def calibrate(self, model: str, estimated: int, reported: int):
+        """estimated: what count() said the whole prompt costs, reported: what the service counted"""
+        if estimated <= 0 or reported <= 0: return
+        with self._lock:
+            old = self._ratios.get(model, 1.0)
+            seen = reported / (estimated / old) # vs the raw estimate, not the already scaled one
+            self._ratios[model] = old + CALIBRATION_ALPHA * (seen - old) if model in self._ratios else seen
+
+    @staticmethod
+    def _split(txt: str) -> Tuple[str, str]: # "head\nbody" → (head, body)
+        head, _, body = txt.partition("\n")
+        return head, body
+
+    def blocks(self, context: List[Union[str, Dict]]) -> Tuple[List[Tuple[str, List[str]]], Dict]:
+        """(header, sentences) per block in rank order + merge counts. context: search hits, texts or segment dicts"""
+        blocks, stats = [], {"merged": 0, "overlap_sentences": 0, "duplicates": 0}
+        sections: Dict[Tuple, List] = {} # (doc_id, section) → [block pos, {part: sentences}]
+        seen = set()
+        for seg in context:
+            txt = seg["text"] if isinstance(seg, dict) else seg
+            if txt in seen: stats["duplicates"] += 1; continue
+            seen.add(txt)
+            kind = seg.get("type") if isinstance(seg, dict) else None
+            if kind != "section_part": # a whole section opens w its title line, plain texts n simple segments have none
+                head, body = self._split(txt) if kind == "complete_section" else ("", txt)
+                blocks.append((head, SENTENCE_END_RE.split(body.strip())))
+                continue
+            key = (seg.get("doc_id"), seg["section"])
+            _, body = self._split(txt)
+            if key in sections: stats["merged"] += 1
+            else:
+                sections[key] = [len(blocks), {}]
+                blocks.append(None) # filled below, keeps the section at its best part's rank
+            sections[key][1][seg.get("part_number", 0)] = SENTENCE_END_RE.split(body.strip())
+
+        for (_, title), (pos, parts) in sections.items():
+            sents, prev_part = [], None
+            for part in sorted(parts):
+                nxt = parts[part]
+                if prev_part is not None and part == prev_part + 1: # neighbours: drop what the overlap window repeated
+                    k = next((k for k in range(min(len(sents), len(nxt)), 0, -1) if sents[-k:] == nxt[:k]), 0)
+                    stats["overlap_sentences"] += k
+                    nxt = nxt[k:]
+                elif prev_part is not None: sents.append("...")
+                sents.extend(nxt)
+                prev_part = part
+            blocks[pos] = (title, sents)
+        return blocks, stats
+
+    def _trim(self, head: str, sents: List[str], left: int, model: str, hard: bool = False) -> Tuple[str, int]:
+        """(text, tokens) of the block's leading sentences that fit left tokens, ("", 0) if under MIN_TRIMMED_TOKENS.
+        hard: no sentence boundary needed -- words of the first sentence that fit (text w/o punctuation is one sentence)"""
+        head_toks = self.count([head], model)[0] if head else 0
+        units = sents[0].split() if hard and sents else sents
+        keep, kept_toks = [], 0
+        for unit, unit_toks in zip(units, self.count(units, model)):
+            if kept_toks + unit_toks > left - head_toks: break
+            keep.append(unit)
+            kept_toks += unit_toks
+        if kept_toks < MIN_TRIMMED_TOKENS: return "", 0
+        return (f"{head}\n{' '.join(keep)}" if head else " ".join(keep)), head_toks + kept_toks
+
+    def pack(self, context: List[Union[str, Dict]], model: str, overhead_tokens: int = 0) -> Tuple[str, Dict]:
+        """(context text, report) -- the text fits budget_for(model) minus overhead_tokens (the rest of the prompt)"""
+        budget = max(self.budget_for(model) - overhead_tokens, 0)
+        blocks, report = self.blocks(context)
+        txts = [f"{head}\n{' '.join(sents)}" if head else " ".join(sents) for head, sents in blocks]
+        block_toks = self.count(txts, model)
+
+        out, used, trimmed = [], 0, 0
+        for (head, sents), txt, toks in zip(blocks, txts, block_toks):
+            sep = 1 if out else 0 # the blank line between blocks
+            if used + sep + toks <= budget:
+                out.append(txt)
+                used += sep + toks
+                continue
+            # over budget: keep its leading sentences that fit (one cut block per prompt), lower ranked blocks
+            # that fit whole still go in after it
+            if trimmed: continue
+            cut, cut_toks = self._trim(head, sents, budget - used - sep, model)
+            if cut:
+                out.append(cut)
+                used += sep + cut_toks
+                trimmed = 1
+        if not out and blocks: # nothing fit, not even a sentence -- cut the best block at a word instead of sending no context
+            cut, used = self._trim(*blocks[0], budget, model, hard=True)
+            if cut: out, trimmed = [cut], 1
+
+        report.update({"segments": len(context), "blocks": len(out), "trimmed": trimmed, "dropped": len(blocks) - len(out),
+                       "context_tokens": used, "budget": budget})
+        return "\n\n".join(out), report
@@ -3,7 +3,14 @@ import logging
 from typing import Dict
 from document_processor import DocumentProcessor
 from ai_processor import AIProcessor
-from vector_search import VectorSearch
+from embedding_service import get_embedding_service
+from index_cache import IndexCache
+from ingest_queue import IngestQueue
+from async_loop import AsyncLoop
+from answer_cache import AnswerCache
+from context_packer import parse_model_budgets
+from session_store import SessionStore
+from config import OLLAMA_BASE_URL, OLLAMA_TIMEOUT, GROQ_TIMEOUT, OLLAMA_MAX_CONCURRENCY, GROQ_MAX_CONCURRENCY, OLLAMA_MODELS_TTL, OLLAMA_REFRESH_INTERVAL, LLM_STREAM_ANSWERS, LLM_MAX_TOKENS, LLM_PROMPT_TOKENS, LLM_MODEL_PROMPT_TOKENS, INDEX_CACHE_DIR, INDEX_CACHE_MAX_MB, SESSION_MAX_MB, SESSION_SPILL_DIR, INGEST_WORKERS, INGEST_MAX_PER_USER, INGEST_MAX_PENDING, PDF_EXTRACT_WORKERS, PDF_PARALLEL_MIN_PAGES, INGEST_PAGES_PER_BATCH, SEGMENT_MAX_TOKENS, SEGMENT_OVERLAP_TOKENS, ANSWER_CACHE_MAX, ANSWER_CACHE_THRESHOLD, ANSWER_CACHE_TTL
 from bot_handlers import BotHandlers
 
 logger = logging.getLogger(__name__)
@@ -11,10 +18,24 @@ logger = logging.getLogger(__name__)
 class DocumentBot:
     def __init__(self, telegram_token: str, groq_api_key: str = None):
         self.bot = telebot.TeleBot(telegram_token)
-        self.doc_procsr = DocumentProcessor()
-        self.ai_procsr = AIProcessor(groq_api_key)
+        self.embedder = get_embedding_service()
+        self.embedder.load() # pay model load once at startup instead of on first upload
+        # segments are sized w the embedder's own tokenizer so none gets truncated at encode time
+        self.doc_procsr = DocumentProcessor(
+            PDF_EXTRACT_WORKERS, PDF_PARALLEL_MIN_PAGES, INGEST_PAGES_PER_BATCH,
+            count_tokens=self.embedder.count_tokens,
+            max_tokens=min(SEGMENT_MAX_TOKENS or self.embedder.max_seq_length, self.embedder.max_seq_length),
+            overlap_tokens=SEGMENT_OVERLAP_TOKENS
+        )
+        self.ai_procsr = AIProcessor(groq_api_key, OLLAMA_BASE_URL, OLLAMA_TIMEOUT, GROQ_TIMEOUT, OLLAMA_MAX_CONCURRENCY, GROQ_MAX_CONCURRENCY,
+                                     OLLAMA_MODELS_TTL, OLLAMA_REFRESH_INTERVAL, LLM_MAX_TOKENS, LLM_PROMPT_TOKENS,
+                                     parse_model_budgets(LLM_MODEL_PROMPT_TOKENS))
+        self.llm_loop = AsyncLoop()
+        self.idx_cache = IndexCache(INDEX_CACHE_DIR, INDEX_CACHE_MAX_MB*1024*1024) if INDEX_CACHE_MAX_MB > 0 else None
+        self.ingest_queue = IngestQueue(INGEST_WORKERS, INGEST_MAX_PER_USER, INGEST_MAX_PENDING)
+        self.answer_cache = AnswerCache(ANSWER_CACHE_THRESHOLD, ANSWER_CACHE_MAX, ANSWER_CACHE_TTL) if ANSWER_CACHE_MAX > 0 else None
         
-        self.user_sess: Dict[int, VectorSearch] = {}
+        self.user_sess = SessionStore(SESSION_SPILL_DIR, SESSION_MAX_MB*1024*1024, self.embedder)
         self.user_prefs: Dict[int, Dict] = {}
         
         self.handlers = BotHandlers(
@@ -22,7 +43,12 @@ class DocumentBot:
             self.doc_procsr, 
             self.ai_procsr, 
             self.user_sess, 
-            self.user_prefs
+            self.user_prefs,
+            idx_cache=self.idx_cache,
+            ingest_queue=self.ingest_queue,
+            llm_loop=self.llm_loop,
+            stream_answers=LLM_STREAM_ANSWERS,
+            answer_cache=self.answer_cache
         )
         
         self.setup_handlers()
@@ -48,6 +74,10 @@ class DocumentBot:
         def handle_clear(message):
             self.handlers.handle_clear(message)
         
+        @self.bot.message_handler(commands=['docs'])
+        def handle_docs(message):
+            self.handlers.handle_docs(message)
+        
         @self.bot.message_handler(commands=['debug'])
         def handle_debug(message):
             self.handlers.handle_debug(message)
@@ -1,13 +1,41 @@
 import PyPDF2
 import re
 import logging
-from typing import List, Dict
+import bisect
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, List, Dict, Tuple, Iterable, Iterator
 from collections import Counter
 
 logger = logging.getLogger(__name__)
 
+SPECIAL_TOKENS = 2 # [CLS] + [SEP] the embedder wraps every input in
+TOKEN_RE = re.compile(r'\w+|[^\w\s]')
+
+def approx_token_counts(texts: List[str]) -> List[int]:
+    """tokenizer-free estimate when no embedder is wired in: one piece per word/punct char, long words split further"""
+    return [sum(1 + len(tok)//8 for tok in TOKEN_RE.findall(txt)) for txt in texts]
+
+def _extract_page_range(job: Tuple[str, int, int]) -> List[str]: # top level so the process pool can pickle it
+    file_path, start, end = job
+    with open(file_path, 'rb') as file:
+        pdf_reader = PyPDF2.PdfReader(file)
+        return [(pdf_reader.pages[i].extract_text() or "") for i in range(start, end)]
+
 class DocumentProcessor:
-    def __init__(self):
+    def __init__(self, extract_workers: int = 1, parallel_min_pages: int = 64, pages_per_batch: int = 10,
+                 count_tokens: Callable[[List[str]], List[int]] = None, max_tokens: int = 256, overlap_tokens: int = 32):
+        self.extract_workers = extract_workers
+        self.parallel_min_pages = parallel_min_pages # below this a pool costs more than it saves
+        self.pages_per_batch = pages_per_batch # streaming ingestion: pages segmented + embedded per step
+        # segment sizes are in embedder tokens: a whole segment (section title included) must fit max_tokens,
+        # or the model truncates its tail n that text never makes it into the index
+        self.count_tokens = count_tokens or approx_token_counts
+        self.max_tokens = max_tokens
+        self.overlap_tokens = overlap_tokens # tokens of trailing sentences repeated at the start of the next segment
+        self._pool = None
+        self._pool_lock = threading.Lock() # concurrent uploads (INGEST_WORKERS > 1) must not each start a pool
         self.header_patterns =[
             r'^\d+\.\s+',
             r'^\d+\.\d+\s+', 
@@ -18,21 +46,82 @@ class DocumentProcessor:
             r'^[a-z]\)\s+',
             r'^•\s+|^\*\s+|^-\s+',
         ]
+        # all patterns in one regex: each sits in its own optional lookahead group, so a single match call
+        # tells how many patterns hit the line (every hit is worth 0.3)
+        self.header_re = re.compile("".join(f"(?=({pp}))?" for pp in self.header_patterns))
     
-    def extract_text_from_pdf(self, file_path:str) -> str:
+    @property
+    def chunking_key(self) -> str: # segmentation settings an index was built with -- part of its cache key
+        return f"tokens={self.max_tokens},overlap={self.overlap_tokens},counter={getattr(self.count_tokens, '__qualname__', '?')}"
+    
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._pool_lock:
+            if self._pool is None: # spawn, not fork -- the bot process is full of threads n locks
+                self._pool = ProcessPoolExecutor(self.extract_workers, mp_context=multiprocessing.get_context("spawn"))
+            return self._pool
+    
+    def close(self):
+        with self._pool_lock:
+            pool, self._pool = self._pool, None
+        if pool is not None: pool.shutdown(wait=False, cancel_futures=True)
+    
+    def count_pages(self, file_path: str) -> int:
+        with open(file_path, 'rb') as file:
+            return len(PyPDF2.PdfReader(file).pages)
+    
+    def iter_pages(self, file_path: str) -> Iterator[str]: # page texts in order, as soon as each is extracted
+        with open(file_path, 'rb') as file:
+            pdf_reader = PyPDF2.PdfReader(file)
+            n_pages = len(pdf_reader.pages)
+            if self.extract_workers <= 1 or n_pages < self.parallel_min_pages:
+                for pg in pdf_reader.pages: yield pg.extract_text() or ""
+                return
+        
+        chunk = -(-n_pages // (self.extract_workers*2)) # 2 ranges per worker: some load balancing, but every range re-parses the pdf
+        jobs = [(file_path, start, min(start + chunk, n_pages)) for start in range(0, n_pages, chunk)]
+        for part in self._get_pool().map(_extract_page_range, jobs): yield from part # map keeps page order
+    
+    def extract_pages(self, file_path: str) -> List[str]:
+        return list(self.iter_pages(file_path))
+    
+    def extract_text_with_pages(self, file_path: str) -> Tuple[str, List[int]]:
+        """full text + char offset where each page starts, so segments can point back to their source page"""
         try:
-            with open(file_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                txt = ""
-                for pg in pdf_reader.pages:
-                    txt += pg.extract_text() + "\n"
-                return txt
+            pages = self.extract_pages(file_path)
         except Exception as e:
             logger.error(f"error extracting pdf text: {e}")
-            return ""
+            return "", []
+        
+        page_offsets = []
+        pos = 0
+        for pg in pages:
+            page_offsets.append(pos)
+            pos += len(pg) + 1
+        return "".join(f"{pg}\n" for pg in pages), page_offsets
+    
+    def extract_text_from_pdf(self, file_path:str) -> str:
+        return self.extract_text_with_pages(file_path)[0]
+    
+    @staticmethod
+    def page_at(offset: int, page_offsets: List[int]) -> int: # 1-based page holding char offset
+        return bisect.bisect_right(page_offsets, offset)
+    
+    def _split_lines(self, txt: str, page_offsets: List[int] = None) -> Tuple[List[str], List[int]]:
+        """stripped non-empty lines + (if page_offsets) the page each one is on, in one pass"""
+        lines = []
+        line_pages = [] if page_offsets else None
+        pos = 0
+        for ll in txt.split('\n'):
+            stripped = ll.strip()
+            if stripped:
+                lines.append(stripped)
+                if page_offsets: line_pages.append(self.page_at(pos, page_offsets))
+            pos += len(ll) + 1
+        return lines, line_pages
     
-    def analyze_doc_struct(self, txt: str) -> Dict:
-        lines = [ll.strip() for ll in txt.split('\n') if ll.strip()]
+    def analyze_doc_struct(self, txt: str, lines: List[str] = None, continued: bool = False) -> Dict:
+        """continued: txt picks up mid-document (streaming batch), its first line is scored like any other"""
+        if lines is None: lines = self._split_lines(txt)[0]
         
         analysis = {
             'total_lines': len(lines),
@@ -49,7 +138,7 @@ class DocumentProcessor:
         }
         
         for i, ll in enumerate(lines):
-            hdr_score = self.calc_header_score(ll,i,lines)
+            hdr_score = self.calc_header_score(ll,i,lines,continued)
             if hdr_score > 0.3:
                 analysis['potential_headers'].append({
                     'line': ll,
@@ -59,20 +148,21 @@ class DocumentProcessor:
         
         return analysis
     
-    def calc_header_score(self, line: str, pos: int, all_lines: List[str]) -> float:
+    def calc_header_score(self, line: str, pos: int, all_lines: List[str], continued: bool = False) -> float:
         score = 0.0
         
-        for pp in self.header_patterns:
-            if re.match(pp, line): score += 0.3
+        hdr_match = self.header_re.match(line) # optional groups only → always matches
+        score += 0.3 * sum(1 for grp in hdr_match.groups() if grp is not None)
         
         if len(line)<60: score += 0.2
         elif len(line)<30: score+=0.3
         
-        if pos>0 and pos<len(all_lines) - 1:
-            prev_line = all_lines[pos - 1] if pos > 0 else ""
+        if (pos>0 or continued) and pos<len(all_lines) - 1:
+            # a continued batch's first line has its previous line in the last batch -- stripped n non-empty like all of them
+            prev_line = all_lines[pos - 1] if pos > 0 else None
             next_line = all_lines[pos + 1] if pos < len(all_lines) - 1 else ""
-            
-            if len(prev_line) == 0: score += 0.2
+
+            if prev_line is not None and len(prev_line) == 0: score += 0.2
             if len(next_line)>len(line)*1.5: score += 0.2
         
         words = line.split()
@@ -83,21 +173,30 @@ class DocumentProcessor:
         if len(line)>100: score *= 0.5
         return min(score, 1.0)
     
-    def extract_sections(self, txt:str) -> List[Dict[str,str]]:
-        analysis = self.analyze_doc_struct(txt)
-        lines = [ll.strip() for ll in txt.split('\n') if ll.strip()]
+    def extract_sections(self, txt:str, page_offsets: List[int] = None, state: Dict = None) -> List[Dict[str,str]]:
+        """state: see iter_segments -- text before the first header continues the previous batch's last section"""
+        continued = bool(state and state["title"])
+        lines, line_pages = self._split_lines(txt, page_offsets) # split once, shared with the header analysis
+        analysis = self.analyze_doc_struct(txt, lines, continued)
         
         sections = []
-        curr_section = {"title": "Document Start", "content": "", "start_line": 0}
+        if continued: curr_section = {"title": state["title"], "content": "", "start_line": 0, "continued": True}
+        else: curr_section = {"title": "Document Start", "content": "", "start_line": 0}
+        if line_pages: curr_section["page"] = state["page"] if continued else 1
         
-        hdrz = sorted(analysis['potential_headers'], key=lambda x: x['position'])
+        hdrz = analysis['potential_headers'] # already in line order
         if not hdrz:
-            return self.extract_sections_fallback(txt)
+            if continued: # still inside that section
+                curr_section["content"] = " ".join(lines) + " "
+                return [curr_section] if lines else []
+            return self.extract_sections_fallback(txt, page_offsets, state)
         
-        hdr_posz = [h['position'] for h in hdrz]
+        hdr_posz = {h['position'] for h in hdrz}
+        content_parts = [] # joined once per section instead of += per line
         for i,ll in enumerate(lines):
             if i in hdr_posz:
-                if curr_section["content"].strip():
+                if content_parts:
+                    curr_section["content"] = " ".join(content_parts) + " "
                     sections.append(curr_section)
                 
                 curr_section = {
@@ -105,113 +204,223 @@ class DocumentProcessor:
                     "content": "",
                     "start_line": i
                 }
-            else: curr_section["content"] += ll + " "
+                if line_pages: curr_section["page"] = line_pages[i]
+                content_parts = []
+            else: content_parts.append(ll)
         
-        if curr_section["content"].strip(): sections.append(curr_section)
+        if content_parts:
+            curr_section["content"] = " ".join(content_parts) + " "
+            sections.append(curr_section)
         return sections
     
-    def extract_sections_fallback(self, txt: str) -> List[Dict[str, str]]:
+    def extract_sections_fallback(self, txt: str, page_offsets: List[int] = None, state: Dict = None) -> List[Dict[str, str]]:
         pgphs = txt.split('\n\n')
+        first = state["paragraphs"] if state else 0 # paragraphs earlier batches already numbered
         sections = []
         
+        pos = 0
         for i, para in enumerate(pgphs):
+            para_pos = pos
+            pos += len(para) + 2
             if para.strip():
                 lines = para.strip().split('\n')
                 fline = lines[0].strip()
                 
                 if len(fline)<80 and len(lines)>1: title = fline; content = '\n'.join(lines[1:]) # → first line is likely a title
-                else: title = f"Section {i+1}"; content = para.strip()
+                else: title = f"Section {first+i+1}"; content = para.strip()
                 
                 sections.append({
                     "title": title,
                     "content": content,
                     "start_line": i
                 })
+                if page_offsets: sections[-1]["page"] = self.page_at(para_pos, page_offsets)
         
         return sections
     
-    def segment_text(self, txt: str, segment_size: int = 800, overlap: int = 100) -> List[Dict[str, str]]:
-        sections = self.extract_sections(txt)
+    def segment_text_structured(self, txt: str, segment_size: int = None, overlap: int = None, page_offsets: List[int] = None,
+                                state: Dict = None) -> List[Dict[str, str]]:
+        """section-aware segments; segment_size n overlap are in embedder tokens (defaults: max_tokens, overlap_tokens)"""
+        segment_size = segment_size or self.max_tokens
+        overlap = self.overlap_tokens if overlap is None else overlap
+        sections = self.extract_sections(txt, page_offsets, state)
         segments = []
         
-        if len(sections)<2: sections = self.extract_sections_fallback(txt)
+        if len(sections)<2 and not (sections and sections[0].get("continued")): sections = self.extract_sections_fallback(txt, page_offsets, state)
         
+        titles = []
         for sec in sections:
-            sec_title = sec["title"]
-            sec_content = sec["content"]
-            
-            title = re.sub(r'^\d+\.?\s*', '', sec_title)
-            title = re.sub(r'^[•\-\*]\s*', '', title)
+            title = re.sub(r'^\d+\.?\s*', '', sec["title"])
+            titles.append(re.sub(r'^[•\-\*]\s*', '', title))
+        sec_units = [self._sentences(sec["content"]) for sec in sections]
+        
+        # one tokenizer call for the whole text -- every title n sentence counted up front
+        # head = what the embedder sees besides the body: vector search encodes f"{section} {text}" n text opens w the title line
+        heads = [f"{title} {title} (part 99)" for title in titles]
+        cnts = self.count_tokens(heads + [unit for units in sec_units for unit in units])
+        head_cnts, unit_cnts = cnts[:len(heads)], cnts[len(heads):]
+        
+        pos = 0
+        for sec, title, units, head_toks in zip(sections, titles, sec_units, head_cnts):
+            unit_toks = unit_cnts[pos:pos + len(units)]
+            pos += len(units)
+            budget = max(segment_size - SPECIAL_TOKENS - head_toks, 16)
+            done = state["parts"] if sec.get("continued") else 0 # segments the section already got in earlier batches
             
-            if len(sec_content)<=segment_size:
-                segments.append({
-                    "text": f"{title}\n{sec_content}",
+            if done: sec_segments = self._window_segments(title, units, unit_toks, budget, overlap, done + 1)
+            elif sum(unit_toks)<=budget:
+                sec_segments = [{
+                    "text": f"{title}\n{sec['content']}",
                     "section": title,
                     "type": "complete_section"
-                })
-            else: segments.extend(self.split_long_section( title,sec_content,segment_size))
+                }]
+            else: sec_segments = self._window_segments(title, units, unit_toks, budget, overlap)
+            
+            if "page" in sec: # page where the section starts
+                for seg in sec_segments: seg["page"] = sec["page"]
+            segments.extend(sec_segments)
         
+        if state is not None and sections: # where the next batch picks up
+            last = sections[-1]
+            state.update(title=last["title"], page=last.get("page"), parts=(done if len(sections) == 1 else 0) + len(sec_segments))
+        if state is not None: state["paragraphs"] += txt.count('\n\n')
         return segments
     
-    def split_long_section(self, title: str, content: str, segment_size: int) -> List[Dict[str, str]]:
+    @staticmethod
+    def _sentences(content: str) -> List[str]: # sentence units, joined w " " they give the old "sent. sent." text
+        return [f"{ll}." for ll in (ss.strip() for ss in re.split(r'[.!?]+\s+', content)) if ll]
+    
+    def _fit_units(self, units: List[str], unit_toks: List[int], budget: int) -> Tuple[List[str], List[int]]:
+        """break sentences longer than budget into word runs that fit, so any window can take at least one unit"""
+        if all(toks <= budget for toks in unit_toks): return units, unit_toks
+        fit_units, fit_toks = [], []
+        for unit, toks in zip(units, unit_toks):
+            if toks <= budget:
+                fit_units.append(unit)
+                fit_toks.append(toks)
+                continue
+            words = unit.split()
+            step = max(1, len(words)*budget // toks)
+            while True:
+                parts = [" ".join(words[i:i + step]) for i in range(0, len(words), step)]
+                part_toks = self.count_tokens(parts)
+                if step == 1 or max(part_toks) <= budget: break # a single word over budget gets truncated, nothing else to do
+                step = max(1, min(step - 1, step*budget // max(part_toks)))
+            fit_units.extend(parts)
+            fit_toks.extend(part_toks)
+        return fit_units, fit_toks
+    
+    @staticmethod
+    def _windows(unit_toks: List[int], budget: int, overlap: int) -> List[Tuple[int, int]]:
+        """sliding window over units: [start, end) ranges of <= budget tokens, each one after the first
+        re-opens w the trailing units of the previous window worth up to overlap tokens"""
+        windows = []
+        start = 0
+        while start < len(unit_toks):
+            end, used = start, 0
+            while end<len(unit_toks) and used + unit_toks[end] <= budget:
+                used += unit_toks[end]
+                end += 1
+            end = max(end, start + 1)
+            windows.append((start, end))
+            if end >= len(unit_toks): break
+            
+            nxt, carried = end, 0 # back off from end, but leave room for unit end -- every window must make progress
+            while nxt - 1 > start and carried + unit_toks[nxt - 1] <= overlap and carried + unit_toks[nxt - 1] + unit_toks[end] <= budget:
+                nxt -= 1
+                carried += unit_toks[nxt]
+            start = nxt
+        return windows
+    
+    def _window_segments(self, title: str, units: List[str], unit_toks: List[int], budget: int, overlap: int, first_part: int = 1) -> List[Dict[str, str]]:
+        units, unit_toks = self._fit_units(units, unit_toks, budget)
         segments = []
-        
-        lines = re.split(r'[.!?]+\s+', content)
-        curr_sgmt = f"{title}\n"
-        sgmt_num = 1
-        
-        for ll in lines:
-            ll = ll.strip()
-            if not ll: continue
-            if len(curr_sgmt+ll)<segment_size: curr_sgmt += ll + ". "
-            else:
-                if curr_sgmt.strip():
-                    segments.append({
-                        "text": curr_sgmt.strip(),
-                        "section": title,
-                        "type": "section_part",
-                        "part_number": sgmt_num
-                    })
-                
-                sgmt_num += 1
-                curr_sgmt = f"{title} (part {sgmt_num})\n{ll}. "
-        
-        if curr_sgmt.strip():
+        for sgmt_num, (start, end) in enumerate(self._windows(unit_toks, budget, overlap), first_part):
+            head = title if sgmt_num == 1 else f"{title} (part {sgmt_num})"
             segments.append({
-                "text": curr_sgmt.strip(),
+                "text": f"{head}\n{' '.join(units[start:end])}",
                 "section": title,
-                "type": "section_part", 
+                "type": "section_part",
                 "part_number": sgmt_num
             })
-        
         return segments
     
-    def segment_text_simple(self, txt: str, segment_size: int = 600, overlap: int = 50) -> List[str]:
-        txt = re.sub(r'\s+', ' ', txt.strip())
-        pgphs = txt.split('\n\n')
-        if len(pgphs) == 1: lines = re.split(r'[.!?]+\s+', txt)
-        else:
-            lines = []
-            for para in pgphs: lines.extend(re.split(r'[.!?]+\s+', para))
+    def split_long_section(self, title: str, content: str, segment_size: int = None, overlap: int = None) -> List[Dict[str, str]]:
+        segment_size = segment_size or self.max_tokens
+        overlap = self.overlap_tokens if overlap is None else overlap
+        units = self._sentences(content)
+        cnts = self.count_tokens([f"{title} {title} (part 99)"] + units)
+        return self._window_segments(title, units, cnts[1:], max(segment_size - SPECIAL_TOKENS - cnts[0], 16), overlap)
+    
+    def _split_trailing_section(self, txt: str, max_carry: int, continued: bool = False) -> Tuple[str, str]:
+        """split txt before its last detected header -- that section may continue on the next pages"""
+        hdrz = self.analyze_doc_struct(txt, continued=continued)['potential_headers']
+        if not hdrz or hdrz[-1]['position'] == 0: return txt, ""
         
-        segments = []
-        curr_sgmt = ""
-        
-        for ll in lines:
-            ll = ll.strip()
-            if not ll: continue
-            if len(curr_sgmt+ll)<segment_size: curr_sgmt += ll+". "
-            else:
-                if curr_sgmt: segments.append(curr_sgmt.strip())
-                curr_sgmt = ll+". "
+        last_hdr = hdrz[-1]['position'] # index into the non-empty line list → map back to a char offset
+        k, pos = -1, 0
+        for ll in txt.split('\n'):
+            if ll.strip():
+                k += 1
+                if k == last_hdr: break
+            pos += len(ll) + 1
+        
+        if len(txt) - pos > max_carry: return txt, "" # don't drag a huge section along forever
+        return txt[:pos], txt[pos:]
+    
+    def iter_segments(self, pages: Iterable[str], pages_per_batch: int = None, segment_size: int = None, overlap: int = None) -> Iterator[Tuple[int, List[Dict[str, str]]]]:
+        """streaming segment_text: yields (pages consumed, segments) every pages_per_batch pages
 
-        if curr_sgmt: segments.append(curr_sgmt.strip())            
-        return segments
+        the last section of each batch is held back n prepended to the next one, so a section running
+        across a batch boundary still comes out as one section. a section too long to hold back goes out
+        as it is; the next batch's leading text keeps its title, page n part numbering (state), so titles
+        come out as in a whole-document run
+        """
+        pages_per_batch = pages_per_batch or self.pages_per_batch
+        max_carry = (segment_size or self.max_tokens)*32 # chars, ~8 segments' worth at ~4 chars per token
+        page_offsets = [] # global char offset of every page seen so far
+        pos = 0
+        carry, carry_start = "", 0
+        state = {"title": None, "page": None, "parts": 0, "paragraphs": 0, "simple": 0} # last section so far + numbering
+        batch = []
+        pages_done = 0
+        
+        for pg in pages:
+            page_offsets.append(pos)
+            pos += len(pg) + 1
+            batch.append(f"{pg}\n")
+            pages_done += 1
+            if len(batch) < pages_per_batch: continue
+            
+            txt = carry + "".join(batch)
+            body, carry = self._split_trailing_section(txt, max_carry, bool(state["title"]))
+            local_offsets = [off - carry_start for off in page_offsets]
+            yield pages_done, (self.segment_text(body, segment_size, overlap, local_offsets, state) if body.strip() else [])
+            carry_start += len(body)
+            batch = []
+        
+        txt = carry + "".join(batch)
+        if txt.strip():
+            local_offsets = [off - carry_start for off in page_offsets]
+            yield pages_done, self.segment_text(txt, segment_size, overlap, local_offsets, state)
+    
+    def segment_text_simple(self, txt: str, segment_size: int = None, overlap: int = None) -> List[str]:
+        segment_size = segment_size or self.max_tokens
+        overlap = self.overlap_tokens if overlap is None else overlap
+        units = self._sentences(re.sub(r'\s+', ' ', txt.strip()))
+        if not units: return []
+        
+        budget = segment_size - SPECIAL_TOKENS # simple segments are embedded as is, no title
+        units, unit_toks = self._fit_units(units, self.count_tokens(units), budget)
+        return [" ".join(units[start:end]) for start, end in self._windows(unit_toks, budget, overlap)]
     
-    def segment_text(self, txt: str, segment_size: int = 800, overlap: int = 100) -> List[Dict[str, str]]:
+    def segment_text(self, txt: str, segment_size: int = None, overlap: int = None, page_offsets: List[int] = None,
+                     state: Dict = None) -> List[Dict[str, str]]:
         try:
-            return self.segment_text(txt, segment_size, overlap)
+            return self.segment_text_structured(txt, segment_size, overlap, page_offsets, state)
         except Exception as e:
             logger.warning(f"advanced segmentation failed: {e}, using simple")
             simple_segments = self.segment_text_simple(txt, segment_size, overlap)
-            return [{"text": seg, "section": f"Section {i+1}", "type": "simple"} for i, seg in enumerate(simple_segments)]
\ No newline at end of file
+            first = state["simple"] if state else 0
+            if state is not None: state["simple"] += len(simple_segments)
+            return [{"text": seg, "section": f"Section {first+i+1}", "type": "simple"} for i, seg in enumerate(simple_segments)]
\ No newline at end of file
@@ -0,0 +1,192 @@
+from sentence_transformers import SentenceTransformer
+import time
+import threading
+import logging
+import numpy as np
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Union
+from config import EMBEDDING_MODEL, QUERY_CACHE_SIZE, EMBED_BATCH_MAX, EMBED_BATCH_WAIT_MS
+
+logger = logging.getLogger(__name__)
+
+class _EncodeRequest:
+    def __init__(self, texts: List[str]):
+        self.texts = texts
+        self.future = Future()
+        self.out = None # (n, dim) filled batch by batch
+        self.queued = 0 # texts handed to a batch so far
+        self.left = len(texts) # texts not encoded yet
+
+class EncodeBatcher:
+    """micro-batching front for model.encode, shared by every session n upload
+
+    callers submit texts n get a future; one scheduler thread waits up to max_wait for more requests
+    (or until max_batch texts are pending) n encodes them all in one call. pending requests are served
+    round robin, so a question arriving during a 500 segment upload rides in the next batch instead of
+    waiting for the whole doc
+    """
+    def __init__(self, encode_fn: Callable, max_batch: int = 64, max_wait: float = 0.005):
+        self.encode_fn = encode_fn
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._pending = deque() # requests w texts not yet in a batch
+        self._pending_txts = 0
+        self._cond = threading.Condition()
+        self.batches = 0
+        self.encoded = 0
+        threading.Thread(target=self._run, name="encode-batcher", daemon=True).start()
+
+    def submit(self, texts: List[str]) -> Future:
+        req = _EncodeRequest(texts)
+        with self._cond:
+            self._pending.append(req)
+            self._pending_txts += len(texts)
+            self._cond.notify()
+        return req.future
+
+    def _take_batch(self) -> List:
+        with self._cond:
+            while not self._pending: self._cond.wait()
+            deadline = time.monotonic() + self.max_wait
+            while self._pending_txts < self.max_batch: # give concurrent callers a moment to join
+                remaining = deadline - time.monotonic()
+                if remaining <= 0: break
+                self._cond.wait(remaining)
+
+            batch, n_txts = [], 0
+            while self._pending and n_txts < self.max_batch:
+                req = self._pending.popleft()
+                if req.future.done(): # an earlier batch of it failed, drop the rest
+                    self._pending_txts -= len(req.texts) - req.queued
+                    continue
+                start = req.queued
+                req.queued = min(len(req.texts), start + self.max_batch - n_txts)
+                batch.append((req, start, req.queued))
+                n_txts += req.queued - start
+                if req.queued < len(req.texts): self._pending.append(req) # rest goes behind whoever is waiting
+            self._pending_txts -= n_txts
+            return batch
+
+    def _run(self):
+        while True:
+            batch = self._take_batch()
+            try:
+                embeddings = self.encode_fn([txt for req, start, end in batch for txt in req.texts[start:end]])
+            except Exception as e:
+                for req, _, _ in batch:
+                    if not req.future.done(): req.future.set_exception(e)
+                continue
+
+            self.batches += 1
+            self.encoded += len(embeddings)
+            pos = 0
+            for req, start, end in batch:
+                pos += end - start
+                if req.future.done(): continue # an earlier batch of it failed
+                if req.out is None: req.out = np.empty((len(req.texts), embeddings.shape[1]), dtype=embeddings.dtype)
+                req.out[start:end] = embeddings[pos - (end - start):pos]
+                req.left -= end - start
+                if req.left == 0: req.future.set_result(req.out)
+
+    def stats(self) -> Dict:
+        return {"batches": self.batches, "encoded": self.encoded, "avg_batch": self.encoded / self.batches if self.batches else 0.0}
+
+class EmbeddingService:
+    """one sentence-transformers model per process, borrowed by every VectorSearch session
+
+    model is loaded lazily on first use (or explicitly via load()) n encode calls are serialized,
+    hf fast tokenizers are not safe to call from several threads at once
+    """
+    def __init__(self, model_name: str = EMBEDDING_MODEL, query_cache_size: int = QUERY_CACHE_SIZE,
+                 batch_max: int = EMBED_BATCH_MAX, batch_wait_ms: float = EMBED_BATCH_WAIT_MS):
+        self.model_name = model_name
+        self._model = None
+        self._load_lock = threading.Lock()
+        self._encode_lock = threading.Lock()
+        self.query_cache_size = query_cache_size # recent query embeddings, 0 disables
+        self._query_cache = OrderedDict() # query text → normalized (1, dim) float32
+        self._query_lock = threading.Lock()
+        self.query_hits = 0
+        self.query_misses = 0
+        # batch_wait_ms 0 → no batcher, every encode call goes straight to the model
+        self._batcher = EncodeBatcher(self._encode_now, batch_max, batch_wait_ms/1000) if batch_wait_ms > 0 else None
+
+    def load(self) -> SentenceTransformer:
+        if self._model is None:
+            with self._load_lock:
+                if self._model is None: # double check -- another thread might have loaded it while we waited
+                    logger.info(f"loading embedding model: {self.model_name}")
+                    self._model = SentenceTransformer(self.model_name)
+        return self._model
+
+    @property
+    def model(self) -> SentenceTransformer:
+        return self.load()
+
+    @property
+    def max_seq_length(self) -> int: # word pieces the model actually sees -- everything past it is silently cut off
+        return self.load().max_seq_length
+
+    @property
+    def cache_key(self) -> str: # what makes its embeddings incompatible w another model's -- part of index cache keys
+        return f"model={self.model_name},seq={self.max_seq_length}"
+
+    def _encode_now(self, texts: Union[str, List[str]], **kwargs):
+        model = self.load()
+        with self._encode_lock:
+            return model.encode(texts, **kwargs)
+
+    def encode(self, texts: Union[str, List[str]], **kwargs):
+        """plain lists of texts go through the batcher (merged w other callers' pending texts);
+        single strings, empty lists n custom encode kwargs go straight to the model"""
+        if self._batcher is None or kwargs or isinstance(texts, str) or not texts:
+            return self._encode_now(texts, **kwargs)
+        self.load() # load on the caller's thread so a load failure surfaces here
+        return self._batcher.submit(list(texts)).result()
+
+    def encode_query(self, query: str) -> np.ndarray:
+        """normalized (1, dim) float32 embedding of one query, from a bounded lru of recent queries
+
+        the same question is embedded for the answer cache, search n /debug, n users repeat themselves --
+        one model forward per distinct text. callers must not modify the returned array
+        """
+        with self._query_lock:
+            qry_embedding = self._query_cache.get(query)
+            if qry_embedding is not None:
+                self._query_cache.move_to_end(query)
+                self.query_hits += 1
+                return qry_embedding
+            self.query_misses += 1
+        
+        qry_embedding = self.encode([query])
+        qry_embedding = (qry_embedding / np.linalg.norm(qry_embedding, axis=1, keepdims=True)).astype('float32')
+        qry_embedding.setflags(write=False) # shared between callers
+        if self.query_cache_size > 0:
+            with self._query_lock:
+                self._query_cache[query] = qry_embedding
+                while len(self._query_cache) > self.query_cache_size: self._query_cache.popitem(last=False)
+        return qry_embedding
+
+    def query_cache_stats(self) -> Dict:
+        with self._query_lock:
+            return {"entries": len(self._query_cache), "hits": self.query_hits, "misses": self.query_misses}
+
+    def count_tokens(self, texts: List[str]) -> List[int]:
+        """word pieces per text as the model's own tokenizer splits them, [CLS]/[SEP] not included"""
+        if not texts: return []
+        model = self.load()
+        with self._encode_lock: # same tokenizer instance encode() uses
+            enc = model.tokenizer(list(texts), add_special_tokens=False)
+        return [len(ids) for ids in enc["input_ids"]]
+
+_shared_service = None
+_shared_lock = threading.Lock()
+
+def get_embedding_service() -> EmbeddingService:
+    global _shared_service
+    if _shared_service is None:
+        with _shared_lock:
+            if _shared_service is None:
+                _shared_service = EmbeddingService()
+    return _shared_service
@@ -0,0 +1,97 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+import logging
+import threading
+from typing import Dict, Optional, Tuple
+from vector_search import VectorSearch
+
+logger = logging.getLogger(__name__)
+
+class IndexCache:
+    """on-disk cache of built VectorSearch indexes keyed by sha-256 of the uploaded pdf bytes
+
+    one dir per document, dir mtime is the lru clock (touched on every hit), oldest entries are
+    evicted once the cache grows past max_bytes
+    """
+    def __init__(self, cache_dir: str, max_bytes: int):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def key_for(data: bytes, salt: str = "") -> str: # salt = anything besides the bytes that shapes the index (chunking, embedding model)
+        hsh = hashlib.sha256(data)
+        if salt: hsh.update(salt.encode("utf-8"))
+        return hsh.hexdigest()
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key)
+
+    def get(self, key: str) -> Optional[Tuple[VectorSearch, Dict]]:
+        path = self._entry_path(key)
+        with self._lock:
+            if not os.path.isdir(path):
+                self.misses += 1
+                return None
+            try:
+                vector_search = VectorSearch.load(path)
+                with open(os.path.join(path, "info.json"), encoding="utf-8") as f:
+                    info = json.load(f)
+                os.utime(path) # mark as recently used
+            except Exception as e:
+                logger.warning(f"dropping unreadable index cache entry {key[:12]}: {e}")
+                shutil.rmtree(path, ignore_errors=True)
+                self.misses += 1
+                return None
+            self.hits += 1
+            return vector_search, info
+
+    def put(self, key: str, vector_search: VectorSearch, info: Dict):
+        path = self._entry_path(key)
+        tmp_path = f"{path}.tmp-{threading.get_ident()}"
+        try:
+            vector_search.save(tmp_path)
+            with open(os.path.join(tmp_path, "info.json"), "w", encoding="utf-8") as f:
+                json.dump(info, f)
+            with self._lock:
+                if os.path.isdir(path): shutil.rmtree(path, ignore_errors=True)
+                os.replace(tmp_path, path) # entry only becomes visible once fully written
+                self._evict()
+        except Exception as e:
+            logger.error(f"error writing index cache entry {key[:12]}: {e}")
+            shutil.rmtree(tmp_path, ignore_errors=True)
+
+    def _entries(self):
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            if not os.path.isdir(path) or ".tmp-" in name: continue
+            size = sum(os.path.getsize(os.path.join(path, fn)) for fn in os.listdir(path))
+            entries.append((os.path.getmtime(path), size, path))
+        return entries
+
+    def _evict(self):
+        entries = sorted(self._entries()) # oldest first
+        total = sum(size for _, size, _ in entries)
+        while entries and total > self.max_bytes:
+            _, size, path = entries.pop(0)
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+            logger.info(f"index cache evicted {os.path.basename(path)[:12]} ({size} bytes)")
+
+    def stats(self) -> Dict:
+        with self._lock:
+            entries = self._entries()
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(entries),
+                "bytes": sum(size for _, size, _ in entries),
+                "max_bytes": self.max_bytes,
+            }
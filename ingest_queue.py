@@ -0,0 +1,57 @@
+import queue
+import logging
+import threading
+from collections import Counter
+from typing import Callable, Dict
+
+logger = logging.getLogger(__name__)
+
+class IngestQueue:
+    """bounded job queue + fixed worker threads for pdf ingestion
+
+    keeps download / extraction / embedding off telebot's polling threads so questions from other users
+    are never stuck behind someone's 300 page upload. backpressure: a user can only have max_per_user jobs
+    queued or running, n the whole queue holds at most max_pending jobs
+    """
+    def __init__(self, workers: int = 2, max_per_user: int = 2, max_pending: int = 32):
+        self.max_per_user = max_per_user
+        self._jobs = queue.Queue(maxsize=max_pending)
+        self._per_user = Counter()
+        self._lock = threading.Lock()
+        self.completed = 0
+        self.rejected = 0
+        
+        for i in range(workers):
+            threading.Thread(target=self._worker, name=f"ingest-{i}", daemon=True).start()
+    
+    def submit(self, uid: int, fn: Callable, *args) -> bool: # False → caller should tell the user to wait
+        with self._lock:
+            if self._per_user[uid] >= self.max_per_user:
+                self.rejected += 1
+                return False
+            try: self._jobs.put_nowait((uid, fn, args))
+            except queue.Full:
+                self.rejected += 1
+                return False
+            self._per_user[uid] += 1
+            return True
+    
+    def pending(self, uid: int = None) -> int:
+        with self._lock:
+            return self._per_user[uid] if uid is not None else sum(self._per_user.values())
+    
+    def _worker(self):
+        while True:
+            uid, fn, args = self._jobs.get()
+            try: fn(*args)
+            except Exception as e: logger.error(f"ingest job for user {uid} failed: {e}")
+            finally:
+                with self._lock:
+                    self._per_user[uid] -= 1
+                    if self._per_user[uid] <= 0: del self._per_user[uid]
+                    self.completed += 1
+                self._jobs.task_done()
+    
+    def stats(self) -> Dict:
+        with self._lock:
+            return {"pending": sum(self._per_user.values()), "completed": self.completed, "rejected": self.rejected}
@@ -0,0 +1,222 @@
+import re
+import itertools
+import numpy as np
+from array import array
+from collections import Counter, defaultdict
+from typing import Dict, FrozenSet, Iterable, List, Set
+from scipy.sparse import coo_matrix, csc_matrix
+
+WORD_RE = re.compile(r'\b[a-zA-Z]{3,}\b') # same tokenization the search strategies always used
+RUN_RE = re.compile(r'[a-z]{4,}') # maximal lowercase letter runs -- what a 4+ letter substring can live in
+
+BM25_K1 = 1.2 # term count saturation
+BM25_B = 0.3 # length normalization, per field -- low: segments are cut to a token budget, a long one isn't wordy, just full
+BM25_TITLE_WEIGHT = 1.0 # a section title occurrence counts like this many text occurrences -- no boost: 1.5-3 moved no recall in bench_bm25
+
+class FuzzyMatcher:
+    """vocab-level fuzzy matcher: char overlap of the shorter word against the longer one >= threshold
+
+    every vocab word is one row of a 26-col letter count matrix, so matching a query word against the
+    whole vocab is two small mat-vec products instead of a python loop per word per segment
+    """
+    def __init__(self, vocab: List[str], threshold: float = 0.7, min_len: int = 4):
+        self.threshold = threshold
+        self.min_len = min_len
+        self.vocab = []
+        self.lens = np.zeros(0, dtype=np.int32)
+        self.cnts = np.zeros((0, 26), dtype=np.int32)
+        self.present = np.zeros((0, 26), dtype=np.int32)
+        self._cache: Dict[str, List[str]] = {}
+        self.extend(vocab)
+
+    def extend(self, words: Iterable[str]): # new vocab words only -- rows for the old ones are kept as they are
+        words = [wrd for wrd in words if len(wrd) >= self.min_len and wrd.isascii() and wrd.isalpha()]
+        if not words: return
+        lens = np.array([len(wrd) for wrd in words], dtype=np.int32)
+        cnts = np.zeros((len(words), 26), dtype=np.int32)
+        # scatter every char of the joined words into its word's row in one go
+        chars = np.frombuffer("".join(words).encode('ascii'), dtype=np.uint8).astype(np.int64) - 97
+        np.add.at(cnts, (np.repeat(np.arange(len(words)), lens), chars), 1)
+        self.vocab.extend(words)
+        self.lens = np.concatenate([self.lens, lens])
+        self.cnts = np.concatenate([self.cnts, cnts])
+        self.present = np.concatenate([self.present, (cnts > 0).astype(np.int32)])
+        self._cache.clear()
+
+    @staticmethod
+    def _letter_counts(word: str) -> np.ndarray:
+        cnts = np.zeros(26, dtype=np.int32)
+        for ch in word: cnts[ord(ch) - 97] += 1
+        return cnts
+
+    def matches(self, word: str) -> List[str]:
+        if word in self._cache: return self._cache[word]
+        if len(word) < self.min_len or not (word.isascii() and word.isalpha()) or not self.vocab: return []
+
+        q_cnts = self._letter_counts(word)
+        q_len = len(word)
+        # query is the shorter word (ties too): each of its chars counts if the vocab word has that letter at all
+        short_q = (self.present @ q_cnts) / q_len
+        # vocab word is the shorter one: each of its chars counts if the query has that letter
+        short_v = (self.cnts @ (q_cnts > 0).astype(np.int32)) / self.lens
+        sims = np.where(self.lens >= q_len, short_q, short_v)
+
+        res = [self.vocab[r] for r in np.nonzero(sims >= self.threshold)[0]]
+        if len(self._cache) > 4096: self._cache.clear()
+        self._cache[word] = res
+        return res
+
+class BM25Index:
+    """bm25 over segment text + its section title as a sparse (segments x terms) weight matrix. the title is a
+    second field (own length normalization, title_weight per occurrence) but unweighted by default, so in effect
+    plain bm25 over title + text
+
+    raw term counts are appended per segment at ingest (coo triplets). the weights depend on corpus-wide
+    stats (idf, avg field lengths), so the matrix is rebuilt lazily -- once per change, a few vectorized
+    passes over the counts. a query is then one sparse dot product over just its terms' columns
+    """
+    def __init__(self, k1: float = BM25_K1, b: float = BM25_B, title_weight: float = BM25_TITLE_WEIGHT):
+        self.k1 = k1
+        self.b = b
+        self.title_weight = title_weight
+        self.term_ids: Dict[str, int] = {}
+        self._counts = {field: (array("i"), array("i"), array("f")) for field in ("text", "title")} # segment, term id, count
+        self._lens = {field: array("i") for field in ("text", "title")}
+        self._weights = None # csc, None = stale
+
+    def __len__(self): return len(self._lens["text"])
+
+    def __getstate__(self): # the weight matrix is derived -- rebuilt on first query after a load
+        return dict(self.__dict__, _weights=None)
+
+    def add(self, words: List[str], title_words: List[str]):
+        i = len(self)
+        for field, toks in (("text", words), ("title", title_words)):
+            rows, cols, cnts = self._counts[field]
+            for tok, cnt in Counter(toks).items():
+                rows.append(i)
+                cols.append(self.term_ids.setdefault(tok, len(self.term_ids)))
+                cnts.append(cnt)
+            self._lens[field].append(len(toks))
+        self._weights = None
+
+    def _build(self) -> csc_matrix:
+        n = len(self)
+        rows, cols, vals = [], [], []
+        for field, boost in (("text", 1.0), ("title", self.title_weight)):
+            f_rows, f_cols, f_cnts = (np.array(arr) for arr in self._counts[field]) # copies -- a buffer view would pin the arrays' size
+            lens = np.array(self._lens[field], dtype=np.float32)
+            norm = 1 - self.b + self.b * lens / max(float(lens.mean()), 1e-9)
+            rows.append(f_rows)
+            cols.append(f_cols)
+            vals.append(boost * f_cnts / norm[f_rows])
+        tf = coo_matrix((np.concatenate(vals), (np.concatenate(rows), np.concatenate(cols))), shape=(n, len(self.term_ids))).tocsc()
+        tf.sum_duplicates() # a word in both the text n the title → one pseudo-count
+        df = np.diff(tf.indptr)
+        idf = np.log(1 + (n - df + 0.5) / (df + 0.5)).astype(np.float32)
+        tf.data = (tf.data * (self.k1 + 1) / (tf.data + self.k1) * np.repeat(idf, df)).astype(np.float32)
+        return tf
+
+    def _matrix(self) -> csc_matrix:
+        weights = self._weights
+        if weights is None or weights.shape[0] != len(self): weights = self._weights = self._build()
+        return weights
+
+    def scores(self, words: Iterable[str]) -> np.ndarray:
+        """score of every segment for these query words (each counted once), 0 where none occurs"""
+        ids = sorted({self.term_ids[wrd] for wrd in words if wrd in self.term_ids})
+        if not ids: return np.zeros(len(self), dtype=np.float32)
+        return self._matrix()[:, ids] @ np.ones(len(ids), dtype=np.float32)
+
+    def keywords(self, n: int) -> List[str]: # terms carrying the most bm25 weight over the whole corpus
+        if not self.term_ids: return []
+        totals = np.asarray(self._matrix().sum(axis=0)).ravel()
+        terms = list(self.term_ids) # dict order = term ids
+        return [terms[t] for t in np.argsort(-totals)[:n]]
+
+    def memory_bytes(self) -> int: # count arrays + ~100 B per term id + the weight matrix when built
+        arrays = sum(len(arr) * arr.itemsize for field in self._counts.values() for arr in field) + sum(len(arr) * 4 for arr in self._lens.values())
+        weights = self._weights
+        mtx = weights.data.nbytes + weights.indices.nbytes + weights.indptr.nbytes if weights is not None else 0
+        return arrays + 100 * len(self.term_ids) + mtx
+
+class LexicalIndex:
+    """token → segment postings built once at ingest so lexical strategies only touch candidate segments
+
+    segments are append-only: add() continues numbering from the current size so it can be fed batch by batch
+    """
+    n_entries = 0 # posting list entries (tokens + letter runs), for memory_bytes -- class defaults so older pickles load
+    n_tokens = 0 # sum of distinct tokens per segment
+    bm25 = None # pickles from before BM25Index -- VectorSearch.load rebuilds those
+
+    def __init__(self):
+        self.postings: Dict[str, List[int]] = defaultdict(list) # 3+ letter token → segment idxs
+        self.run_postings: Dict[str, List[int]] = defaultdict(list) # letter run → segment idxs (substring lookups)
+        self.segment_tokens: List[FrozenSet[str]] = []
+        self.section_segments: Dict[str, List[int]] = defaultdict(list) # lowered section title → segment idxs
+        self.section_tokens: Dict[str, FrozenSet[str]] = {}
+        self.section_titles: Set[str] = set() # every distinct lowered title, "unknown" included
+        self.word_cnts = Counter()
+        self.total_words = 0
+        self.bm25 = BM25Index()
+        self._fuzzy = None
+
+    def __len__(self): return len(self.segment_tokens)
+
+    def add(self, texts: Iterable[str], sections: Iterable[str]):
+        n_vocab = len(self.postings)
+        for txt, section in zip(texts, sections):
+            i = len(self.segment_tokens)
+            txt_lower = txt.lower()
+
+            words = WORD_RE.findall(txt_lower)
+            self.word_cnts.update(words)
+            self.total_words += len(words)
+
+            tokens = frozenset(words)
+            self.segment_tokens.append(tokens)
+            for tok in tokens: self.postings[tok].append(i)
+            runs = set(RUN_RE.findall(txt_lower))
+            for run in runs: self.run_postings[run].append(i)
+            self.n_entries += len(tokens) + len(runs)
+            self.n_tokens += len(tokens)
+
+            section_title = (section or "").lower()
+            self.section_titles.add(section_title)
+            has_title = section_title and section_title != "unknown"
+            self.bm25.add(words, WORD_RE.findall(section_title) if has_title else [])
+            if not has_title: continue
+            if section_title not in self.section_tokens:
+                self.section_tokens[section_title] = frozenset(WORD_RE.findall(section_title))
+            self.section_segments[section_title].append(i)
+
+        # vocab grew -- extend the match table at ingest, not per query. dicts keep insertion order, so the
+        # words past the old size are exactly the new ones
+        new_words = list(itertools.islice(self.postings, n_vocab, None))
+        if self._fuzzy is None: self._fuzzy = FuzzyMatcher(self.vocabulary(min_len=4))
+        else: self._fuzzy.extend(wrd for wrd in new_words if len(wrd) >= 4)
+
+    def memory_bytes(self) -> int:
+        """rough cpython footprint from counters (~250 B per dict key w its list, ~36 per posting entry, ~40 per
+        frozenset member) + the fuzzy tables -- within ~20% of tracemalloc, cheap enough to call per question"""
+        fuzzy = self._fuzzy.cnts.nbytes + self._fuzzy.present.nbytes + self._fuzzy.lens.nbytes if self._fuzzy is not None else 0
+        bm25 = self.bm25.memory_bytes() if self.bm25 is not None else 0
+        return 250 * (len(self.postings) + len(self.run_postings)) + 36 * self.n_entries + 40 * self.n_tokens + fuzzy + bm25
+
+    def candidates(self, words: Iterable[str]) -> Set[int]: # segments containing at least one of the words
+        res = set()
+        for wrd in words: res.update(self.postings.get(wrd, ()))
+        return res
+
+    def substring_candidates(self, word: str) -> Set[int]: # segments where word occurs as a substring
+        res = set()
+        for run, idxs in self.run_postings.items():
+            if word in run: res.update(idxs)
+        return res
+
+    def vocabulary(self, min_len: int = 3) -> List[str]:
+        return [wrd for wrd in self.postings if len(wrd) >= min_len]
+
+    def fuzzy_candidates(self, word: str) -> Set[int]: # segments containing a vocab word that fuzzy-matches word
+        if self._fuzzy is None: return set()
+        return self.candidates(self._fuzzy.matches(word))
@@ -0,0 +1,85 @@
+import time
+import logging
+import threading
+from collections import deque
+from typing import Dict, List
+from ollama import OllamaClient
+
+logger = logging.getLogger(__name__)
+
+class ModelRegistry:
+    """cached ollama model catalog + health, refreshed on a background thread
+
+    readers (questions, /status, /models) only ever see the cached list -- no /api/tags round trip on a hot
+    path. a refresh that flips availability is recorded as a transition, so ollama going down or coming
+    back is picked up without a restart
+    """
+    def __init__(self, client: OllamaClient, ttl: float = 60, refresh_interval: float = 30):
+        self.client = client
+        self.ttl = ttl # cached list older than this wakes the refresher early
+        self.refresh_interval = refresh_interval
+        self._models: List[str] = []
+        self.available = False
+        self.fetched_at = None # wall clock of the last refresh attempt
+        self.last_error = None
+        self.transitions = deque(maxlen=20) # (wall clock, "up"/"down")
+        self.refreshes = 0
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def refresh(self) -> bool: # one /api/tags call; returns availability
+        try:
+            models = [mm['name'] for mm in self.client.list_models()]
+            error = None
+        except Exception as e:
+            models, error = [], str(e)
+
+        with self._lock:
+            was_avail = self.available
+            self._models = models
+            self.available = len(models)>0
+            self.fetched_at = time.time()
+            self.last_error = error
+            self.refreshes += 1
+            if self.available != was_avail and self.refreshes > 1: # first refresh is the startup state, not a change
+                self.transitions.append((self.fetched_at, "up" if self.available else "down"))
+                logger.warning(f"ollama went {'up' if self.available else 'down'} ({len(models)} models{', ' + error if error else ''})")
+
+        if self.refreshes == 1:
+            if self.available: logger.info(f"ollama check: found {len(models)} models: {models}")
+            else: logger.warning(f"ollama not available - using groq only ({error or 'no models'})")
+        return self.available
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="ollama-models", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.refresh_interval)
+            self._wake.clear()
+            self.refresh()
+
+    def age(self) -> float: # secs since the last refresh, inf before the first one
+        return time.time() - self.fetched_at if self.fetched_at else float("inf")
+
+    def models(self) -> List[str]:
+        if self.age() > self.ttl: self._wake.set() # stale -- nudge the refresher, still answer from cache
+        with self._lock:
+            return list(self._models)
+
+    def default_model(self) -> str:
+        models = self.models()
+        return models[0] if models else "llama3.2"
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "available": self.available,
+                "models": len(self._models),
+                "age": self.age(),
+                "last_error": self.last_error,
+                "transitions": list(self.transitions)
+            }
@@ -1,24 +1,37 @@
+import asyncio
+import aiohttp
+import json
 import requests
 import logging
-from typing import Dict, List
+from requests.adapters import HTTPAdapter
+from typing import AsyncIterator, Dict, List
 
 logger = logging.getLogger(__name__)
 
 class OllamaClient:
-    def __init__(self, base_url: str = "http://localhost:11434"):
+    """ollama http client -- one pooled requests.Session for sync calls, one aiohttp.ClientSession for the async ones
+
+    both keep connections alive, so a question no longer pays a fresh tcp connect to ollama
+    """
+    def __init__(self, base_url: str = "http://localhost:11434", timeout: float = 60, max_connections: int = 10):
         self.base_url = base_url
-    
-    def chat(self, model: str, messages: List[Dict], max_tokens: int = 500, temperature: float = 0.1):
-        url = f"{self.base_url}/api/generate"
-        
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_connections)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._aclient = None # created lazily, inside the event loop that will use it
+
+    def _build_payload(self, model: str, messages: List[Dict], max_tokens: int, temperature: float) -> Dict:
         prompt = ""
         for msg in messages:
             if msg["role"] == "system":
                 prompt += f"{msg['content']}\n\n"
             elif msg["role"] == "user":
                 prompt += f"{msg['content']}"
-        
-        payload = {
+
+        return {
             "model": model,
             "prompt": prompt,
             "stream": False,
@@ -28,21 +41,29 @@ class OllamaClient:
                 "stop": ["</s>", "<|end|>"]
             }
         }
-        
+
+    def _check_response(self, res: Dict) -> Dict:
+        logger.info(f"ollama response received: {len(res.get('response', ''))} chars")
+        if 'response' not in res:
+            logger.error(f"ollama response missing 'response' field: {res}")
+            return {"response": "error: ollama didn't return a response"}
+        return res
+
+    def list_models(self, timeout: float = 5) -> List[Dict]:
+        greq = self.session.get(f"{self.base_url}/api/tags", timeout=timeout)
+        greq.raise_for_status()
+        return greq.json().get('models', [])
+
+    def chat(self, model: str, messages: List[Dict], max_tokens: int = 500, temperature: float = 0.1):
+        url = f"{self.base_url}/api/generate"
+        payload = self._build_payload(model, messages, max_tokens, temperature)
+
         try:
             logger.info(f"sending request to ollama: {url} with model: {model}")
-            preq = requests.post(url, json=payload, timeout=60)
+            preq = self.session.post(url, json=payload, timeout=self.timeout)
             preq.raise_for_status()
-            
-            res = preq.json()
-            logger.info(f"ollama response received: {len(res.get('response', ''))} chars")
-            
-            if 'response' not in res:
-                logger.error(f"ollama response missing 'response' field: {res}")
-                return {"response": "error: ollama didn't return a response"}
-            
-            return res
-            
+            return self._check_response(preq.json())
+
         except requests.exceptions.Timeout:
             logger.error("ollama req timed out")
             raise Exception("ollama reqeust timed out - model might be SLOW (most likely lol) or not loaded")
@@ -51,4 +72,73 @@ class OllamaClient:
             raise Exception("cant connect to ollama - check 11434 n make sure its nothing else on there except lama boyyyyy")
         except Exception as e:
             logger.error(f"ollama request failed: {e}")
-            raise
\ No newline at end of file
+            raise
+
+    def _get_aclient(self) -> aiohttp.ClientSession:
+        # aiohttp over httpx here: httpcore's pool rescans every connection per request, which caps out at ~100 in flight
+        if self._aclient is None or self._aclient.closed:
+            self._aclient = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.max_connections),
+                timeout=aiohttp.ClientTimeout(total=self.timeout, sock_connect=5)
+            )
+        return self._aclient
+
+    async def alist_models(self, timeout: float = 5) -> List[Dict]:
+        async with self._get_aclient().get(f"{self.base_url}/api/tags", timeout=aiohttp.ClientTimeout(total=timeout)) as greq:
+            greq.raise_for_status()
+            return (await greq.json()).get('models', [])
+
+    async def achat(self, model: str, messages: List[Dict], max_tokens: int = 500, temperature: float = 0.1):
+        url = f"{self.base_url}/api/generate"
+        payload = self._build_payload(model, messages, max_tokens, temperature)
+
+        try:
+            logger.info(f"sending async request to ollama: {url} with model: {model}")
+            async with self._get_aclient().post(url, json=payload) as preq:
+                preq.raise_for_status()
+                return self._check_response(await preq.json())
+
+        except asyncio.TimeoutError:
+            logger.error("ollama req timed out")
+            raise Exception("ollama reqeust timed out - model might be SLOW (most likely lol) or not loaded")
+        except aiohttp.ClientConnectorError:
+            logger.error("cant connect to ollama - is it running ?????????????????????")
+            raise Exception("cant connect to ollama - check 11434 n make sure its nothing else on there except lama boyyyyy")
+        except Exception as e:
+            logger.error(f"ollama request failed: {e}")
+            raise
+
+    async def astream_chat(self, model: str, messages: List[Dict], max_tokens: int = 500, temperature: float = 0.1, done: Dict = None) -> AsyncIterator[str]:
+        """achat w stream=True: yields text pieces as ollama generates them. done: filled w the final line
+        (prompt_eval_count, eval_count, durations) once the stream ends"""
+        url = f"{self.base_url}/api/generate"
+        payload = self._build_payload(model, messages, max_tokens, temperature)
+        payload["stream"] = True
+
+        try:
+            logger.info(f"sending streaming request to ollama: {url} with model: {model}")
+            async with self._get_aclient().post(url, json=payload) as preq:
+                preq.raise_for_status()
+                async for line in preq.content: # ndjson -- one {"response": <piece>, "done": bool} object per line
+                    if not line.strip(): continue
+                    part = json.loads(line)
+                    if part.get("error"): raise Exception(f"ollama error: {part['error']}")
+                    if part.get("response"): yield part["response"]
+                    if part.get("done"):
+                        if done is not None: done.update(part)
+                        break
+
+        except asyncio.TimeoutError:
+            logger.error("ollama req timed out")
+            raise Exception("ollama reqeust timed out - model might be SLOW (most likely lol) or not loaded")
+        except aiohttp.ClientConnectorError:
+            logger.error("cant connect to ollama - is it running ?????????????????????")
+            raise Exception("cant connect to ollama - check 11434 n make sure its nothing else on there except lama boyyyyy")
+
+    async def aclose(self):
+        if self._aclient is not None:
+            await self._aclient.close()
+            self._aclient = None
+
+    def close(self):
+        self.session.close()
@@ -0,0 +1,151 @@
+from sentence_transformers import CrossEncoder
+import time
+import threading
+import logging
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from typing import Callable, Dict, List, Optional, Tuple
+from config import RERANK_MODE, RERANK_POOL, RERANK_LAMBDA, RERANK_DUP_SIM, RERANK_MIN_REL, RERANK_BUDGET_MS, RERANK_CROSS_MODEL
+from document_processor import approx_token_counts
+
+logger = logging.getLogger(__name__)
+
+RERANK_MODES = ("off", "mmr", "cross")
+
+def _unit(scores: np.ndarray) -> np.ndarray: # min-max to [0, 1] over the pool -- cosine n cross-encoder logits on one scale
+    span = scores.max() - scores.min()
+    return (scores - scores.min()) / span if span > 0 else np.ones_like(scores)
+
+class Reranker:
+    """second pass over the fused candidates, right before prompt assembly
+
+    search hands over its top `pool` fused segments; the reranker keeps up to top_k of them by maximal
+    marginal relevance over the stored embeddings (relevance minus similarity to what's already picked),
+    so overlapping parts of one section don't fill the prompt. a candidate closer than dup_sim to a picked
+    one is dropped outright -- the prompt gets fewer segments instead of a near-copy. candidates under the
+    min_rel floor aren't weighed by mmr, they only fill up to top_k in fused order.
+
+    relevance is the fused score the candidates come with; mode "cross" asks a cross-encoder instead. it runs on its
+    own thread w a hard budget_ms; a late or failed run falls back to the fused scores, the model is loaded on that thread
+    too, so the first questions are answered w mmr while it loads. one instance per process like the embedder
+    """
+    def __init__(self, mode: str = RERANK_MODE, pool: int = RERANK_POOL, lambda_: float = RERANK_LAMBDA, dup_sim: float = RERANK_DUP_SIM,
+                 min_rel: float = RERANK_MIN_REL, budget_ms: float = RERANK_BUDGET_MS, cross_model: str = RERANK_CROSS_MODEL,
+                 count_tokens: Callable[[List[str]], List[int]] = approx_token_counts):
+        if mode not in RERANK_MODES: raise ValueError(f"unknown rerank mode {mode!r}, expected one of {RERANK_MODES}")
+        self.mode = mode
+        self.pool = pool # fused candidates looked at
+        self.lambda_ = lambda_ # 1 = relevance only, 0 = diversity only
+        self.dup_sim = dup_sim # cosine to a picked segment that counts as a duplicate, 1 disables
+        self.min_rel = min_rel # candidates below this share of the pool's relevance range only backfill up to top_k, 0 disables
+        self.budget_ms = budget_ms
+        self.cross_model = cross_model
+        # for the reports' prompt tokens: the estimate ContextPacker uses. no tokenizer -- search calls this under
+        # the corpus lock, the embedder's tokenizer would queue the question behind upload encodes
+        self.count_tokens = count_tokens
+        self._cross = None
+        self._cross_failed = False
+        self._executor = ThreadPoolExecutor(1, thread_name_prefix="rerank") if mode == "cross" else None # one forward at a time
+        self._stats_lock = threading.Lock()
+        self.reranked = 0
+        self.tokens_before = 0 # prompt tokens the fused top_k would have cost
+        self.tokens_after = 0
+        self.total_ms = 0.0
+        self.cross_late = 0 # cross-encoder runs over budget (or failed) → fused scores used
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode != "off"
+
+    def _load_cross(self) -> CrossEncoder:
+        if self._cross is None:
+            logger.info(f"loading cross-encoder: {self.cross_model}")
+            try: self._cross = CrossEncoder(self.cross_model)
+            except Exception:
+                self._cross_failed = True # e.g. no network for the download -- mmr on fused scores from now on
+                raise
+        return self._cross
+
+    def _cross_scores(self, query: str, texts: List[str]) -> np.ndarray:
+        return np.asarray(self._load_cross().predict([(query, txt) for txt in texts]), dtype=np.float32).reshape(-1)
+
+    def _relevance(self, query: str, texts: List[str], scores: np.ndarray, deadline: float) -> Tuple[np.ndarray, str]:
+        """(relevance per candidate, where it came from: fused | cross | cross late | cross failed)"""
+        if self.mode != "cross" or self._cross_failed: return scores, "fused"
+        future = self._executor.submit(self._cross_scores, query, texts)
+        try: return future.result(max(0.0, deadline - time.perf_counter())), "cross"
+        except FutureTimeout:
+            future.cancel() # still queued behind an earlier question's run → never runs
+            source = "cross late"
+        except Exception as e:
+            logger.error(f"cross-encoder failed: {e}")
+            source = "cross failed"
+        return scores, source
+
+    def mmr(self, relevance: np.ndarray, embeddings: np.ndarray, top_k: int) -> List[int]:
+        """greedy mmr picks (positions into the pool), best first; near-duplicates of a pick are never picked.
+        mmr only picks above the relevance floor; short of top_k, the rest is backfilled in fused order"""
+        rel = _unit(relevance)
+        sims = embeddings @ embeddings.T
+        picked = [int(np.argmax(rel))]
+        closest = sims[picked[0]].copy() # max similarity of each candidate to anything picked so far
+        avail = rel >= self.min_rel
+        avail[picked[0]] = False
+        while len(picked) < top_k:
+            avail &= closest < self.dup_sim
+            if not avail.any(): break
+            mmr = np.where(avail, self.lambda_ * rel - (1 - self.lambda_) * closest, -np.inf)
+            best = int(np.argmax(mmr))
+            picked.append(best)
+            avail[best] = False
+            np.maximum(closest, sims[best], out=closest)
+        for pos in range(len(rel)): # below the floor but not a near-copy: still better than a smaller prompt
+            if len(picked) >= top_k: break
+            if pos in picked or closest[pos] >= self.dup_sim: continue
+            picked.append(pos)
+            np.maximum(closest, sims[pos], out=closest)
+        return picked
+
+    def rerank(self, query: str, texts: List[str], embeddings: np.ndarray, scores: np.ndarray, top_k: int,
+               count_tokens: Optional[Callable[[List[str]], List[int]]] = None) -> Tuple[List[int], np.ndarray, Dict]:
+        """texts / embeddings (normalized) / scores: the fused pool in fused order. returns (picked positions best
+        first, relevance per candidate, report) -- the report compares against sending the first top_k as they are"""
+        start = time.perf_counter()
+        relevance, source = self._relevance(query, texts, scores, start + self.budget_ms / 1000)
+        picked = self.mmr(relevance, embeddings, top_k) if len(texts) > 1 else list(range(len(texts)))
+        ms = (time.perf_counter() - start) * 1000
+
+        report = {"mode": self.mode, "relevance": source, "candidates": len(texts), "kept": len(picked), "ms": ms}
+        if count_tokens: # only the texts either prompt would hold
+            counted = sorted(set(range(min(top_k, len(texts)))) | set(picked))
+            n_tokens = dict(zip(counted, count_tokens([texts[pos] for pos in counted])))
+            report["tokens_before"] = sum(n_tokens[pos] for pos in range(min(top_k, len(texts))))
+            report["tokens_after"] = sum(n_tokens[pos] for pos in picked)
+            report["tokens_saved"] = report["tokens_before"] - report["tokens_after"]
+        return picked, relevance, report
+
+    def record(self, report: Dict): # a report whose segments went into an answer prompt -- /debug runs aren't counted
+        with self._stats_lock:
+            self.reranked += 1
+            self.total_ms += report["ms"]
+            self.tokens_before += report.get("tokens_before", 0)
+            self.tokens_after += report.get("tokens_after", 0)
+            self.cross_late += report["relevance"].startswith("cross ")
+
+    def stats(self) -> Dict:
+        with self._stats_lock:
+            n = self.reranked
+            return {"mode": self.mode, "reranked": n, "avg_ms": self.total_ms / n if n else 0.0, "cross_late": self.cross_late,
+                    "tokens_before": self.tokens_before, "tokens_after": self.tokens_after,
+                    "avg_tokens_saved": (self.tokens_before - self.tokens_after) / n if n else 0.0}
+
+_shared_reranker = None
+_shared_lock = threading.Lock()
+
+def get_reranker() -> Reranker:
+    global _shared_reranker
+    if _shared_reranker is None:
+        with _shared_lock:
+            if _shared_reranker is None:
+                _shared_reranker = Reranker()
+    return _shared_reranker
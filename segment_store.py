@@ -0,0 +1,162 @@
+import os
+import sys
+import json
+import numpy as np
+from array import array
+from collections.abc import Sequence
+from typing import Dict, Iterable, Iterator, List, Optional
+
+COLUMNS = {"offsets": "q", "section": "i", "type": "h", "part": "i", "page": "i", "doc": "i"} # column → array typecode, -1 = not set
+
+class SegmentStore(Sequence):
+    """columnar segment storage -- store[i] is segment i's text, like the list of str it replaces
+
+    every text lives in one utf-8 buffer sliced by an offsets array; section titles, types n doc ids are
+    interned into small tables n referenced by id; part numbers n pages are typed arrays. that's 26 bytes
+    per segment on top of its utf-8 text, instead of a str object + a dict repeating the text n section.
+    save() writes each column as .npy, load(mmap=True) maps them read-only: pages are read when touched n
+    the kernel can drop them again. the first add / extend copies a mapped store back into ram
+    """
+    def __init__(self):
+        self._text = bytearray()
+        for name, code in COLUMNS.items(): setattr(self, f"_{name}", array(code))
+        self._offsets.append(0)
+        self.sections: List[str] = []
+        self.types: List[str] = []
+        self.docs: List[str] = []
+        self._ids = {"sections": {}, "types": {}, "docs": {}} # table → value → id, None until a loaded store gets added to
+        self.mapped = False
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, i):
+        if isinstance(i, slice): return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0: i += len(self)
+        if not 0 <= i < len(self): raise IndexError(i)
+        # mapped: decoded straight off the pages (memoryview slice, no copy); in ram: one bytearray slice. never a
+        # memoryview over the bytearray -- add() can grow it from another thread
+        return str(self._text[self._offsets[i]:self._offsets[i + 1]], "utf-8")
+
+    def __iter__(self) -> Iterator[str]:
+        """one decode of the whole buffer; ascii text (char offsets == byte offsets) is then just sliced"""
+        text, offs = self._text, self._offsets
+        whole = str(text, "utf-8")
+        if len(whole) == len(text):
+            for start, end in zip(offs, offs[1:]): yield whole[start:end]
+        else:
+            for start, end in zip(offs, offs[1:]): yield str(text[start:end], "utf-8")
+
+    def section(self, i: int) -> str:
+        return self.sections[self._section[i]]
+
+    def iter_sections(self) -> Iterator[str]:
+        return (self.sections[sec] for sec in self._section)
+
+    def page(self, i: int) -> Optional[int]:
+        return int(self._page[i]) if self._page[i] >= 0 else None
+
+    def doc_id(self, i: int) -> Optional[str]:
+        return self.docs[self._doc[i]] if self._doc[i] >= 0 else None
+
+    def metadata(self, i: int) -> Dict: # the dict a segment arrived as
+        mtdt = {"text": self[i], "section": self.section(i), "type": self.types[self._type[i]]}
+        if self._part[i] >= 0: mtdt["part_number"] = int(self._part[i])
+        if self._page[i] >= 0: mtdt["page"] = int(self._page[i])
+        if self._doc[i] >= 0: mtdt["doc_id"] = self.docs[self._doc[i]]
+        return mtdt
+
+    def _intern(self, table: str, value: str) -> int:
+        if self._ids is None: self._ids = {tbl: {val: i for i, val in enumerate(getattr(self, tbl))} for tbl in ("sections", "types", "docs")}
+        ids = self._ids[table]
+        if value not in ids:
+            ids[value] = len(ids)
+            getattr(self, table).append(value)
+        return ids[value]
+
+    def _own(self): # mapped columns are read-only -- copy them into growable arrays before changing anything
+        if not self.mapped: return
+        self._text = bytearray(self._text)
+        for name, code in COLUMNS.items(): setattr(self, f"_{name}", array(code, getattr(self, f"_{name}").tobytes()))
+        self.mapped = False
+
+    def add(self, segments: Iterable[Dict], doc_id: str = None):
+        """append segment dicts (text, section, type, optional part_number / page / doc_id); doc_id overrides theirs"""
+        self._own()
+        for seg in segments:
+            self._text += seg["text"].encode("utf-8")
+            self._offsets.append(len(self._text))
+            self._section.append(self._intern("sections", seg.get("section", "")))
+            self._type.append(self._intern("types", seg.get("type", "text")))
+            self._part.append(seg["part_number"] if seg.get("part_number") is not None else -1)
+            self._page.append(seg["page"] if seg.get("page") is not None else -1)
+            did = doc_id or seg.get("doc_id")
+            self._doc.append(self._intern("docs", did) if did is not None else -1)
+
+    def extend(self, other: "SegmentStore", rows: Iterable[int] = None, doc_id: str = None):
+        """append other's segments (just these rows, in order) -- one bulk byte gather n id remaps, nothing decoded"""
+        self._own()
+        rows = np.arange(len(other)) if rows is None else np.fromiter(rows, dtype=np.int64)
+        if not len(rows): return
+        offs = np.asarray(other._offsets)
+        starts, lens = offs[rows], offs[rows + 1] - offs[rows]
+        ends = np.cumsum(lens)
+        gather = np.arange(ends[-1]) + np.repeat(starts - (ends - lens), lens) # the rows' byte idxs, back to back
+        base = len(self._text)
+        self._text += np.frombuffer(other._text, dtype=np.uint8)[gather].tobytes()
+        self._offsets.frombytes((base + ends).astype(np.int64).tobytes())
+
+        for name, table in (("section", "sections"), ("type", "types"), ("doc", "docs")):
+            ids = np.asarray(getattr(other, f"_{name}"))[rows]
+            if name == "doc" and doc_id is not None: new_ids = np.full(len(rows), self._intern("docs", doc_id))
+            else:
+                values = getattr(other, table)
+                lut = np.full(len(values) + 1, -1) # last slot maps -1 (not set) to itself
+                for old in np.unique(ids[ids >= 0]): lut[old] = self._intern(table, values[old])
+                new_ids = lut[ids]
+            getattr(self, f"_{name}").frombytes(new_ids.astype(COLUMNS[name]).tobytes())
+        for name in ("part", "page"): getattr(self, f"_{name}").frombytes(np.asarray(getattr(other, f"_{name}"))[rows].tobytes())
+
+    def select(self, rows: Iterable[int], doc_id: str = None) -> "SegmentStore": # new store w just these rows, renumbered from 0
+        store = SegmentStore()
+        store.extend(self, rows, doc_id)
+        return store
+
+    def nbytes(self) -> int:
+        """ram held: text buffer + columns (allocated, growth slack included) + the interned tables, their strs n
+        intern dicts, as sys.getsizeof sees them. mapped columns are page cache the kernel can reclaim, not counted"""
+        cols = 0 if self.mapped else sys.getsizeof(self._text) + sum(sys.getsizeof(getattr(self, f"_{name}")) for name in COLUMNS)
+        tables = sum(sys.getsizeof(table) + sum(map(sys.getsizeof, table)) for table in (self.sections, self.types, self.docs))
+        return cols + tables + (sum(map(sys.getsizeof, self._ids.values())) if self._ids is not None else 0) # dict keys are the tables' strs
+
+    def save(self, path: str):
+        np.save(os.path.join(path, "segments_text.npy"), np.frombuffer(self._text, dtype=np.uint8))
+        for name, code in COLUMNS.items():
+            np.save(os.path.join(path, f"segments_{name}.npy"), np.frombuffer(getattr(self, f"_{name}"), dtype=code))
+        with open(os.path.join(path, "segments.json"), "w", encoding="utf-8") as f:
+            json.dump({"sections": self.sections, "types": self.types, "docs": self.docs}, f)
+
+    @classmethod
+    def exists(cls, path: str) -> bool: # index caches written before the columnar layout keep segments in meta.json
+        return os.path.exists(os.path.join(path, "segments.json"))
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = False) -> "SegmentStore":
+        store = cls()
+        with open(os.path.join(path, "segments.json"), encoding="utf-8") as f:
+            tables = json.load(f)
+        for table in ("sections", "types", "docs"): setattr(store, table, tables[table])
+        store._ids = None # most loaded stores are only read
+
+        mode = "r" if mmap else None
+        text = np.load(os.path.join(path, "segments_text.npy"), mmap_mode=mode)
+        cols = {name: np.load(os.path.join(path, f"segments_{name}.npy"), mmap_mode=mode) for name in COLUMNS}
+        if mmap:
+            # memoryviews over the maps: indexing one gives a plain int / bytes slice, a numpy scalar costs ~10x more
+            store._text = memoryview(text)
+            for name, col in cols.items(): setattr(store, f"_{name}", memoryview(col))
+            store.mapped = True
+        else:
+            store._text = bytearray(text.tobytes())
+            for name, code in COLUMNS.items(): setattr(store, f"_{name}", array(code, cols[name].tobytes()))
+        return store
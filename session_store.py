@@ -0,0 +1,158 @@
+import os
+import time
+import shutil
+import logging
+import threading
+from collections import Counter, OrderedDict
+from collections.abc import MutableMapping
+from typing import Dict, Iterator
+from vector_search import VectorSearch
+
+logger = logging.getLogger(__name__)
+
+class SessionStore(MutableMapping):
+    """user id → VectorSearch corpus, kept within a memory budget
+
+    behaves like the plain dict it replaces. resident sessions are kept in lru order; once their estimated
+    size (VectorSearch.memory_bytes) passes max_bytes the least recently used ones are written to spill_dir
+    (the index cache's on-disk format) n dropped from ram, the next access loads them back transparently.
+    pinned sessions (an upload is streaming into them) n ones still indexing a document are never spilled.
+    spill_dir is wiped at startup -- sessions don't outlive the process, same as before
+    """
+    def __init__(self, spill_dir: str, max_bytes: int, embedder=None):
+        self.spill_dir = spill_dir
+        self.max_bytes = max_bytes # 0 = no budget, nothing is ever spilled
+        self.embedder = embedder
+        self._resident: "OrderedDict[int, VectorSearch]" = OrderedDict()
+        self._spilled: Dict[int, int] = {} # uid → corpus version written to disk
+        self._loading: Dict[int, threading.Event] = {}
+        self._evicting = set()
+        self._pins = Counter()
+        self._lock = threading.Lock()
+        self.evictions = 0
+        self.reloads = 0
+        self.reload_secs = 0.0
+        self.last_reload_secs = 0.0
+        shutil.rmtree(spill_dir, ignore_errors=True)
+        os.makedirs(spill_dir, exist_ok=True)
+
+    def _path(self, uid: int) -> str:
+        return os.path.join(self.spill_dir, str(uid))
+
+    def __getitem__(self, uid: int) -> VectorSearch:
+        with self._lock:
+            vector_search = self._resident.get(uid)
+            if vector_search is not None:
+                self._resident.move_to_end(uid)
+            elif uid not in self._spilled: raise KeyError(uid)
+            else:
+                loading = self._loading.get(uid)
+                if loading is None: self._loading[uid] = threading.Event()
+        if vector_search is not None:
+            self._evict()
+            return vector_search
+
+        if loading is not None: # someone else is already reading it back
+            loading.wait()
+            return self[uid]
+        try: # disk read outside the lock -- other users' lookups keep going
+            start = time.perf_counter()
+            vector_search = VectorSearch.load(self._path(uid), self.embedder, mmap=True) # texts stay on disk until read
+            secs = time.perf_counter() - start
+            with self._lock:
+                vector_search.version = self._spilled[uid] # disk copy stays valid until the corpus changes
+                self._resident[uid] = vector_search
+                self.reloads += 1
+                self.reload_secs += secs
+                self.last_reload_secs = secs
+            logger.info(f"reloaded session {uid} from disk in {secs*1000:.0f} ms")
+        finally:
+            with self._lock: self._loading.pop(uid).set()
+        self._evict()
+        return vector_search
+
+    def __setitem__(self, uid: int, vector_search: VectorSearch):
+        with self._lock:
+            self._resident[uid] = vector_search
+            self._resident.move_to_end(uid)
+            stale = self._spilled.pop(uid, None) is not None
+        if stale: shutil.rmtree(self._path(uid), ignore_errors=True)
+        self._evict()
+
+    def __delitem__(self, uid: int):
+        with self._lock:
+            resident = self._resident.pop(uid, None)
+            spilled = self._spilled.pop(uid, None)
+        if resident is None and spilled is None: raise KeyError(uid)
+        if spilled is not None: shutil.rmtree(self._path(uid), ignore_errors=True)
+
+    def __contains__(self, uid) -> bool:
+        with self._lock:
+            return uid in self._resident or uid in self._spilled
+
+    def __iter__(self) -> Iterator[int]:
+        with self._lock:
+            return iter(list(self._resident) + [uid for uid in self._spilled if uid not in self._resident])
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(set(self._resident) | set(self._spilled))
+
+    def pin(self, uid: int): # an upload is streaming into this session -- spilling it would lose the batches
+        with self._lock: self._pins[uid] += 1
+
+    def unpin(self, uid: int):
+        with self._lock:
+            self._pins[uid] -= 1
+            if self._pins[uid] <= 0: del self._pins[uid]
+        self._evict()
+
+    def _spillable(self, uid: int, vector_search: VectorSearch) -> bool:
+        return (uid not in self._pins and uid not in self._evicting and bool(vector_search.segments)
+                and all(info["complete"] for info in vector_search.docs.values()))
+
+    def _evict(self):
+        if not self.max_bytes: return
+        with self._lock:
+            sizes = [(uid, vs, vs.memory_bytes()) for uid, vs in self._resident.items()] # lru first
+            total = sum(size for _, _, size in sizes)
+            victims = []
+            for uid, vector_search, size in sizes[:-1]: # the most recently used one stays, even if it alone is over budget
+                if total <= self.max_bytes: break
+                if not self._spillable(uid, vector_search): continue
+                victims.append((uid, vector_search))
+                self._evicting.add(uid)
+                total -= size
+
+        for uid, vector_search in victims: # writes happen outside the lock
+            try:
+                version = vector_search.version
+                if self._spilled.get(uid) != version: # unchanged since its last spill → the files on disk are still good
+                    tmp_path = f"{self._path(uid)}.tmp"
+                    vector_search.save(tmp_path)
+                    shutil.rmtree(self._path(uid), ignore_errors=True)
+                    os.replace(tmp_path, self._path(uid))
+                with self._lock:
+                    # dropped only if nobody changed or cleared it meanwhile
+                    if self._resident.get(uid) is vector_search and vector_search.version == version and uid not in self._pins:
+                        del self._resident[uid]
+                        self._spilled[uid] = version
+                        self.evictions += 1
+            except Exception as e:
+                logger.error(f"error spilling session {uid}: {e}")
+                shutil.rmtree(f"{self._path(uid)}.tmp", ignore_errors=True)
+            finally:
+                with self._lock: self._evicting.discard(uid)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "resident": len(self._resident),
+                "spilled": sum(1 for uid in self._spilled if uid not in self._resident),
+                "bytes": sum(vs.memory_bytes() for vs in self._resident.values()),
+                "max_bytes": self.max_bytes,
+                "evictions": self.evictions,
+                "reloads": self.reloads,
+                "avg_reload_ms": self.reload_secs * 1000 / self.reloads if self.reloads else 0.0,
+                "last_reload_ms": self.last_reload_secs * 1000
+            }
@@ -0,0 +1,174 @@
+import os
+import json
+import logging
+import faiss
+import numpy as np
+from typing import Tuple
+from config import FAISS_INDEX_TYPE, FAISS_FLAT_MAX, FAISS_HNSW_MAX, FAISS_HNSW_M, FAISS_EF_SEARCH, FAISS_NPROBE
+
+logger = logging.getLogger(__name__)
+
+INDEX_TYPES = ("flat", "hnsw", "ivf", "sq8", "pq")
+MIN_TRAIN = {"ivf": 39 * 16, "sq8": 1, "pq": 39 * 256} # fewer vectors than this → stay on flat (faiss wants ~39 per centroid)
+REFINE_K = 4 # quantized types fetch k*REFINE_K candidates n rescore them w the exact embeddings
+EXACT_COPY = ("sq8", "pq") # lossy codes -- these keep the exact embeddings alongside, the others store them in the index
+
+class VectorIndex:
+    """inner-product faiss index over normalized embeddings, type picked by config or by vector count
+
+        flat  exact brute force                       4*dim bytes / vec
+        hnsw  graph, no training, incremental adds    flat + ~8*M bytes / vec
+        ivf   inverted lists over a trained coarse quantizer, exact vectors inside a list
+        sq8   brute force over int8 codes             dim bytes / vec
+        pq    ivf w product-quantized codes           dim/8 bytes / vec
+
+    auto = flat below flat_max vectors, hnsw below hnsw_max, ivf above. flat, hnsw n ivf hold the exact
+    normalized embeddings already n they are read back from the index; sq8 / pq keep a copy alongside to
+    rescore candidates exactly. either way switching type (or retraining once the data outgrew the training
+    set 4x) is a rebuild from memory, never a re-encode
+    """
+    def __init__(self, dim: int, kind: str = FAISS_INDEX_TYPE, flat_max: int = FAISS_FLAT_MAX, hnsw_max: int = FAISS_HNSW_MAX,
+                 hnsw_m: int = FAISS_HNSW_M, ef_search: int = FAISS_EF_SEARCH, nprobe: int = FAISS_NPROBE):
+        if kind != "auto" and kind not in INDEX_TYPES: raise ValueError(f"unknown faiss index type {kind!r}, expected auto or one of {INDEX_TYPES}")
+        self.dim = dim
+        self.kind = kind
+        self.flat_max = flat_max
+        self.hnsw_max = hnsw_max
+        self.hnsw_m = hnsw_m
+        self.ef_search = ef_search
+        self.nprobe = nprobe
+        self._vecs = None # sq8 / pq only: exact copy, capacity grows 2x, rows past ntotal unused
+        self.ntotal = 0
+        self.index = None
+        self.built_kind = None
+        self.trained_on = 0 # vectors the current index was trained on, 0 for untrained types
+
+    @property
+    def embeddings(self) -> np.ndarray:
+        """all normalized (ntotal, dim) float32 -- a view into the index (ivf: a copy), don't modify it or keep it
+        past the next add / keep. single rows: vectors()"""
+        if self._vecs is not None: return self._vecs[:self.ntotal]
+        if self.index is None or not self.ntotal: return np.empty((0, self.dim), dtype=np.float32)
+        if isinstance(self.index, faiss.IndexIVF): return self.index.reconstruct_n(0, self.ntotal)
+        flat = faiss.downcast_index(self.index.storage) if isinstance(self.index, faiss.IndexHNSW) else self.index
+        return faiss.rev_swig_ptr(flat.get_xb(), self.ntotal * self.dim).reshape(self.ntotal, self.dim)
+
+    def vectors(self, ids) -> np.ndarray: # normalized (len(ids), dim) float32 copies of these rows
+        ids = np.asarray(ids, dtype=np.int64)
+        if self._vecs is None and isinstance(self.index, faiss.IndexIVF) and len(ids): return self.index.reconstruct_batch(ids)
+        return self.embeddings[ids]
+
+    def kind_for(self, n: int) -> str:
+        kind = self.kind
+        if kind == "auto": kind = "flat" if n < self.flat_max else "hnsw" if n < self.hnsw_max else "ivf"
+        return kind if n >= MIN_TRAIN.get(kind, 0) else "flat"
+
+    def add(self, embeddings: np.ndarray):
+        """embeddings must already be normalized; appended in order, ids continue from ntotal"""
+        embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+        n_new = len(embeddings)
+        kind = self.kind_for(self.ntotal + n_new)
+        if self.index is None or kind != self.built_kind or (self.trained_on and self.ntotal + n_new > 4 * self.trained_on):
+            self.rebuild(kind, np.concatenate([self.embeddings, embeddings]) if self.ntotal else embeddings)
+            return
+
+        self.index.add(embeddings)
+        if self._vecs is not None:
+            if self.ntotal + n_new > len(self._vecs):
+                grown = np.empty((max(self.ntotal + n_new, 2 * len(self._vecs), 64), self.dim), dtype=np.float32)
+                grown[:self.ntotal] = self.embeddings
+                self._vecs = grown
+            self._vecs[self.ntotal:self.ntotal + n_new] = embeddings
+        self.ntotal += n_new
+
+    def keep(self, rows: np.ndarray):
+        """keep only these vectors (ascending ids), renumbered 0..len(rows)-1 -- a rebuild, no re-encode"""
+        self.rebuild(None, self.vectors(rows))
+
+    def rebuild(self, kind: str = None, vecs: np.ndarray = None):
+        """index vecs (default: the current embeddings) as kind (default: by count)"""
+        vecs = self.embeddings if vecs is None else vecs
+        n = len(vecs)
+        kind = kind or self.kind_for(n)
+        if kind == "flat":
+            index = faiss.IndexFlatIP(self.dim)
+        elif kind == "hnsw":
+            index = faiss.IndexHNSWFlat(self.dim, self.hnsw_m, faiss.METRIC_INNER_PRODUCT)
+        elif kind == "sq8":
+            index = faiss.IndexScalarQuantizer(self.dim, faiss.ScalarQuantizer.QT_8bit, faiss.METRIC_INNER_PRODUCT)
+        else: # ivf / pq -- ~4*sqrt(n) lists, capped so every list gets its ~39 training points
+            nlist = max(1, min(int(4 * np.sqrt(n)), n // 39))
+            quantizer = faiss.IndexFlatIP(self.dim)
+            if kind == "ivf": index = faiss.IndexIVFFlat(quantizer, self.dim, nlist, faiss.METRIC_INNER_PRODUCT)
+            else: index = faiss.IndexIVFPQ(quantizer, self.dim, nlist, self._pq_m(), 8, faiss.METRIC_INNER_PRODUCT)
+
+        if not index.is_trained: index.train(vecs)
+        index.add(vecs)
+        # copy before the old index goes -- vecs may be a view into it
+        self._vecs = np.array(vecs, dtype=np.float32) if kind in EXACT_COPY else None
+        self.ntotal = n
+        self.index = index
+        self._set_search_params()
+        if self.built_kind and kind != self.built_kind: logger.info(f"faiss index {self.built_kind} → {kind} at {n} vectors")
+        self.built_kind = kind
+        self.trained_on = n if kind in MIN_TRAIN else 0
+
+    def _pq_m(self) -> int: # sub-quantizers: dim/8 (8 bytes of float per 1 byte code), must divide dim
+        m = max(1, self.dim // 8)
+        while self.dim % m: m -= 1
+        return m
+
+    def _set_search_params(self):
+        if isinstance(self.index, faiss.IndexHNSW): self.index.hnsw.efSearch = max(self.ef_search, 1)
+        elif isinstance(self.index, faiss.IndexIVF):
+            self.index.nprobe = min(self.nprobe, self.index.nlist)
+            self.index.make_direct_map() # id → list entry, so vectors() / embeddings can read rows back
+
+    def search(self, qry: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """(scores, ids) like faiss, (n_qry, k); ann types may return fewer hits, padded w id -1"""
+        if self.built_kind not in ("sq8", "pq"): return self.index.search(qry, k)
+        _, cands = self.index.search(qry, k * REFINE_K)
+        scores = np.full((len(qry), k), -np.inf, dtype=np.float32)
+        ids = np.full((len(qry), k), -1, dtype=np.int64)
+        for row, cand in enumerate(cands):
+            cand = cand[cand >= 0]
+            exact = self.embeddings[cand] @ qry[row]
+            top = np.argsort(-exact)[:k]
+            scores[row, :len(top)] = exact[top]
+            ids[row, :len(top)] = cand[top]
+        return scores, ids
+
+    def resident_bytes(self) -> int:
+        """estimated ram of the stored embeddings + the faiss index, from sizes alone (memory_bytes serializes)"""
+        n, d = self.ntotal, self.dim
+        nlist = self.index.nlist if isinstance(self.index, faiss.IndexIVF) else 0
+        per_vec = {"flat": 4*d, "hnsw": 4*d + 8*self.hnsw_m + 16, "ivf": 4*d + 8, "sq8": d, "pq": self._pq_m() + 8}.get(self.built_kind, 0)
+        return (self._vecs.nbytes if self._vecs is not None else 0) + n * per_vec + nlist * 4 * d + (256 * 4 * d if self.built_kind == "pq" else 0)
+
+    def memory_bytes(self) -> int: # index only -- serialized size is what faiss holds in ram for these types
+        return int(faiss.serialize_index(self.index).nbytes) if self.index is not None else 0
+
+    def save(self, path: str):
+        faiss.write_index(self.index, os.path.join(path, "index.faiss"))
+        if self._vecs is not None: np.save(os.path.join(path, "embeddings.npy"), self.embeddings)
+        with open(os.path.join(path, "index.json"), "w", encoding="utf-8") as f:
+            json.dump({"built_kind": self.built_kind, "trained_on": self.trained_on}, f)
+
+    @classmethod
+    def load(cls, path: str) -> "VectorIndex":
+        index = faiss.read_index(os.path.join(path, "index.faiss"))
+        meta = {"built_kind": "flat", "trained_on": 0} # caches from before index types were flat only
+        if os.path.exists(os.path.join(path, "index.json")):
+            with open(os.path.join(path, "index.json"), encoding="utf-8") as f:
+                meta = json.load(f)
+        vidx = cls(index.d) # type config of this run decides what the next add rebuilds into
+        if meta["built_kind"] in EXACT_COPY:
+            emb_path = os.path.join(path, "embeddings.npy")
+            vecs = np.load(emb_path) if os.path.exists(emb_path) else index.reconstruct_n(0, index.ntotal)
+            vidx._vecs = np.ascontiguousarray(vecs, dtype=np.float32)
+        vidx.ntotal = index.ntotal
+        vidx.index = index
+        vidx.built_kind = meta["built_kind"]
+        vidx.trained_on = meta["trained_on"]
+        vidx._set_search_params()
+        return vidx
@@ -1,172 +1,429 @@
-from sentence_transformers import SentenceTransformer
-import faiss
 import numpy as np
-from typing import List, Dict, Set
-import re
-from collections import Counter
+from typing import Iterable, List, Dict, Optional, Set
+import os
+import json
+import time
+import heapq
+import pickle
+import hashlib
+import logging
+import threading
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from config import SEARCH_RRF_K, SEARCH_SEMANTIC_SHORTCUT, SEARCH_PARALLEL, SEARCH_WORKERS, SEARCH_BUDGET_MS
+from embedding_service import EmbeddingService, get_embedding_service
+from lexical_index import LexicalIndex, WORD_RE
+from reranker import Reranker, get_reranker
+from segment_store import SegmentStore
+from vector_index import VectorIndex
+
+logger = logging.getLogger(__name__)
+
+FUSION_WEIGHTS = {"semantic": 1.0, "keyword": 1.0, "fuzzy": 0.5, "section": 0.5} # per-strategy rrf weight
+
+_search_pool = None
+_search_pool_lock = threading.Lock()
+
+def get_search_pool() -> ThreadPoolExecutor: # one pool for every session's lexical strategies, like the shared model
+    global _search_pool
+    if _search_pool is None:
+        with _search_pool_lock:
+            if _search_pool is None: _search_pool = ThreadPoolExecutor(SEARCH_WORKERS, thread_name_prefix="search")
+    return _search_pool
+
+_NEVER = threading.Event() # cancel token of runs nobody cancels: serial ranking, /debug listings
+
+def _log_straggler(future): # a strategy left behind still has to say why it failed, nobody reads its result
+    if not future.cancelled() and future.exception() is not None: logger.error(f"search strategy failed after its budget: {future.exception()}")
+
+def by_score(res: Dict): # heap key: score desc, then segment order -- same order a stable full sort gave
+    return res["score"], -res["index"]
+
+class QueryAnalysis:
+    """everything the strategies need from a query, computed once per question: embedding + tokenization"""
+    def __init__(self, query: str, embedding: np.ndarray):
+        self.query = query
+        self.lower = query.lower()
+        self.embedding = embedding # normalized (1, dim) float32
+        self.words = WORD_RE.findall(self.lower) # in order, dups kept -- fuzzy scoring counts them
+        self.word_set = set(self.words)
+        self.long_words = [wrd for wrd in self.words if len(wrd)>=4]
+        self.rows = None # segment idxs the strategies may return, None = all -- set by search() for a doc filter
+        self.timings: Dict[str, float] = {} # strategy → ms, for /debug
+        self.dropped: List[str] = [] # strategies left out of fusion for overrunning their budget
 
 class VectorSearch:
-    def __init__(self):
-        self.model = SentenceTransformer('all-MiniLM-L6-v2')
-        self.idx = None
-        self.segments = []
-        self.segment_metadata = []
-        self.doc_keywords = set()
+    """one user's corpus: every pdf they uploaded in one growing index
+
+    segments (a SegmentStore, reads like a list of texts) carries each segment's section, page n doc_id
+    (sha-256 of its pdf), so searches can be limited to some documents n a document can be dropped
+    again -- its rows are cut out of the stored embeddings, nothing is re-encoded
+    """
+    def __init__(self, embedder: EmbeddingService = None, rrf_k: int = SEARCH_RRF_K, semantic_shortcut: float = SEARCH_SEMANTIC_SHORTCUT,
+                 parallel: bool = SEARCH_PARALLEL, budgets_ms: Dict[str, float] = None, reranker: Reranker = None):
+        self.model = embedder or get_embedding_service() # shared across sessions -- never load a model per user
+        self.reranker = reranker or get_reranker() # shared too, mode "off" → search returns the fused top_k as is
+        self.rrf_k = rrf_k
+        self.semantic_shortcut = semantic_shortcut
+        self.parallel = parallel
+        self.budgets_ms = budgets_ms or {name: SEARCH_BUDGET_MS for name in ("keyword", "fuzzy", "section")} # 0 = no budget
+        self.idx = None # VectorIndex, faiss type follows FAISS_INDEX_TYPE / segment count
+        self.segments = SegmentStore()
+        self.lex_idx = LexicalIndex()
+        self.docs: Dict[str, Dict] = {} # doc_id → {"name", "segments", "complete"}, in upload order
+        self._doc_rows: Dict[str, List[int]] = defaultdict(list) # doc_id → its segment idxs
+        self.version = 0 # bumped on every change -- lets the session store skip re-spilling an unchanged corpus
+        self._lock = threading.RLock() # ingest can append batches while the user is already asking questions
+        self._running = 0 # lexical strategies submitted to the pool n not done yet -- they outlive search()'s lock
+        self._idle = threading.Condition() # own lock: a strategy finishing must not wait for the search holding _lock
     
     def create_embeddings(self, segments: List[Dict[str, str]]):
-        self.segments = [seg["text"] for seg in segments]
-        self.segment_metadata = segments
-        
-        self.doc_keywords = self._extract_document_keywords()
-        
+        with self._lock:
+            self._wait_strategies()
+            self.idx = None
+            self.segments = SegmentStore()
+            self.lex_idx = LexicalIndex()
+            self.docs = {}
+            self._doc_rows = defaultdict(list)
+        self.add_segments(segments)
+    
+    def add_segments(self, segments: List[Dict[str, str]], doc_id: str = None):
+        """append a batch to the live index -- encoding happens outside the lock so searches keep running"""
+        if not segments: return
         upd_txts = []
         for seg in segments:
             updtxt = f"{seg['section']} {seg['text']}" # UPD -- include title in embedding cntxt
             upd_txts.append(updtxt)
+        batch = SegmentStore()
+        batch.add(segments, doc_id)
         
         embeddings = self.model.encode(upd_txts)
-        
-        dimension = embeddings.shape[1]
-        self.idx = faiss.IndexFlatIP(dimension)
-        
         embeddings = embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
-        self.idx.add(embeddings.astype('float32'))
-    
-    def _extract_document_keywords(self) -> Set[str]:
-        full_txt = " ".join(self.segments).lower()
-        
-        words = re.findall(r'\b[a-zA-Z]{3,}\b', full_txt)
-        total_word_cnt = len(words)
-        wrd_cnts = Counter(words)
-        pop_wrds = set()
-        
-        for word,cnt in wrd_cnts.items():
-            if 2 <= cnt <= total_word_cnt*0.2 and len(word)>=4: # words that appear 2+ times but not more than 20% of doc
-                pop_wrds.add(word)
-        
-        for mtdt in self.segment_metadata: # words that appear in short lines are LIKELY to be section indicators -- title, header, etc
-            section_words = re.findall(r'\b[a-zA-Z]{4,}\b', mtdt['section'].lower())
-            pop_wrds.update(section_words)
         
-        return pop_wrds
+        with self._lock:
+            self._append(batch, embeddings)
+    
+    def _append(self, batch: SegmentStore, embeddings: np.ndarray):
+        self._wait_strategies()
+        if self.idx is None: self.idx = VectorIndex(embeddings.shape[1])
+        self.idx.add(embeddings)
+        for i in range(len(batch)):
+            doc_id = batch.doc_id(i)
+            if doc_id is None: continue
+            self._doc_rows[doc_id].append(len(self.segments) + i)
+            if doc_id in self.docs: self.docs[doc_id]["segments"] += 1
+        self.segments.extend(batch)
+        self.lex_idx.add(batch, batch.iter_sections())
+        self.version += 1
+    
+    def start_document(self, doc_id: str, name: str) -> bool: # registered before its first batch; False → already in the corpus
+        with self._lock:
+            if doc_id in self.docs: return False
+            self.docs[doc_id] = {"name": name, "segments": 0, "complete": False}
+            self.version += 1
+            return True
+    
+    def finish_document(self, doc_id: str):
+        with self._lock:
+            if doc_id in self.docs: self.docs[doc_id]["complete"] = True
+            self.version += 1
+    
+    def add_document_index(self, other: "VectorSearch", doc_id: str, name: str) -> bool:
+        """merge an already built single-document index (e.g. from the index cache) -- no encoding"""
+        with other._lock:
+            batch = other.segments.select(range(len(other.segments)), doc_id)
+            embeddings = other.idx.embeddings.copy() if other.idx is not None else None
+        with self._lock:
+            if doc_id in self.docs: return False
+            self.docs[doc_id] = {"name": name, "segments": 0, "complete": True}
+            if len(batch): self._append(batch, embeddings)
+            return True
+    
+    def remove_document(self, doc_id: str) -> int:
+        """drop a document's segments; the index is rebuilt from the remaining stored embeddings n the
+        lexical index re-tokenized, nothing is re-encoded. returns segments removed"""
+        with self._lock:
+            self.docs.pop(doc_id, None)
+            self.version += 1
+            dropped = set(self._doc_rows.get(doc_id, ()))
+            if not dropped: return 0
+            self._wait_strategies()
+            keep = [i for i in range(len(self.segments)) if i not in dropped]
+            self.segments = self.segments.select(keep)
+            self.idx.keep(np.array(keep, dtype=np.int64))
+            self._index_doc_rows()
+            self._build_lexical_index()
+            return len(dropped)
+    
+    def document_index(self, doc_id: str) -> "VectorSearch":
+        """a standalone copy of one document (segments + stored embeddings), e.g. for the index cache"""
+        vs = VectorSearch(self.model)
+        with self._lock:
+            rows = self._doc_rows.get(doc_id, [])
+            batch = self.segments.select(rows)
+            embeddings = self.idx.vectors(rows) if rows else None
+            info = dict(self.docs.get(doc_id, {"name": "", "complete": True}), segments=0)
+        vs.docs[doc_id] = info
+        if rows: vs._append(batch, embeddings)
+        return vs
+    
+    def memory_bytes(self) -> int:
+        """estimated resident size: embeddings + faiss index + lexical index + segment store -- counters only,
+        cheap enough to call per question. no lock on purpose: an estimate may be a batch behind, but it never
+        waits on an ingest holding the lock"""
+        idx = self.idx
+        idx_bytes = idx.resident_bytes() if idx is not None else 0
+        return idx_bytes + self.lex_idx.memory_bytes() + self.segments.nbytes()
+    
+    def corpus_key(self, doc_ids: Iterable[str] = None) -> Optional[str]:
+        """stable id of the searched document set, keys answer caching; None while any of them is still indexing
+        (answers from a partly indexed doc must not be cached). one document → its own sha-256"""
+        with self._lock:
+            ids = sorted(doc_ids or self.docs)
+            if not ids or not all(self.docs.get(doc_id, {}).get("complete") for doc_id in ids): return None
+        return ids[0] if len(ids) == 1 else hashlib.sha256("|".join(ids).encode("ascii")).hexdigest()
+    
+    def _strategy_done(self, future):
+        with self._idle:
+            self._running -= 1
+            if not self._running: self._idle.notify_all()
+    
+    def _wait_strategies(self):
+        """writers call this under _lock: strategies a search left on the pool still read the lexical index.
+        no new search can start meanwhile, n dropped ones are cancelled, so this is a short wait"""
+        with self._idle: self._idle.wait_for(lambda: not self._running)
+    
+    def _rows_for(self, doc_ids: Optional[Iterable[str]]) -> Optional[Set[int]]: # None = no filter
+        if not doc_ids: return None
+        doc_ids = set(doc_ids)
+        if doc_ids >= set(self._doc_rows): return None
+        return {i for doc_id in doc_ids for i in self._doc_rows.get(doc_id, ())}
+    
+    def _index_doc_rows(self):
+        self._doc_rows = defaultdict(list)
+        for i in range(len(self.segments)):
+            doc_id = self.segments.doc_id(i)
+            if doc_id is not None: self._doc_rows[doc_id].append(i)
+    
+    def _build_lexical_index(self): # tokenize every segment once at ingest -- queries only read the postings
+        self.lex_idx = LexicalIndex()
+        self.lex_idx.add(self.segments, self.segments.iter_sections())
     
     def create_embeddings_simple(self, segments: List[str]): # fallback func for simple str segments
-        self.segments = segments
-        self.segment_metadata = [{"text": seg, "section": "unknown", "type": "text"} for seg in segments]
-        
-        self.doc_keywords = self._extract_document_keywords() # evenf from smiple segments
-        
-        embeddings = self.model.encode(segments)
-        
-        dimension = embeddings.shape[1]
-        self.idx = faiss.IndexFlatIP(dimension)
-        
+        embeddings = self.model.encode(segments) # outside the lock like add_segments, searches keep running
         embeddings = embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
-        self.idx.add(embeddings.astype('float32'))
+        
+        with self._lock:
+            self._wait_strategies()
+            self.segments = SegmentStore()
+            self.segments.add({"text": seg, "section": "unknown", "type": "text"} for seg in segments)
+            self.docs = {}
+            self._doc_rows = defaultdict(list)
+            self.version += 1
+            
+            self._build_lexical_index()
+            
+            self.idx = VectorIndex(embeddings.shape[1])
+            self.idx.add(embeddings)
+    
+    def save(self, path: str): # everything create_embeddings produced, so a reload skips extraction n encoding
+        with self._lock:
+            self._save(path)
+    
+    def _save(self, path: str):
+        os.makedirs(path, exist_ok=True)
+        self.idx.save(path)
+        self.segments.save(path)
+        with open(os.path.join(path, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump({"docs": self.docs, "embedding_model": self.model.model_name}, f)
+        with open(os.path.join(path, "lexical.pkl"), "wb") as f:
+            pickle.dump(self.lex_idx, f, protocol=pickle.HIGHEST_PROTOCOL)
     
-    def search(self, query: str, top_k: int = 5) -> List[str]:
+    @classmethod
+    def load(cls, path: str, embedder: EmbeddingService = None, mmap: bool = False) -> "VectorSearch":
+        """mmap: map the segment texts read-only instead of reading them in (see SegmentStore)"""
+        vs = cls(embedder)
+        vs.idx = VectorIndex.load(path)
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("embedding_model", vs.model.model_name) != vs.model.model_name: # vectors of another model, maybe another dim
+            raise ValueError(f"index built w {meta['embedding_model']}, not {vs.model.model_name}")
+        if SegmentStore.exists(path): vs.segments = SegmentStore.load(path, mmap)
+        else: vs.segments.add(meta["segment_metadata"]) # written before the columnar layout
+        vs.docs = meta.get("docs", {}) # entries written before multi-doc corpora have no doc ids
+        vs._index_doc_rows()
+        with open(os.path.join(path, "lexical.pkl"), "rb") as f:
+            vs.lex_idx = pickle.load(f)
+        if vs.lex_idx.bm25 is None: vs._build_lexical_index() # pickled before bm25 -- re-tokenize once
+        return vs
+    
+    def embed_query(self, query: str) -> np.ndarray: # normalized (1, dim) float32 -- callers can reuse it, e.g. for answer caching
+        return self.model.encode_query(query)
+    
+    def analyze(self, query: str, qry_embedding: np.ndarray = None) -> QueryAnalysis: # encode outside the lock, ingest keeps appending
+        return QueryAnalysis(query, self.embed_query(query) if qry_embedding is None else qry_embedding)
+    
+    def search(self, query: str, top_k: int = 5, qry_embedding: np.ndarray = None, doc_ids: Iterable[str] = None,
+               report: Dict = None, with_metadata: bool = False) -> List:
         """croe search method w multiple strategies combined:
             1. direct semantic search
-            2. keyword-based search using document's own vocab
+            2. bm25 keyword search over section title + text
             3. fuzzy matching for partial terms
             4. section-title matching
             
             then:
-            → combine all results
-            → dedup n rank em
+            → fuse the ranked lists (weighted rrf, see _fuse)
+            → skip 2-4 when the semantic hits are already decisive
+            → rerank the fused pool down to top_k (mmr / cross-encoder, see Reranker)
+        
+        qry_embedding: embed_query(query) if the caller already has it
+        doc_ids: only search these documents, None = the whole corpus
+        report: filled w the reranker's report (candidates, kept, prompt tokens before / after, ms)
+        with_metadata: segment dicts (text, section, type, part_number, page, doc_id) instead of texts, for prompt packing
         """
+        qa = self.analyze(query, qry_embedding)
+        with self._lock:
+            qa.rows = self._rows_for(doc_ids)
+            return self._search(qa, top_k, report, with_metadata)
+    
+    def _search(self, qa: QueryAnalysis, top_k: int, report: Dict = None, with_metadata: bool = False) -> List:
         if not self.idx or not self.segments: return []
-        
-        semantic_resz = self._semantic_search(query, top_k * 2)
-        keyword_resz = self._adaptive_keyword_search(query, top_k)
-        fuzzy_resz = self._fuzzy_search(query, top_k)
-        section_resz = self._section_search(query, top_k)
-        
-        all_resz = semantic_resz + keyword_resz + fuzzy_resz + section_resz
-        
-        seen_idxs = set()
-        final_res = []        
-        for res in all_resz:
-            if res["index"] not in seen_idxs:
-                final_res.append(res)
-                seen_idxs.add(res["index"])
-        
-        final_res.sort(key=lambda x: x["score"], reverse=True)
-        return [self.segments[r["index"]] for r in final_res[:top_k]]
+        resz = self._reranked(qa, top_k, report) if self.reranker.enabled else self._ranked(qa, top_k)
+        get = self.segments.metadata if with_metadata else self.segments.__getitem__
+        return [get(r["index"]) for r in resz]
+    
+    def _lexical_strategies(self):
+        return [("keyword", self._keyword_search), ("fuzzy", self._fuzzy_search), ("section", self._section_search)]
     
-    def _semantic_search(self, query: str, top_k: int) -> List[Dict]: # similarity saerch
-        qry_embedding = self.model.encode([query])
-        qry_embedding = qry_embedding / np.linalg.norm(qry_embedding, axis=1, keepdims=True)
+    def _timed(self, qa: QueryAnalysis, name: str, strategy, top_k: int, *args) -> List[Dict]:
+        start = time.perf_counter()
+        try: return strategy(qa, top_k, *args)
+        finally: qa.timings[name] = (time.perf_counter() - start) * 1000
+    
+    def _ranked(self, qa: QueryAnalysis, top_k: int, depth: int = 0) -> List[Dict]:
+        """fused top max(top_k, depth) -- depth > top_k gives the reranker a pool, the shortcut still looks at top_k"""
+        qa.dropped = [] # a qa can be ranked again (/debug)
+        if self.parallel: return self._ranked_parallel(qa, top_k, depth)
+        n = max(top_k, depth)
+        semantic_resz = self._timed(qa, "semantic", self._semantic_search, n)
+        if self._semantic_decisive(semantic_resz, top_k): return semantic_resz
         
-        scores, idxs = self.idx.search(qry_embedding.astype('float32'), min(top_k, len(self.segments)))
+        ranked = {"semantic": semantic_resz}
+        for name, strategy in self._lexical_strategies(): ranked[name] = self._timed(qa, name, strategy, n)
+        return self._fuse(ranked, n)
+    
+    def _ranked_parallel(self, qa: QueryAnalysis, top_k: int, depth: int = 0) -> List[Dict]:
+        """lexical strategies go to the shared pool, semantic runs here meanwhile (faiss releases the gil).
+        each lexical one gets budgets_ms[name] from the start of the question; a late one is left out of fusion
+        instead of holding the answer. a late one keeps running after search() returns: it checks this run's own
+        cancel token between steps n stops, writers wait for it (_wait_strategies), its errors are logged"""
+        start = time.perf_counter()
+        n = max(top_k, depth)
+        pool = get_search_pool()
+        cancel = threading.Event() # per run -- a qa ranked again must not revive the last run's stragglers
+        futures = {}
+        for name, strategy in self._lexical_strategies():
+            with self._idle: self._running += 1
+            futures[name] = pool.submit(self._timed, qa, name, strategy, n, cancel)
+            futures[name].add_done_callback(self._strategy_done) # cancelled before running counts as done too
+        try:
+            semantic_resz = self._timed(qa, "semantic", self._semantic_search, n)
+            if self._semantic_decisive(semantic_resz, top_k): return semantic_resz
+            
+            ranked = {"semantic": semantic_resz}
+            for name, future in futures.items():
+                budget = self.budgets_ms.get(name, 0) / 1000
+                try: ranked[name] = future.result(max(0.0, budget - (time.perf_counter() - start)) if budget else None)
+                except FutureTimeout: qa.dropped.append(name)
+            return self._fuse(ranked, n)
+        finally:
+            cancel.set()
+            for future in futures.values():
+                if not future.done():
+                    future.cancel() # still queued behind other questions → never runs
+                    future.add_done_callback(_log_straggler)
+    
+    def _reranked(self, qa: QueryAnalysis, top_k: int, report: Dict = None) -> List[Dict]:
+        """fused pool of reranker.pool segments, cut to top_k by the reranker -- scores are its relevance"""
+        resz = self._ranked(qa, top_k, self.reranker.pool)
+        if not resz: return resz
+        rows = np.array([r["index"] for r in resz], dtype=np.int64)
+        start = time.perf_counter()
+        picked, relevance, rerank_report = self.reranker.rerank(qa.query, [self.segments[i] for i in rows], self.idx.vectors(rows),
+                                                                np.array([r["score"] for r in resz]), top_k,
+                                                                self.reranker.count_tokens if report is not None else None)
+        qa.timings["rerank"] = (time.perf_counter() - start) * 1000 # tokens counted too, report["ms"] is the rerank alone
+        if report is not None: report.update(rerank_report)
+        return [{"index": int(rows[pos]), "score": float(relevance[pos]), "type": "reranked"} for pos in picked]
+    
+    def _semantic_decisive(self, semantic_resz: List[Dict], top_k: int) -> bool:
+        """all top_k slots taken by strong semantic matches -- lexical hits could only push one of them out"""
+        return 0 < self.semantic_shortcut <= (semantic_resz[top_k - 1]["score"] if len(semantic_resz) >= top_k else -1)
+    
+    def _fuse(self, ranked: Dict[str, List[Dict]], top_k: int) -> List[Dict]:
+        """weighted reciprocal rank fusion: a segment scores sum(weight / (rrf_k + rank)) over the strategies that
+        found it. ranks, not raw scores -- cosine, overlap ratios n fuzzy hit counts aren't on one scale. equal
+        scores within a strategy share a rank (section search scores every part of a title the same)"""
+        fused = {}
+        for name, resz in ranked.items():
+            weight = FUSION_WEIGHTS[name]
+            rank, prev = 0, None
+            for pos, res in enumerate(resz, 1):
+                if res["score"] != prev: rank, prev = pos, res["score"]
+                fused[res["index"]] = fused.get(res["index"], 0.0) + weight / (self.rrf_k + rank)
+        top = heapq.nlargest(top_k, fused.items(), key=lambda kv: kv[1]) # ties keep first-found order, semantic first
+        return [{"index": i, "score": score, "type": "fused"} for i, score in top]
+    
+    def _semantic_search(self, qa: QueryAnalysis, top_k: int) -> List[Dict]: # similarity saerch
+        if qa.rows is not None: # doc filter -- exact scan of just those docs' stored embeddings
+            rows = np.fromiter(qa.rows, dtype=np.int64, count=len(qa.rows))
+            sims = self.idx.vectors(rows) @ qa.embedding[0]
+            top = np.argpartition(-sims, top_k)[:top_k] if len(sims) > top_k else np.arange(len(sims))
+            top = top[np.argsort(-sims[top])]
+            idxs, scores = rows[top][None, :], sims[top][None, :]
+        else: scores, idxs = self.idx.search(qa.embedding, min(top_k, len(self.segments)))
         resz = []
         for i, score in zip(idxs[0], scores[0]):
-            if score > 0.05:
-                resz.append({"index": i, "score": float(score), "type": "semantic"})
+            if i >= 0 and score > 0.05: # ann indexes pad short result lists w -1
+                resz.append({"index": int(i), "score": float(score), "type": "semantic"})
         
         return resz
     
-    def _adaptive_keyword_search(self, query: str, top_k: int) -> List[Dict]:
-        qry_wrds = set(re.findall(r'\b[a-zA-Z]{3,}\b', query.lower()))
-        resz = []
+    def _keyword_search(self, qa: QueryAnalysis, top_k: int, cancel: threading.Event = _NEVER) -> List[Dict]:
+        """bm25 over segment text n section titles (see BM25Index) -- one sparse dot product, then a partial sort"""
+        scores = self.lex_idx.bm25.scores(qa.words)
+        if cancel.is_set(): return [] # over budget, nobody reads this anymore
+        if qa.rows is not None:
+            rows = np.fromiter(qa.rows, dtype=np.int64, count=len(qa.rows))
+            cands = rows[scores[rows] > 0]
+        else: cands = np.flatnonzero(scores)
+        if len(cands) > top_k: cands = cands[np.argpartition(-scores[cands], top_k)[:top_k]]
         
-        for i, sgmt in enumerate(self.segments):
-            segment_words = set(re.findall(r'\b[a-zA-Z]{3,}\b', sgmt.lower()))
-            
-            exact_matches = qry_wrds.intersection(segment_words)
-            
-            # matches with doc keywords
-            doc_keyword_matches = qry_wrds.intersection(self.doc_keywords)
-            segment_keyword_matches = segment_words.intersection(self.doc_keywords)
-            keyword_overlap = doc_keyword_matches.intersection(segment_keyword_matches)
-            
-            total_matches = len(exact_matches) + len(keyword_overlap)*0.5
-            if total_matches>0:
-                score = total_matches / max(len(qry_wrds), 1)
-                resz.append({"index": i, "score": score, "type": "keyword"})
-        
-        return sorted(resz, key=lambda x: x["score"], reverse=True)[:top_k]
+        resz = [{"index": int(i), "score": float(scores[i]), "type": "keyword"} for i in cands]
+        return heapq.nlargest(top_k, resz, key=by_score)
     
-    def _fuzzy_search(self, query: str, top_k: int) ->List[Dict]:
-        qry_wrds = re.findall(r'\b[a-zA-Z]{4,}\b', query.lower())
-        resz = []
+    def _fuzzy_search(self, qa: QueryAnalysis, top_k: int, cancel: threading.Event = _NEVER) ->List[Dict]:
+        qry_wrds = qa.long_words
+        scores = Counter()
         
-        for i, sgmt in enumerate(self.segments):
-            segment_lower = sgmt.lower()
-            score = 0
+        for qrywrd in qry_wrds:
+            if cancel.is_set(): break # over budget, nobody reads this anymore
+            substr_hits = self.lex_idx.substring_candidates(qrywrd) # look for substr | partail matches
+            for i in substr_hits: scores[i] += 1
             
-            for qrywrd in qry_wrds: # look for substr | partail matches
-                if qrywrd in segment_lower: score += 1
-                else: #4fuzzy matches - half of score for that
-                    for sgmt_wrd in re.findall(r'\b[a-zA-Z]{4,}\b', segment_lower):
-                        if self._fuzzy_match(qrywrd, sgmt_wrd): score += 0.5; break
-            
-            if score>0:
-                finScore = score / len(qry_wrds) if qry_wrds else 0
-                resz.append({"index": i, "score": finScore, "type": "fuzzy"})
-        
-        return sorted(resz, key=lambda x: x["score"], reverse=True)[:top_k]
-    
-    def _fuzzy_match(self, word1: str, word2: str, threshold: float = 0.7) -> bool: # based on char overlap
-        if len(word1)<4 or len(word2)<4: return False
-        
-        # check if one word contains most of the other
-        short_wrd, long_wrd = (word1, word2) if len(word1) <= len(word2) else (word2, word1)
+            # 4fuzzy matches - half of score for that | vectorized over the doc vocab, see FuzzyMatcher
+            for i in self.lex_idx.fuzzy_candidates(qrywrd) - substr_hits: scores[i] += 0.5
         
-        overlap = sum(1 for char in short_wrd if char in long_wrd)
-        similarity = overlap / len(short_wrd)
-        return similarity >= threshold
+        resz = [{"index": i, "score": scores[i] / len(qry_wrds), "type": "fuzzy"} for i in scores if qa.rows is None or i in qa.rows]
+        return heapq.nlargest(top_k, resz, key=by_score)
     
-    def _section_search(self, query: str, top_k: int) -> List[Dict]:
-        qry_lower = query.lower()
-        qry_wrds = set(re.findall(r'\b[a-zA-Z]{3,}\b', qry_lower))
+    def _section_search(self, qa: QueryAnalysis, top_k: int, cancel: threading.Event = _NEVER) -> List[Dict]:
+        qry_wrds = qa.word_set
         resz = []
         
-        for i, metadata in enumerate(self.segment_metadata):
-            section_title = metadata.get("section", "").lower()
-            if not section_title or section_title == "unknown": continue
-            
-            section_words = set(re.findall(r'\b[a-zA-Z]{3,}\b', section_title))
+        for section_title, idxs in self.lex_idx.section_segments.items(): # score each distinct title once, not once per part
+            if cancel.is_set(): return []
+            section_words = self.lex_idx.section_tokens[section_title]
             
             matches = qry_wrds.intersection(section_words) # exact word matches in section title
             substr_matches = sum(1 for wrd in qry_wrds if wrd in section_title) # substr matches
@@ -174,38 +431,49 @@ class VectorSearch:
             total_score = len(matches) + substr_matches*0.5
             if total_score>0:
                 finScore = total_score/len(qry_wrds) if qry_wrds else 0
-                resz.append({"index": i, "score": finScore, "type": "section"})
+                resz.extend({"index": i, "score": finScore, "type": "section"} for i in idxs if qa.rows is None or i in qa.rows)
         
-        return sorted(resz, key=lambda x: x["score"], reverse=True)[:top_k]
+        return heapq.nlargest(top_k, resz, key=by_score) # ties in segment order like the per-segment loop did
+    
+    def debug_search(self, query: str, doc_ids: Iterable[str] = None) -> Dict: # to see what is going on pod kapotom -__-
+        qa = self.analyze(query) # same lru'd embedding search() used for this question
+        with self._lock:
+            qa.rows = self._rows_for(doc_ids)
+            return self._debug_search(qa)
     
-    def debug_search(self, query: str) -> Dict: # to see what is going on pod kapotom -__-
+    def _debug_search(self, qa: QueryAnalysis) -> Dict:
         if not self.idx or not self.segments:
             return {"error": "no index or segments"}
         
         debug_info = {
-            "query": query,
-            "total_segments": len(self.segments),
-            "document_keywords": list(self.doc_keywords)[:20],  # first 20 -- migth adjust it later
+            "query": qa.query,
+            "total_segments": len(self.segments) if qa.rows is None else len(qa.rows),
+            "document_keywords": self.lex_idx.bm25.keywords(20), # most bm25 weight across the corpus
             "search_strategies": {}
         }
         
+        rerank_report = {}
         strategies = [
+            ("fused", self._ranked), # semantic alone when it was decisive. first, so its timings aren't warmed up by the rest
+            ("reranked", lambda qa, top_k: self._reranked(qa, top_k, rerank_report)), # what search() returns
             ("semantic", self._semantic_search),
-            ("keyword", self._adaptive_keyword_search),
+            ("keyword", self._keyword_search),
             ("fuzzy", self._fuzzy_search),
             ("section", self._section_search)
         ]
         
         for name, strategy_func in strategies:
+            if name == "reranked" and not self.reranker.enabled: continue
             try:
-                resz = strategy_func(query, 5)
+                resz = strategy_func(qa, 5) # own cancel token per fused run -- the listings below always run whole
                 debug_info["search_strategies"][name] = {
                     "found": len(resz),
                     "top_3": [
                         {
                             "score": r["score"],
                             "preview": self.segments[r["index"]][:100] + "...",
-                            "section": self.segment_metadata[r["index"]].get("section", "unknown")
+                            "section": self.segments.section(r["index"]),
+                            "page": self.segments.page(r["index"])
                         }
                         for r in resz[:3]
                     ]
@@ -213,4 +481,7 @@ class VectorSearch:
             except Exception as e:
                 debug_info["search_strategies"][name] = {"error": str(e)}
         
+        debug_info["timings_ms"] = dict(qa.timings) # from the last ranking run -- the reranked one when enabled, like search()
+        debug_info["dropped"] = list(qa.dropped)
+        if rerank_report: debug_info["rerank"] = rerank_report
         return debug_info
\ No newline at end of file